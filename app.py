@@ -1,23 +1,63 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-from budget_forecast import BudgetForecaster
+from budget_forecast import BudgetForecaster, build_forecast_params, hash_forecast_params
+from forecast_jobs import DONE, FAILED, FINISHED_STATUSES, STATUS_LABELS, JobQueue
+from scenario_store import ScenarioStore
+from forecast_trace import Trace, span, traced
+from forecast_metrics import FORECAST_CACHE_REQUESTS, configure_logging, get_logger, render_prometheus, write_prometheus
+from forecast_profile import ForecastProfile, build_replay
+from forecast_memory import (MB, MEMORY_TRACKING, SESSION_MEMORY_WARN_MB, SessionMemoryRegistry, measure_state,
+                             memory_tracked, memory_tracking_enabled, recent_measurements, start_memory_tracking)
+from budget_export import (DAYS_IN_MONTH, LEVEL_METRICS, RESULT_FORMATS, biggest_movers, build_bulk_comparison,
+                           build_comparison_table, diff_forecasts, total_delta,
+                           comparison_xlsx_bytes, forecast_result_bytes, month_comparison, read_forecast_result)
 import numpy as np
-import tempfile
+import json
 import os
-import locale
+import hashlib
+import random
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
 
-# Türkçe locale ayarla
-try:
-    locale.setlocale(locale.LC_ALL, 'tr_TR.UTF-8')
-except:
+# Tahmin sonuç önbelleği
+FORECAST_CACHE_SIZE = 8  # Oturum başına saklanan parametre seti sayısı
+SHARED_FORECAST_CACHE = os.environ.get('BUDGET_SHARED_FORECAST_CACHE', '0') == '1'  # Aynı veri seti için oturumlar arası paylaşım
+DERIVED_TABLE_CACHE_SIZE = 4  # Süreç genelinde saklanan Detay Veriler tablosu sayısı
+
+# Shadow mod: Hesapla çalıştırmalarının bu oranında aday motor legacy ile karşılaştırılır (0 = kapalı)
+SHADOW_SAMPLE_RATE = float(os.environ.get('BUDGET_SHADOW_SAMPLE_RATE', '0'))
+SHADOW_ENGINE = os.environ.get('BUDGET_SHADOW_ENGINE', 'vectorized')
+
+# Arka plan iş kuyruğu: Hesapla ve senaryo karşılaştırması sayfayı bloklamadan çalışır
+JOB_WORKERS = int(os.environ.get('BUDGET_JOB_WORKERS', '2'))  # Tüm oturumlar için ortak worker sayısı
+JOB_INLINE_WAIT_SECONDS = 1.0  # Kısa işler bu süre içinde biterse sonuç aynı çalıştırmada gösterilir
+JOB_POLL_SECONDS = 1.0
+
+# Log seviyesi/biçimi BUDGET_LOG_LEVEL / BUDGET_LOG_FORMAT ile; metrik dosyası verilirse her hesaptan sonra güncellenir
+METRICS_FILE = os.environ.get('BUDGET_METRICS_FILE')
+configure_logging()
+logger = get_logger('app')
+
+# Bellek: tahmin çağrısı başına tepe bellek BUDGET_TRACE_MEMORY=1 ile ölçülür; oturum boyutları her zaman.
+# BUDGET_MEMORY_ADMIN=1 ise Tanılama'da tüm oturumlar bellek kullanımına göre listelenir
+MEMORY_ADMIN = os.environ.get('BUDGET_MEMORY_ADMIN', '0') == '1'
+if MEMORY_TRACKING:
+    start_memory_tracking()
+
+# Türkçe locale - setlocale süreç geneli olduğu için her rerun'da değil, süreç başına bir kez
+@st.cache_resource
+def setup_locale():
+    import locale
     try:
-        locale.setlocale(locale.LC_ALL, 'Turkish_Turkey.1254')
+        locale.setlocale(locale.LC_ALL, 'tr_TR.UTF-8')
     except:
-        pass
-        
+        try:
+            locale.setlocale(locale.LC_ALL, 'Turkish_Turkey.1254')
+        except:
+            pass
+
 # Sayfa konfigürasyonu
 st.set_page_config(
     page_title="2026 Satış Bütçe Tahmini",
@@ -65,6 +105,207 @@ def format_percent(num, decimals=1):
         return "-"
     return f"%{format_number(num, decimals)}"
 
+# Türkçe ayraçlar: binlik "." ve ondalık ","
+TR_SEPARATORS = str.maketrans({",": ".", ".": ","})
+
+def format_number_column(values, decimals=0, prefix="", localized=True):
+    """
+    Sütun formatla: format_number ile aynı çıktı, hücre başına apply olmadan
+    
+    Pozitif olmayan ve boş değerler "-" olur. localized=False ise binlik ayraç olmadan
+    Python formatı kullanılır (örn. Stok/SMM "1.25").
+    """
+    values = np.asarray(values, dtype=float)
+    mask = values > 0
+    
+    if localized:
+        # Ayraç değişimi hücre başına değil, birleştirilmiş metinde tek seferde yapılır
+        template = f"{prefix}{{:,.{decimals}f}}"
+        formatted = "\n".join(map(template.format, values[mask].tolist())).translate(TR_SEPARATORS).split("\n")
+    else:
+        template = f"{prefix}{{:.{decimals}f}}"
+        formatted = list(map(template.format, values[mask].tolist()))
+    
+    result = np.full(values.shape, "-", dtype=object)
+    if mask.any():
+        result[mask] = formatted
+    return result
+
+def positive_int_column(values):
+    """CSV için: pozitifse tam sayıya kes, değilse 0 (int(x) if x > 0 else 0)"""
+    values = np.asarray(values, dtype=float)
+    return np.where(values > 0, values, 0).astype('int64')
+
+# Tahmin önbelleği fonksiyonları
+@st.cache_resource
+def get_shared_forecast_cache(dataset_hash):
+    """Aynı veri seti için tüm oturumların paylaştığı LRU önbellek"""
+    return {'lock': threading.Lock(), 'entries': OrderedDict()}
+
+def get_forecast_cache(dataset_hash):
+    """Aktif önbelleği döndür (paylaşımlı veya oturuma özel)"""
+    if SHARED_FORECAST_CACHE:
+        return get_shared_forecast_cache(dataset_hash)
+    if 'forecast_cache' not in st.session_state:
+        st.session_state.forecast_cache = {'lock': threading.Lock(), 'entries': OrderedDict()}
+    return st.session_state.forecast_cache
+
+def forecast_cache_get(cache, key):
+    """Önbellekten sonuç al, bulunursa en yeni olarak işaretle"""
+    with cache['lock']:
+        if key not in cache['entries']:
+            return None
+        cache['entries'].move_to_end(key)
+        return cache['entries'][key]
+
+def forecast_cache_put(cache, key, result, max_size=FORECAST_CACHE_SIZE):
+    """Sonucu önbelleğe ekle, limit aşılırsa en eski kullanılanı çıkar"""
+    with cache['lock']:
+        cache['entries'][key] = result
+        cache['entries'].move_to_end(key)
+        while len(cache['entries']) > max_size:
+            cache['entries'].popitem(last=False)
+
+@st.cache_resource
+def get_derived_table_cache():
+    """Sonuçlardan türetilen büyük tablolar için süreç geneli LRU önbellek (oturumlarda tutulmaz)"""
+    return {'lock': threading.Lock(), 'entries': OrderedDict()}
+
+def forecast_result_steps(load, params, dataset_hash, shares_history=True):
+    """
+    Sonuç hazırlığını iş kuyruğu adımlarına böl: tahmin, özet ve kalite, küp, karşılaştırma
+    
+    load argümansız çağrılır ve (forecaster, full_data, shadow_report) döndürür; ilk adımın ara sonucu
+    shadow_report, son adımınki oturuma alınan sonuçtur. Adımlar aynı işte sırayla çalışıp ara
+    tabloları paylaşır; ilerleme adım başına artar, iptal adımlar arasında işler.
+    """
+    # İş thread'inde st çağrısı yapılmaz: önbellek burada (arayüz thread'inde) alınır
+    derived_cache = get_derived_table_cache()
+    derived_key = (dataset_hash, hash_forecast_params(params))
+    state = {}
+    result = {'params': params, 'derived_key': derived_key}
+    
+    @traced('forecast_result.forecast')
+    def forecast():
+        forecaster, full_data, shadow_report = load()
+        state.update(forecaster=forecaster, full_data=full_data)
+        if shares_history:
+            result['forecast'] = forecaster.forecast_part(full_data)
+        else:
+            result['full_data'] = full_data
+        return shadow_report
+    
+    @traced('forecast_result.summary')
+    def summarize():
+        result['summary'] = state['forecaster'].get_summary_stats(state['full_data'])
+        result['quality_metrics'] = state['forecaster'].get_forecast_quality_metrics(state['full_data'])
+    
+    @traced('forecast_result.cube')
+    def aggregate():
+        # Sonuç grafikleri için aylık ve yıllık grup toplamları (Year × Month × MainGroup küpü tutulmaz)
+        cube = state['forecaster'].get_aggregate_cube(state['full_data'])
+        result['monthly'] = cube['monthly']
+        result['yearly_group'] = cube['yearly_group']
+    
+    @traced('forecast_result.comparison')
+    def compare():
+        # Detay Veriler tablosu oturumda değil, süreç geneli önbellekte tutulur (bkz. result_comparison)
+        comparison = build_comparison_table(state.pop('full_data'))
+        forecast_cache_put(derived_cache, ('comparison',) + derived_key, comparison, max_size=DERIVED_TABLE_CACHE_SIZE)
+        return result
+    
+    return [
+        ('Tahmin', forecast),
+        ('Özet ve kalite', summarize),
+        ('Küp', aggregate),
+        ('Karşılaştırma', compare)
+    ]
+
+@traced()
+@memory_tracked()
+def build_forecast_result(forecaster, full_data, params, dataset_hash, shares_history=True):
+    """
+    Hazır tahmin verisinden sonucu aynı thread'de oluştur (kayıtlı senaryo / yüklenen sonuç)
+    
+    Oturumda sadece küçük tablolar tutulur: özet, kalite metrikleri ve grafiklerin aylık / yıllık
+    grup roll-up'ları. Detay Veriler tablosu süreç geneli önbellekte durur (bkz. result_comparison).
+    shares_history=True ise tahmin verisinden sadece tahmin ayları tutulur; gerçekleşen kısım
+    paylaşılan forecaster'dan gerektiğinde eklenir (bkz. result_full_data).
+    """
+    steps = forecast_result_steps(lambda: (forecaster, full_data, None), params, dataset_hash, shares_history)
+    for _, step in steps:
+        result = step()
+    return result
+
+def result_full_data(forecaster, result):
+    """Sonucun tam verisi (gerçekleşen + tahmin)"""
+    if 'full_data' in result:
+        return result['full_data']
+    return forecaster.merge_with_history(result['forecast'])
+
+def result_comparison(forecaster, result):
+    """Detay Veriler geniş tablosu - önbellekten düştüyse (veri seti, parametre hash'i) için yeniden türetilir"""
+    cache = get_derived_table_cache()
+    key = ('comparison',) + result['derived_key']
+    comparison = forecast_cache_get(cache, key)
+    if comparison is None:
+        comparison = build_comparison_table(result_full_data(forecaster, result))
+        forecast_cache_put(cache, key, comparison, max_size=DERIVED_TABLE_CACHE_SIZE)
+    return comparison
+
+@traced()
+def compute_forecast(forecaster, forecast_params, run_shadow=False):
+    """Tahmini hesapla (iş kuyruğu thread'inde çalışır, st çağrısı yapmaz) - forecast_result_steps'in load'ı"""
+    shadow_report = None
+    if run_shadow:
+        # Örneklenen çalıştırmalarda aday motor shadow olarak ölçülür
+        forecast, shadow_report = forecaster.shadow_forecast(candidate_engine=SHADOW_ENGINE, **forecast_params)
+        full_data = forecaster.merge_with_history(forecast)
+        
+        status = "eşleşti" if shadow_report['passed'] else f"{len(shadow_report['differences'])} hücre farklı"
+        log = logger.info if shadow_report['passed'] else logger.warning
+        log(
+            f"Shadow [{SHADOW_ENGINE}] {status}",
+            extra={
+                'event': 'shadow_forecast',
+                'engine': SHADOW_ENGINE,
+                'passed': shadow_report['passed'],
+                'legacy_seconds': round(shadow_report['legacy_seconds'], 4),
+                'candidate_seconds': round(shadow_report['candidate_seconds'], 4),
+                'max_abs_diff': shadow_report['max_abs_diff']
+            }
+        )
+    else:
+        full_data = forecaster.get_full_data_with_forecast(**forecast_params)
+    
+    return forecaster, full_data, shadow_report
+
+@traced()
+def profile_forecast(file_bytes, forecast_params):
+    """Profil modu: Excel okuma dahil baştan hesapla (paylaşılan forecaster ve önbellekler kullanılmaz)"""
+    profiled_forecaster = BudgetForecaster(file_bytes)
+    return compute_forecast(profiled_forecaster, forecast_params)
+
+def export_metrics():
+    """BUDGET_METRICS_FILE verildiyse metrikleri Prometheus metin formatında dosyaya yaz"""
+    if METRICS_FILE:
+        write_prometheus(METRICS_FILE)
+
+@st.cache_resource
+def get_session_memory_registry():
+    """Tüm oturumların son ölçülen bellek kullanımı"""
+    return SessionMemoryRegistry()
+
+@st.cache_resource
+def get_job_queue():
+    """Tüm oturumların paylaştığı arka plan iş kuyruğu"""
+    return JobQueue(workers=JOB_WORKERS)
+
+@st.cache_resource
+def get_scenario_store():
+    """Kalıcı senaryo deposu (BUDGET_SCENARIO_DB, varsayılan scenarios.db)"""
+    return ScenarioStore()
+
 # Sidebar - Sadeleştirilmiş
 st.sidebar.header("⚙️ Temel Parametreler")
 
@@ -77,29 +318,55 @@ uploaded_file = st.sidebar.file_uploader(
     help="2024-2025 verilerini içeren Excel dosyası"
 )
 
-# Veri yükleme
+# Kaydedilmiş tahmin sonucu (Detay Veriler sekmesinden indirilen Parquet/Arrow)
+uploaded_result = st.sidebar.file_uploader(
+    "Kayıtlı Sonuç Yükle (opsiyonel)",
+    type=[ext.lstrip('.') for ext in RESULT_FORMATS.values()],
+    help="Daha önce indirilen tahmin sonucunu yeniden hesaplamadan açar"
+)
+
+# Parametre tabloları (ana grup listesi + varsayılan değere göre önbellekli)
+MONTH_COLUMNS = [str(month) for month in range(1, 13)]
+
+@st.cache_data
+def build_maingroup_targets(main_groups):
+    """Ana grup hedef tablosu - varsayılan %20"""
+    return pd.DataFrame({
+        'Ana Grup': list(main_groups),
+        'Hedef (%)': np.full(len(main_groups), 20.0)
+    })
+
 @st.cache_data
-def load_data(file_path):
-    return BudgetForecaster(file_path)
+def build_group_month_table(main_groups, default_value):
+    """Ana grup × 12 ay tablosu - tüm hücreler varsayılan değerle"""
+    table = pd.DataFrame(np.full((len(main_groups), 12), default_value), columns=MONTH_COLUMNS)
+    table.insert(0, 'Ana Grup', list(main_groups))
+    return table
+
+# Veri yükleme - aynı dosya için tüm oturumlar tek, salt okunur forecaster örneğini paylaşır
+# (önbellek anahtarı içerik hash'i; bytes argümanı hash'e dahil edilmez)
+@st.cache_resource(max_entries=4)
+def load_data(dataset_hash, _file_bytes):
+    return BudgetForecaster(_file_bytes)
 
 
 forecaster = None
+dataset_hash = None
 if uploaded_file is not None:
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_path = tmp_file.name
+    setup_locale()
+    file_bytes = uploaded_file.getvalue()
+    dataset_hash = hashlib.sha256(file_bytes).hexdigest()
     
+    # Yüklenen içerik diske yazılmadan bellekten okunur
     with st.spinner('Veri yükleniyor...'):
-        forecaster = load_data(tmp_path)
-    
-    os.unlink(tmp_path)
+        forecaster = load_data(dataset_hash, file_bytes)
     
     # *** YENİ DOSYA YÜKLENDİĞİNDE SESSION STATE'İ SIFIRLA ***
     current_file_name = uploaded_file.name
     
     if 'last_uploaded_file' not in st.session_state or st.session_state.last_uploaded_file != current_file_name:
         # Yeni dosya - session state'i temizle
-        keys_to_clear = [k for k in st.session_state.keys() if k not in ['last_uploaded_file']]
+        keys_to_clear = [k for k in st.session_state.keys() if k not in ['last_uploaded_file', 'session_id']]
         for key in keys_to_clear:
             del st.session_state[key]
         
@@ -280,6 +547,23 @@ else:  # İyimser
     """)
     organic_multiplier = 1.0
 
+st.sidebar.markdown("---")
+st.sidebar.subheader("🧮 Tahmin Yöntemi")
+
+forecast_method = st.sidebar.radio(
+    "Yöntem",
+    options=["Kural tabanlı", "İstatistiksel model"],
+    index=0,
+    help="Kural tabanlı: onaylı hesap (geçen yıl × sabit organik büyüme ve mevsimsellik katsayıları). "
+         "İstatistiksel model: her ana grubun kendi geçmişinden trend ve mevsimsellik (ay etkili log-doğrusal "
+         "regresyon); hedefler ve marj/stok kaldıraçları sadece bütçe yılına uygulanır.",
+    key="forecast_method_radio"
+)
+forecast_engine = 'model' if forecast_method == "İstatistiksel model" else 'legacy'
+
+if forecast_engine == 'model':
+    st.sidebar.caption("📐 Organik büyüme her ana grup için ayrı tahmin edilir; bütçe versiyonu çarpanı bu trende uygulanır.")
+
 
 
 
@@ -296,41 +580,307 @@ if 'monthly_targets' not in st.session_state:
         'Hedef (%)': [20.0] * 12
     })
 
-if 'maingroup_targets' not in st.session_state:
-    st.session_state.maingroup_targets = pd.DataFrame({
-        'Ana Grup': main_groups,
-        'Hedef (%)': [20.0] * len(main_groups)
-    })
-
-# Her zaman güncel ana grupları kullan
-st.session_state.maingroup_targets = pd.DataFrame({
-    'Ana Grup': main_groups,
-    'Hedef (%)': [20.0] * len(main_groups)
-})
-
-
-# Her zaman güncel ana grupları kullan
-lessons_data = {'Ana Grup': main_groups}
-for month in range(1, 13):
-    lessons_data[str(month)] = [0] * len(main_groups)
-st.session_state.lessons_learned = pd.DataFrame(lessons_data)
+# Ana grup tabloları sadece ana gruplar (veri seti) değişince yeniden oluşturulur,
+# böylece widget etkileşimlerinde tablo kurulmaz ve kullanıcı düzenlemeleri korunur
+groups_key = tuple(main_groups)
+if st.session_state.get('param_tables_groups') != groups_key:
+    st.session_state.maingroup_targets = build_maingroup_targets(groups_key)
+    st.session_state.lessons_learned = build_group_month_table(groups_key, 0)
+    st.session_state.param_tables_groups = groups_key
 
 # Refresh counter - force rerun için
 if 'refresh_counter' not in st.session_state:
     st.session_state.refresh_counter = 0
     
 
-# Her zaman güncel ana grupları kullan
-price_data = {'Ana Grup': main_groups}
-for month in range(1, 13):
-    price_data[str(month)] = [inflation_future] * len(main_groups)
-st.session_state.price_changes = pd.DataFrame(price_data)
+# Fiyat tablosunun varsayılanı enflasyon - enflasyon değişince yeniden oluştur
+if st.session_state.get('price_table_key') != (groups_key, inflation_future):
+    st.session_state.price_changes = build_group_month_table(groups_key, inflation_future)
+    st.session_state.price_table_key = (groups_key, inflation_future)
 
 
 # Hesaplanmış tahmin sonuçları
 if 'forecast_result' not in st.session_state:
     st.session_state.forecast_result = None
 
+# Kayıtlı sonuç yüklendiyse tahmini yeniden hesaplamadan göster (her dosya bir kez okunur)
+if uploaded_result is not None and st.session_state.get('loaded_result_id') != uploaded_result.file_id:
+    try:
+        loaded_data, loaded_metadata = read_forecast_result(uploaded_result.getvalue())
+    except Exception as e:
+        st.sidebar.error(f"❌ Sonuç dosyası okunamadı: {e}")
+    else:
+        missing_columns = {'Year', 'Month', 'MainGroup', 'Sales'} - set(loaded_data.columns)
+        if missing_columns or loaded_metadata['params'] is None:
+            st.sidebar.error("❌ Dosya bir tahmin sonucu değil (full_data kolonları veya parametreler eksik).")
+        else:
+            same_dataset = loaded_metadata['dataset_hash'] == dataset_hash
+            st.session_state.forecast_result = build_forecast_result(
+                forecaster, loaded_data, loaded_metadata['params'],
+                loaded_metadata['dataset_hash'] or uploaded_result.file_id, shares_history=same_dataset
+            )
+            
+            # Aynı veri setiyle hesaplandıysa önbelleğe de ekle - aynı parametrelerle Hesapla anında döner
+            if same_dataset:
+                forecast_cache_put(get_forecast_cache(dataset_hash),
+                                   hash_forecast_params(loaded_metadata['params']),
+                                   st.session_state.forecast_result)
+                st.sidebar.success("✅ Kayıtlı sonuç yüklendi.")
+            else:
+                st.sidebar.warning("⚠️ Kayıtlı sonuç farklı bir Excel dosyasıyla hesaplanmış.")
+    st.session_state.loaded_result_id = uploaded_result.file_id
+
+# ARKA PLAN İŞLERİ
+def finish_forecast_job(dataset_hash):
+    """Tahmin işi bittiyse sonucu oturuma ve önbelleğe al (tam çalıştırmada, sekmeler çizilmeden önce)"""
+    job_info = st.session_state.get('forecast_job')
+    if job_info is None:
+        return
+    
+    # Bitmiş iş kuyruktan alınır: sonuç sadece bu oturumda kalır
+    job = get_job_queue().collect(job_info['id'])
+    if job is None or job['status'] not in FINISHED_STATUSES:
+        if job is None:
+            st.session_state.forecast_job = None
+        return
+    
+    st.session_state.forecast_job = None
+    if job['status'] == DONE:
+        # İlk adım (Tahmin) shadow raporunu, son adım oturuma alınacak sonucu döndürür
+        shadow_report = job['results'][0][1]
+        result = job['results'][-1][1]
+        st.session_state.forecast_result = result
+        if shadow_report is not None:
+            st.session_state.shadow_report = shadow_report
+        forecast_cache_put(get_forecast_cache(dataset_hash), job_info['params_key'], result)
+        if job_info.get('profile') is not None:
+            st.session_state.forecast_profile = job_info['profile']
+        export_metrics()
+        st.session_state.forecast_notice = ('success', f"✅ Tahmin başarıyla hesaplandı ({job['elapsed']:.1f} sn)! 'Tahmin Sonuçları' sekmesine geçin.")
+    elif job['status'] == FAILED:
+        st.session_state.forecast_notice = ('error', f"❌ Tahmin hesaplanamadı: {job['error']}")
+    else:
+        st.session_state.forecast_notice = ('info', "🛑 Tahmin iptal edildi, önceki sonuçlar gösteriliyor.")
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_forecast_job():
+    """Süren tahmin işini yokla - bitince sayfa yeniden çalışır ve sonuç tüm sekmelere yansır"""
+    job_info = st.session_state.get('forecast_job')
+    job = get_job_queue().snapshot(job_info['id']) if job_info is not None else None
+    
+    if job is None or job['status'] in FINISHED_STATUSES:
+        st.rerun()
+    
+    current = f" - {job['current']}" if job['current'] else ""
+    st.progress(job['progress'], text=f"{STATUS_LABELS[job['status']]}{current} ({job['completed']}/{job['total']}, {job['elapsed']:.1f} sn)")
+    if st.button("🛑 İptal Et", key='cancel_forecast_job'):
+        get_job_queue().cancel(job['id'])
+
+# Senaryo karşılaştırması: bütçe versiyonları (organik çarpan) aynı parametrelerle arka planda
+SWEEP_VERSIONS = [("🔴 Çekimser", 0.0), ("🟡 Normal", 0.5), ("🟢 İyimser", 1.0)]
+
+def summarize_scenario(forecaster, forecast_params):
+    """Senaryonun 2026 toplamları (ara sonuç olarak küçük tutulur)"""
+    full_data = forecaster.get_full_data_with_forecast(**forecast_params)
+    summary = forecaster.get_summary_stats(full_data).get(2026, {})
+    return {
+        'Satış 2026': summary.get('Total_Sales', 0.0),
+        'Brüt Kâr 2026': summary.get('Total_GrossProfit', 0.0),
+        'BM% 2026': summary.get('Avg_GrossMargin%', 0.0),
+        'Ort. Stok 2026': summary.get('Avg_Stock', 0.0)
+    }
+
+def show_scenario_job(job):
+    """Senaryo işinin ilerlemesi ve o ana kadar biten senaryoların tablosu"""
+    if job['status'] not in FINISHED_STATUSES:
+        current = f" - {job['current']}" if job['current'] else ""
+        st.progress(job['progress'], text=f"{STATUS_LABELS[job['status']]}{current} ({job['completed']}/{job['total']}, {job['elapsed']:.1f} sn)")
+        if st.button("🛑 Karşılaştırmayı İptal Et", key='cancel_scenario_job'):
+            get_job_queue().cancel(job['id'])
+    else:
+        st.caption(f"{STATUS_LABELS[job['status']]} - {job['completed']}/{job['total']} senaryo, {job['elapsed']:.1f} sn")
+        if job['error']:
+            st.error(job['error'])
+    
+    if job['results']:
+        table = pd.DataFrame([{'Senaryo': label, **values} for label, values in job['results']])
+        for column in ['Satış 2026', 'Brüt Kâr 2026', 'Ort. Stok 2026']:
+            table[column] = format_number_column(table[column], 0, prefix="₺")
+        table['BM% 2026'] = format_number_column(table['BM% 2026'], 1, prefix="%")
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_scenario_job(job_id):
+    """Süren senaryo işini yokla - bitince tam çalıştırma yapılır ve yoklama durur"""
+    job = get_job_queue().snapshot(job_id)
+    if job is None or job['status'] in FINISHED_STATUSES:
+        st.rerun()
+    show_scenario_job(job)
+
+def render_scenario_sweep(forecaster):
+    """Hesaplanan parametrelerle üç bütçe versiyonunu arka planda karşılaştır"""
+    if st.session_state.forecast_result is None:
+        return
+    
+    with st.expander("🎲 Senaryo Karşılaştırması (arka planda)"):
+        st.caption("Son hesaplanan parametreler Çekimser / Normal / İyimser versiyonlarıyla yeniden çalıştırılır. Sayfa beklemez, sonuçlar geldikçe eklenir.")
+        
+        if st.button("🎲 Karşılaştırmayı Başlat", key='start_scenario_sweep'):
+            base_params = st.session_state.forecast_result['params']
+            steps = [
+                (label, lambda multiplier=multiplier: summarize_scenario(
+                    forecaster, {**base_params, 'organic_multiplier': multiplier}))
+                for label, multiplier in SWEEP_VERSIONS
+            ]
+            if st.session_state.get('scenario_job_id') is not None:
+                get_job_queue().cancel(st.session_state.scenario_job_id)
+            st.session_state.scenario_job_id = get_job_queue().submit('Senaryo karşılaştırması', steps)
+            st.session_state.scenario_job = None
+        
+        job_id = st.session_state.get('scenario_job_id')
+        job = get_job_queue().collect(job_id) if job_id is not None else None
+        if job is not None and job['status'] not in FINISHED_STATUSES:
+            poll_scenario_job(job_id)
+        else:
+            if job is not None:
+                # Bitmiş iş kuyruktan alındı; küçük sonuç tablosu oturumda kalır
+                st.session_state.scenario_job = job
+                st.session_state.scenario_job_id = None
+            if st.session_state.get('scenario_job') is not None:
+                show_scenario_job(st.session_state.scenario_job)
+
+# KAYITLI SENARYOLAR (sqlite3 deposu)
+@st.fragment
+def render_scenario_store(forecaster):
+    """Sonucu senaryo olarak kaydet, kayıtlı senaryoları yükle ve yan yana karşılaştır"""
+    store = get_scenario_store()
+    
+    with st.expander("🗄️ Kayıtlı Senaryolar"):
+        forecast_result = st.session_state.forecast_result
+        if forecast_result is not None:
+            col1, col2 = st.columns([3, 1])
+            scenario_name = col1.text_input("Senaryo adı", value="Bütçe", key='scenario_name')
+            col2.write("")
+            if col2.button("💾 Kaydet", key='save_scenario', use_container_width=True):
+                try:
+                    store.save(scenario_name, dataset_hash, forecast_result['params'],
+                               result_full_data(forecaster, forecast_result))
+                    st.success(f"✅ '{scenario_name}' kaydedildi.")
+                except sqlite3.Error as e:
+                    logger.exception("Senaryo kaydedilemedi", extra={'event': 'scenario_save_failed'})
+                    st.error(f"❌ Senaryo kaydedilemedi: {e}")
+        
+        scenarios = store.list_scenarios(dataset_hash)
+        if scenarios.empty:
+            st.caption("Bu Excel dosyası için kayıtlı senaryo yok.")
+            return
+        
+        labels = {row.id: f"{row.name} ({row.created_at:%d.%m.%Y %H:%M})" for row in scenarios.itertuples()}
+        
+        col1, col2, col3 = st.columns([3, 1, 1])
+        selected_id = col1.selectbox("Senaryo", list(labels), format_func=labels.get, key='stored_scenario')
+        col2.write("")
+        col3.write("")
+        if col2.button("📂 Yükle", key='load_scenario', use_container_width=True):
+            stored_data, stored_metadata = store.load(selected_id)
+            st.session_state.forecast_result = build_forecast_result(forecaster, stored_data, stored_metadata['params'], dataset_hash)
+            forecast_cache_put(get_forecast_cache(dataset_hash), stored_metadata['params_hash'],
+                               st.session_state.forecast_result)
+            st.session_state.forecast_notice = ('success', f"🗄️ '{stored_metadata['name']}' senaryosu yüklendi.")
+            st.rerun()
+        if col3.button("🗑️ Sil", key='delete_scenario', use_container_width=True):
+            store.delete(selected_id)
+            st.rerun()
+        
+        compare_ids = st.multiselect("Karşılaştır", list(labels), format_func=labels.get,
+                                     default=list(labels)[:2], key='compare_scenarios')
+        compare_metric = st.selectbox("Metrik (2026, aylık)", ['Sales', 'GrossProfit', 'Quantity', 'Stock', 'COGS', 'GrossMargin%'],
+                                      key='compare_metric')
+        if compare_ids:
+            comparison = store.compare(compare_ids, metric=compare_metric, year=2026, with_total=True)
+            if not comparison.empty:
+                comparison.index = comparison.index.astype(str)
+                decimals = 1 if compare_metric == 'GrossMargin%' else 0
+                if compare_metric == 'GrossMargin%':
+                    # Marj oran olarak tutulur, yüzde olarak gösterilir
+                    comparison = comparison * 100
+                st.dataframe(comparison.apply(lambda column: format_number_column(column, decimals)),
+                             use_container_width=True)
+        
+        render_scenario_diff(forecaster, labels)
+
+# Fark analizinde gösterilen metrikler ve gruplama seçenekleri
+DIFF_METRIC_LABELS = {'Sales': 'Satış', 'GrossProfit': 'Brüt Kâr', 'Quantity': 'Adet', 'Stock': 'Stok',
+                      'COGS': 'SMM', 'UnitPrice': 'Birim Fiyat', 'GrossMargin%': 'BM%'}
+DIFF_LEVELS = {'Ana Grup': 'MainGroup', 'Ay': ['Year', 'Month'], 'Ay + Ana Grup': None}
+CURRENT_RESULT = 'current'
+
+def format_delta(value, decimals=0):
+    """Farkı işaretli formatla: +1.234 / -1.234"""
+    if pd.isna(value) or value == 0:
+        return "-"
+    return ("+" if value > 0 else "-") + format_number(abs(value), decimals)
+
+def render_scenario_diff(forecaster, labels):
+    """İki sonucun (Year, Month, MainGroup) bazında farkı ve en çok değişen gruplar/aylar"""
+    st.markdown("#### 🔀 Fark Analizi")
+    
+    options = list(labels)
+    option_labels = dict(labels)
+    if st.session_state.forecast_result is not None:
+        options = [CURRENT_RESULT] + options
+        option_labels[CURRENT_RESULT] = "📊 Mevcut sonuç"
+    if len(options) < 2:
+        st.caption("Fark için en az iki sonuç gerekli (mevcut sonuç veya kayıtlı senaryolar).")
+        return
+    
+    col1, col2 = st.columns(2)
+    base_id = col1.selectbox("Önceki", options, index=1, format_func=option_labels.get, key='diff_base')
+    other_id = col2.selectbox("Sonraki", options, index=0, format_func=option_labels.get, key='diff_other')
+    
+    col1, col2, col3 = st.columns(3)
+    metric = col1.selectbox("Metrik", list(DIFF_METRIC_LABELS), format_func=DIFF_METRIC_LABELS.get, key='diff_metric')
+    level = col2.selectbox("Kırılım", list(DIFF_LEVELS), key='diff_level')
+    top = col3.number_input("İlk N", min_value=5, max_value=100, value=15, step=5, key='diff_top')
+    relative = st.checkbox("Yüzde değişime göre sırala", key='diff_relative')
+    
+    def scenario_rows(scenario_id):
+        if scenario_id == CURRENT_RESULT:
+            return result_full_data(forecaster, st.session_state.forecast_result)
+        return get_scenario_store().load(scenario_id)[0]
+    
+    diff = diff_forecasts(scenario_rows(base_id), scenario_rows(other_id))
+    # Göreli tolerans: büyük tutarlarda tek ULP'lik fark değişim sayılmaz
+    changed = int((diff[metric]['Delta'].notna() & ~np.isclose(diff[metric]['Other'], diff[metric]['Base'])).sum())
+    
+    # Stok farkları sadece tahmin aylarında ortalanır
+    actual_until = (forecaster.last_actual_year, forecaster.last_actual_month)
+    percent = metric == 'GrossMargin%'
+    movers = biggest_movers(diff, metric=metric, top=int(top), by=DIFF_LEVELS[level], relative=relative,
+                            actual_until=actual_until)
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Değişen hücre", f"{changed:,}".replace(",", "."), help="Yıl × ay × ana grup bazında")
+    col2.metric("Sadece önceki / sonraki", f"{(diff['Status'] == 'base_only').sum()} / {(diff['Status'] == 'other_only').sum()}")
+    if metric in LEVEL_METRICS:
+        col3.metric(f"Ortalama {DIFF_METRIC_LABELS[metric]} farkı", format_delta(total_delta(diff, metric, actual_until)),
+                    help="Ay bazında toplam, tahmin ayları arasında ortalama")
+    elif not percent:
+        col3.metric(f"Toplam {DIFF_METRIC_LABELS[metric]} farkı", format_delta(total_delta(diff, metric)))
+    
+    if movers.empty:
+        st.info("Seçilen metrikte fark yok.")
+        return
+    
+    # Marj oran olarak tutulur, yüzde puan olarak gösterilir
+    scale, decimals = (100, 1) if percent else (1, 0)
+    table = movers.drop(columns=['Base', 'Other', 'Delta', 'DeltaPct'])
+    table['Önceki'] = [format_number(value * scale, decimals) for value in movers['Base']]
+    table['Sonraki'] = [format_number(value * scale, decimals) for value in movers['Other']]
+    table['Fark'] = [format_delta(value * scale, decimals) for value in movers['Delta']]
+    table['Fark %'] = [format_delta(value * 100, 1) for value in movers['DeltaPct']]
+    st.dataframe(table, use_container_width=True)
+
 # ANA SEKMELER
 main_tabs = st.tabs(["⚙️ Parametre Ayarları", "📊 Tahmin Sonuçları", "📋 Detay Veriler"])
 
@@ -342,7 +892,9 @@ with main_tabs[0]:
     param_tabs = st.tabs(["📅 Ay Bazında Hedefler", "🏪 Ana Grup Hedefleri", "📚 Alınan Dersler", "💵 Birim Fiyat Değişimi"])
     
     # --- AY BAZINDA HEDEFLER ---
-    with param_tabs[0]:
+    @st.fragment
+    def render_monthly_targets():
+        """Ay bazında hedef tablosu - düzenlemeler sadece bu bölümü yeniden çalıştırır"""
         st.markdown("### 📅 Ay Bazında Büyüme Hedefleri")
         
         edited_monthly = st.data_editor(
@@ -374,9 +926,17 @@ with main_tabs[0]:
         col_a.metric("📊 Ortalama", f"%{avg_monthly:.1f}")
         col_b.metric("📉 Minimum", f"%{min_monthly:.1f}")
         col_c.metric("📈 Maximum", f"%{max_monthly:.1f}")
+        
+        # Hesapla butonu düzenlenmiş tabloyu buradan okur
+        st.session_state.edited_monthly = edited_monthly
+    
+    with param_tabs[0]:
+        render_monthly_targets()
     
     # --- ANA GRUP HEDEFLERİ ---
-    with param_tabs[1]:
+    @st.fragment
+    def render_maingroup_targets():
+        """Ana grup hedef tablosu - düzenlemeler sadece bu bölümü yeniden çalıştırır"""
         st.markdown("### 🏪 Ana Grup Bazında Büyüme Hedefleri")
         
         # Ana grup sayısına göre yükseklik hesapla (her satır ~35px)
@@ -411,9 +971,17 @@ with main_tabs[0]:
         col_a.metric("📊 Ortalama", f"%{avg_maingroup:.1f}")
         col_b.metric("📉 Minimum", f"%{min_maingroup:.1f}")
         col_c.metric("📈 Maximum", f"%{max_maingroup:.1f}")
+        
+        # Hesapla butonu düzenlenmiş tabloyu buradan okur
+        st.session_state.edited_maingroup = edited_maingroup
+    
+    with param_tabs[1]:
+        render_maingroup_targets()
     
     # --- ALINAN DERSLER ---
-    with param_tabs[2]:
+    @st.fragment
+    def render_lessons_learned():
+        """Alınan dersler matrisi - düzenlemeler sadece bu bölümü yeniden çalıştırır"""
         st.markdown("### 📚 Alınan Dersler (Tecrübe Matrisi)")
         st.caption("Geçmiş deneyimlerinizi -10 ile +10 arası puan verin. Her puan ~%0.5 etki yapar.")
         
@@ -462,13 +1030,10 @@ with main_tabs[0]:
         # İstatistikler
         col_a, col_b, col_c = st.columns(3)
         
-        total_adjustments = 0
-        positive_count = 0
-        negative_count = 0
-        for month in range(1, 13):
-            total_adjustments += edited_lessons[str(month)].abs().sum()
-            positive_count += (edited_lessons[str(month)] > 0).sum()
-            negative_count += (edited_lessons[str(month)] < 0).sum()
+        lesson_scores = edited_lessons[MONTH_COLUMNS].to_numpy()
+        total_adjustments = np.abs(lesson_scores).sum()
+        positive_count = (lesson_scores > 0).sum()
+        negative_count = (lesson_scores < 0).sum()
         
         col_a.metric("📊 Toplam Düzeltme", f"{total_adjustments:.0f}")
         col_b.metric("➕ Pozitif", f"{positive_count}")
@@ -489,9 +1054,17 @@ with main_tabs[0]:
             with col3:
                 st.info("**0 puan** → Değişiklik yok")
                 st.caption("Normal seyir, özel bir durum olmadı")
+        
+        # Hesapla butonu düzenlenmiş tabloyu buradan okur
+        st.session_state.edited_lessons = edited_lessons
+    
+    with param_tabs[2]:
+        render_lessons_learned()
     
     # --- BİRİM FİYAT DEĞİŞİMİ ---
-    with param_tabs[3]:
+    @st.fragment
+    def render_price_changes(inflation_future):
+        """Birim fiyat değişim matrisi - düzenlemeler sadece bu bölümü yeniden çalıştırır"""
         st.markdown("### 💵 Birim Fiyat Değişimi (2025→2026)")
         st.caption(f"Ana grup ve ay bazında fiyat artış/azalış oranları. Default: %{inflation_future:.0f} (Enflasyon)")
         
@@ -536,9 +1109,7 @@ with main_tabs[0]:
         
         col_a, col_b, col_c = st.columns(3)
         
-        all_prices = []
-        for month in range(1, 13):
-            all_prices.extend(edited_prices[str(month)].tolist())
+        all_prices = edited_prices[MONTH_COLUMNS].to_numpy(dtype=float)
         
         avg_price = np.mean(all_prices)
         min_price = np.min(all_prices)
@@ -557,6 +1128,12 @@ with main_tabs[0]:
             **Adet Hesabı:**
             - Adet = Tahmin Edilen Ciro / Birim Fiyat
             """)
+        
+        # Hesapla butonu düzenlenmiş tabloyu buradan okur
+        st.session_state.edited_prices = edited_prices
+    
+    with param_tabs[3]:
+        render_price_changes(inflation_future)
     
     # --- BÜYÜK HESAPLA BUTONU ---
     st.markdown("---")
@@ -565,78 +1142,181 @@ with main_tabs[0]:
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
+        # Profil anahtarı tek hesaplama içindir - widget çizilmeden önce kapatılır
+        if st.session_state.pop('profile_next_run_reset', False):
+            st.session_state.profile_next_run = False
+        st.toggle(
+            "🔬 Sonraki hesaplamayı profille (cProfile)",
+            key='profile_next_run',
+            help="Excel okuma + tahmin + özetler profillenir (önbellek atlanır). Profil ve anonim parametreler Tanılama panelinden indirilir."
+        )
+        
         if st.button("📊 Hesapla ve Sonuçları Göster", type='primary', use_container_width=True, key='calculate_forecast'):
-            with st.spinner('Tahmin hesaplanıyor...'):
-                # Session state'i güncelle
-                st.session_state.monthly_targets = edited_monthly
-                st.session_state.maingroup_targets = edited_maingroup
-                st.session_state.lessons_learned = edited_lessons
-                st.session_state.price_changes = edited_prices
-
-                
+            edited_monthly = st.session_state.edited_monthly
+            edited_maingroup = st.session_state.edited_maingroup
+            edited_lessons = st.session_state.edited_lessons
+            edited_prices = st.session_state.edited_prices
+            
+            # Session state'i güncelle
+            st.session_state.monthly_targets = edited_monthly
+            st.session_state.maingroup_targets = edited_maingroup
+            st.session_state.lessons_learned = edited_lessons
+            st.session_state.price_changes = edited_prices
+            
+            # Aşama süreleri: bu thread'deki adımlar + iş kuyruğundaki hesap + grafikler tek trace'te
+            trace = Trace('Hesapla')
+            st.session_state.forecast_trace = trace
+            
+            with trace.activate():
                 # Parametreleri hazırla
-                monthly_growth_targets = {}
-                for _, row in edited_monthly.iterrows():
-                    monthly_growth_targets[int(row['Ay'])] = row['Hedef (%)'] / 100
-                
-                maingroup_growth_targets = {}
-                for _, row in edited_maingroup.iterrows():
-                    maingroup_growth_targets[row['Ana Grup']] = row['Hedef (%)'] / 100
-                
-                # Alınan dersleri dict formatına çevir
-                lessons_learned_dict = {}
-                for _, row in edited_lessons.iterrows():
-                    main_group = row['Ana Grup']
-                    for month in range(1, 13):
-                        lessons_learned_dict[(main_group, month)] = row[str(month)]
-                
-                # Fiyat değişimlerini dict formatına çevir
-                price_change_dict = {}
-                for _, row in st.session_state.price_changes.iterrows():  # ✅ Session state'den oku
-                    main_group = row['Ana Grup']
-                    for month in range(1, 13):
-                        price_change_dict[(main_group, month)] = row[str(month)] / 100
-                
-                # Genel büyüme parametresi
-                general_growth = (
-                    edited_monthly['Hedef (%)'].mean() +
-                    edited_maingroup['Hedef (%)'].mean()
-                ) / 200
-                
-                # Tahmin yap
-                full_data = forecaster.get_full_data_with_forecast(
-                    growth_param=general_growth,
+                forecast_params = build_forecast_params(
+                    edited_monthly, edited_maingroup, edited_lessons, edited_prices,
                     margin_improvement=margin_improvement,
                     stock_change_pct=stock_change_pct,
-                    monthly_growth_targets=monthly_growth_targets,
-                    maingroup_growth_targets=maingroup_growth_targets,
-                    lessons_learned=lessons_learned_dict,
-                    inflation_adjustment=inflation_adjustment,  
+                    inflation_adjustment=inflation_adjustment,
                     organic_multiplier=organic_multiplier,
-                    price_change_matrix=price_change_dict,
                     inflation_rate=inflation_future / 100
                 )
+                if forecast_engine != 'legacy':
+                    # Sadece seçilince eklenir: onaylı motorun parametre hash'i (önbellek, kayıtlı senaryo) değişmez
+                    forecast_params['engine'] = forecast_engine
                 
-                summary = forecaster.get_summary_stats(full_data)
-                quality_metrics = forecaster.get_forecast_quality_metrics(full_data)
-                
-                # Sonuçları kaydet
-                st.session_state.forecast_result = {
-                    'full_data': full_data,
-                    'summary': summary,
-                    'quality_metrics': quality_metrics
-                }
+                # Aynı parametre seti daha önce hesaplandıysa önbellekten al (profil modunda her zaman hesaplanır)
+                profile_run = st.session_state.get('profile_next_run', False)
+                with span('cache_lookup'):
+                    params_key = hash_forecast_params(forecast_params)
+                    cached_result = None
+                    stored_id = None
+                    if not profile_run:
+                        cached_result = forecast_cache_get(get_forecast_cache(dataset_hash), params_key)
+                        if cached_result is None:
+                            stored_id = get_scenario_store().find(dataset_hash, params_key)
+                        
+                        FORECAST_CACHE_REQUESTS.inc(cache='shared' if SHARED_FORECAST_CACHE else 'session',
+                                                    result='miss' if cached_result is None else 'hit')
+                        if cached_result is None:
+                            FORECAST_CACHE_REQUESTS.inc(cache='scenario_store', result='miss' if stored_id is None else 'hit')
                 
-                st.success("✅ Tahmin başarıyla hesaplandı! 'Tahmin Sonuçları' sekmesine geçin.")                
+                if cached_result is not None:
+                    st.session_state.forecast_result = cached_result
+                    export_metrics()
+                    st.session_state.forecast_notice = ('success', "♻️ Bu parametreler daha önce hesaplanmıştı, sonuçlar önbellekten yüklendi. 'Tahmin Sonuçları' sekmesine geçin.")
+                elif stored_id is not None:
+                    # Kayıtlı senaryo: satırlar depodan okunur, tahmin çalıştırılmaz
+                    with span('scenario_store.load'):
+                        stored_data, stored_metadata = get_scenario_store().load(stored_id)
+                    st.session_state.forecast_result = build_forecast_result(forecaster, stored_data, forecast_params, dataset_hash)
+                    forecast_cache_put(get_forecast_cache(dataset_hash), params_key, st.session_state.forecast_result)
+                    export_metrics()
+                    st.session_state.forecast_notice = ('success', f"🗄️ Bu parametreler '{stored_metadata['name']}' senaryosu olarak kayıtlı, sonuçlar depodan yüklendi. 'Tahmin Sonuçları' sekmesine geçin.")
+                else:
+                    # Tahmin arka planda hesaplanır; kısa işler beklenir, uzun işler aşağıda yoklanır
+                    if profile_run:
+                        # Profil iş thread'inde doldurulur, iş bitince Tanılama paneline alınır
+                        profile = ForecastProfile('Hesapla', replay=build_replay(forecaster, forecast_params))
+                        st.session_state.profile_next_run_reset = True
+                        load = lambda: profile_forecast(file_bytes, forecast_params)
+                    else:
+                        profile = None
+                        # Shadow karşılaştırması onaylı motorun sonucuna göredir
+                        run_shadow = (forecast_engine == 'legacy' and SHADOW_SAMPLE_RATE > 0
+                                      and random.random() < SHADOW_SAMPLE_RATE)
+                        load = lambda: compute_forecast(forecaster, forecast_params, run_shadow)
+                    
+                    # Adım başına ilerleme ve iptal: tahmin, özet/kalite, küp, karşılaştırma
+                    steps = []
+                    for label, func in forecast_result_steps(load, forecast_params, dataset_hash):
+                        if profile is not None:
+                            # Adımların profilleri tek kayıtta birleşir
+                            step = lambda func=func: trace.run(profile.run, func)
+                        else:
+                            step = lambda func=func: trace.run(func)
+                        steps.append((label, step))
+                    
+                    job_queue = get_job_queue()
+                    job_id = job_queue.submit('Tahmin', steps)
+                    if st.session_state.get('forecast_job') is not None:
+                        job_queue.cancel(st.session_state.forecast_job['id'])
+                    st.session_state.forecast_job = {'id': job_id, 'params_key': params_key, 'profile': profile}
+                    with span('job_queue.wait'):
+                        job_queue.wait(job_id, timeout=JOB_INLINE_WAIT_SECONDS)
+        
+        finish_forecast_job(dataset_hash)
+        
+        if st.session_state.get('forecast_job') is not None:
+            render_forecast_job()
+        
+        # Bildirim bir kez gösterilir
+        notice = st.session_state.pop('forecast_notice', None)
+        if notice is not None:
+            getattr(st, notice[0])(notice[1])
+    
+    # Tanılama paneli sayfa sonunda doldurulur (grafik süreleri de dahil olsun)
+    trace_panel = st.container()
+    
+    render_scenario_sweep(forecaster)
+    render_scenario_store(forecaster)
+
+# Geriye dönük test (gerçek tahmin doğruluğu)
+@st.fragment
+def render_backtest(forecaster):
+    """Backtest bölümü - ufuk seçimi ve çalıştırma sadece bu bölümü yeniden çalıştırır"""
+    with st.expander("🧪 Geriye Dönük Test (Backtest)"):
+        st.caption("Tahmin motoru geçmişteki her ay sonunda aynı parametrelerle yeniden çalıştırılır ve sonraki ayların gerçekleşen satışlarıyla karşılaştırılır.")
+    
+        backtest_horizon = st.slider("Tahmin Ufku (ay)", min_value=1, max_value=6, value=3, key='backtest_horizon')
+    
+        if st.button("🧪 Backtest Çalıştır", key='run_backtest'):
+            with st.spinner('Geçmiş kesim noktaları için tahminler hesaplanıyor...'):
+                # Streamlit sunucusu thread'li: tıklama başına process havuzu açılmaz, kesimler seri hesaplanır
+                st.session_state.backtest_result = forecaster.backtest(
+                    horizon=backtest_horizon,
+                    n_jobs=1,
+                    **st.session_state.forecast_result['params']
+                )
+    
+        backtest_result = st.session_state.get('backtest_result')
+        if backtest_result is not None:
+            overall = backtest_result['overall']
+    
+            col1, col2, col3 = st.columns(3)
+            col1.metric("MAPE", format_percent(overall['MAPE']), help="Grup-ay bazında ortalama mutlak yüzde hata")
+            col2.metric("WAPE", format_percent(overall['WAPE']), help="Toplam mutlak hata / toplam gerçekleşen")
+            col3.metric("Bias", format_percent(overall['Bias']), help="Pozitif = fazla tahmin, negatif = eksik tahmin")
+    
+            st.markdown("**Ufuk Bazında Hata**")
+            st.dataframe(
+                backtest_result['by_horizon'][['Horizon', 'N', 'MAPE', 'WAPE', 'Bias']].round(1),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+            st.markdown("**Ana Grup × Ufuk Bazında Hata**")
+            st.dataframe(
+                backtest_result['by_group_horizon'][['MainGroup', 'Horizon', 'N', 'MAPE', 'WAPE', 'Bias']].round(1),
+                use_container_width=True,
+                hide_index=True,
+                height=400
+            )
 
 # ==================== TAHMİN SONUÇLARI TAB ====================
-with main_tabs[1]:
+@st.fragment
+def render_forecast_results():
+    """Tahmin sonuçları - grafikler sadece tam yeniden çalıştırmada veya bu sekmedeki etkileşimde kurulur"""
     if st.session_state.forecast_result is None:
         st.warning("⚠️ Henüz tahmin hesaplanmadı. Lütfen 'Parametre Ayarları' sekmesinden parametreleri ayarlayıp '📊 Hesapla' butonuna basın.")
     else:
-        full_data = st.session_state.forecast_result['full_data']
-        summary = st.session_state.forecast_result['summary']
-        quality_metrics = st.session_state.forecast_result['quality_metrics']
+        # Grafik kütüphaneleri ilk tahminden sonra yüklenir (ilk sayfa açılışını yavaşlatmasın)
+        import plotly.graph_objects as go
+        import plotly.express as px
+        from plotly.subplots import make_subplots
+        
+        forecast_result = st.session_state.forecast_result
+        summary = forecast_result['summary']
+        quality_metrics = forecast_result['quality_metrics']
+        
+        # Tüm grafikler hazır toplamlardan dilimlenir
+        monthly_totals = forecast_result['monthly'].reset_index()
         
         st.markdown("## 📈 Özet Metrikler")
         
@@ -777,6 +1457,9 @@ with main_tabs[1]:
             if quality_metrics['avg_growth_2024_2025']:
                 st.caption(f"📈 2024→2025 Büyüme: %{quality_metrics['avg_growth_2024_2025']:.1f}")
         
+        # Geriye dönük test (gerçek tahmin doğruluğu)
+        render_backtest(forecaster)
+        
         st.markdown("---")
         
         # TABLAR
@@ -785,7 +1468,7 @@ with main_tabs[1]:
         with result_tabs[0]:
             st.subheader("Aylık Satış Trendi (2024-2026)")
             
-            monthly_sales = full_data.groupby(['Year', 'Month'])['Sales'].sum().reset_index()
+            monthly_sales = monthly_totals[['Year', 'Month', 'Sales']]
             
             fig = go.Figure()
             
@@ -818,15 +1501,8 @@ with main_tabs[1]:
             st.subheader("2026 vs 2025: Aylık Adet ve Ciro Değişimi")
             
             # 2025 ve 2026 aylık toplamları
-            monthly_2025 = full_data[full_data['Year'] == 2025].groupby('Month').agg({
-                'Quantity': 'sum',
-                'Sales': 'sum'
-            }).reset_index()
-            
-            monthly_2026 = full_data[full_data['Year'] == 2026].groupby('Month').agg({
-                'Quantity': 'sum',
-                'Sales': 'sum'
-            }).reset_index()
+            monthly_2025 = monthly_totals.loc[monthly_totals['Year'] == 2025, ['Month', 'Quantity', 'Sales']]
+            monthly_2026 = monthly_totals.loc[monthly_totals['Year'] == 2026, ['Month', 'Quantity', 'Sales']]
             
             # Merge
             change_data = monthly_2025.merge(monthly_2026, on='Month', suffixes=('_2025', '_2026'))
@@ -905,9 +1581,7 @@ with main_tabs[1]:
             # Brüt Marj Trendi
             st.subheader("Aylık Brüt Marj % Trendi")
             
-            monthly_margin = full_data.groupby(['Year', 'Month']).apply(
-                lambda x: (x['GrossProfit'].sum() / x['Sales'].sum() * 100) if x['Sales'].sum() > 0 else 0
-            ).reset_index(name='Margin%')
+            monthly_margin = monthly_totals[['Year', 'Month', 'Margin%']]
             
             fig2 = go.Figure()
             
@@ -938,7 +1612,7 @@ with main_tabs[1]:
         with result_tabs[1]:
             st.subheader("Ana Grup Bazında Performans")
             
-            group_sales = full_data.groupby(['Year', 'MainGroup'])['Sales'].sum().reset_index()
+            group_sales = forecast_result['yearly_group']['Sales'].reset_index()
             
             top_groups_2026 = group_sales[group_sales['Year'] == 2026].nlargest(10, 'Sales')['MainGroup'].tolist()
             
@@ -1065,297 +1739,376 @@ with main_tabs[1]:
             
             st.dataframe(summary_table, use_container_width=True, hide_index=True)
 
+with main_tabs[1]:
+    # Son Hesapla'nın sonucu ilk kez çizilirken grafik süresi de trace'e eklenir
+    forecast_trace = st.session_state.get('forecast_trace')
+    if (forecast_trace is not None and st.session_state.get('forecast_job') is None
+            and not forecast_trace.has('render_forecast_results')):
+        with forecast_trace.activate(), span('render_forecast_results'):
+            render_forecast_results()
+    else:
+        render_forecast_results()
+
 # ==================== DETAY VERİLER TAB ====================
+@st.fragment
+def render_detail_table(comparison_table):
+    """Ay bazında karşılaştırma tablosu - ay seçimi sadece bu bölümü yeniden çalıştırır"""
+    st.subheader("Detaylı Veri Tablosu - Yan Yana Karşılaştırma")
+    
+    selected_month = st.selectbox("Ay Seçin", list(range(1, 13)), format_func=lambda x: f"{x}. Ay")
+    
+    # Geniş tablo tahmin başına bir kez hazırlanır; ay seçimi sadece dilimler
+    comparison = month_comparison(comparison_table, selected_month)
+    days = DAYS_IN_MONTH[selected_month]
+    
+    display_df = comparison.copy()
+    
+    # Adet formatla (tam sayı)
+    for col in ['Adet_2024', 'Adet_2025', 'Adet_2026']:
+        if col in display_df.columns:
+            display_df[col] = format_number_column(display_df[col], 0)
+    
+    # Birim fiyat formatla (2 ondalık)
+    for col in ['BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026']:
+        if col in display_df.columns:
+            display_df[col] = format_number_column(display_df[col], 2, prefix="₺")
+    
+    # Para formatla
+    for col in ['Satış_2024', 'Stok_2024', 'SMM_2024', 'Satış_2025', 'Stok_2025', 'SMM_2025', 
+                'Satış_2026', 'Stok_2026', 'SMM_2026']:
+    
+        if col in display_df.columns:
+            display_df[col] = format_number_column(display_df[col], 0, prefix="₺")
+    
+    for col in ['BM%_2024', 'BM%_2025', 'BM%_2026']:
+        if col in display_df.columns:
+            display_df[col] = format_number_column(display_df[col] * 100, 1, prefix="%")
+    
+    for col in ['Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026']:
+        if col in display_df.columns:
+            display_df[col] = format_number_column(display_df[col], 2, localized=False)
+    
+    
+    display_df = display_df[[
+        'MainGroup',
+        'Adet_2024', 'Adet_2025', 'Adet_2026',
+        'BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026',
+        'Satış_2024', 'Satış_2025', 'Satış_2026',
+        'BM%_2024', 'BM%_2025', 'BM%_2026',
+        'Stok_2024', 'Stok_2025', 'Stok_2026',
+        'SMM_2024', 'SMM_2025', 'SMM_2026',
+        'Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026'
+    ]]
+    
+    display_df.columns = [
+        'Ana Grup',
+        'Adet 2024', 'Adet 2025', 'Adet 2026',
+        'Birim Fiyat 2024', 'Birim Fiyat 2025', 'Birim Fiyat 2026',
+        'Satış 2024', 'Satış 2025', 'Satış 2026',
+        'BM% 2024', 'BM% 2025', 'BM% 2026',
+        'Stok 2024', 'Stok 2025', 'Stok 2026',
+        'SMM 2024', 'SMM 2025', 'SMM 2026',
+        'Stok/SMM Hft. 2024', 'Stok/SMM Hft. 2025', 'Stok/SMM Hft. 2026'
+    ]
+    
+    
+    st.info(f"📅 {selected_month}. Ay ({days} gün) - Stok/SMM haftalık: (Stok / (SMM/{days})*7)")
+    
+    st.dataframe(
+        display_df,
+        use_container_width=True,
+        hide_index=True,
+        height=600
+    )
+    
+    # CSV için formatlı veri hazırla
+    csv_export = comparison.copy()
+    
+    # Adet formatla
+    for col in ['Adet_2024', 'Adet_2025', 'Adet_2026']:
+        if col in csv_export.columns:
+            csv_export[col] = positive_int_column(csv_export[col])
+    
+    # Birim fiyat formatla (2 ondalık)
+    for col in ['BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026']:
+        if col in csv_export.columns:
+            csv_export[col] = csv_export[col].round(2)
+    
+    # Para formatla (tam sayı)
+    for col in ['Satış_2024', 'Stok_2024', 'SMM_2024', 
+                'Satış_2025', 'Stok_2025', 'SMM_2025', 
+                'Satış_2026', 'Stok_2026', 'SMM_2026']:
+        if col in csv_export.columns:
+            csv_export[col] = positive_int_column(csv_export[col])
+    
+    # Brüt marj yüzde formatına çevir (Excel için)
+    for col in ['BM%_2024', 'BM%_2025', 'BM%_2026']:
+        if col in csv_export.columns:
+            csv_export[col] = (csv_export[col] * 100).round(1)
+    
+    # Stok/SMM 2 ondalık
+    for col in ['Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026']:
+        if col in csv_export.columns:
+            csv_export[col] = csv_export[col].round(2)
+    
+    st.download_button(
+        label="📥 CSV İndir (Sadece Bu Ay)",
+        data=csv_export.to_csv(index=False, encoding='utf-8-sig', decimal=',', sep=';').encode('utf-8-sig'),
+        file_name=f'budget_comparison_month_{selected_month}.csv',
+        mime='text/csv'
+    )
+
+
+# TOPLU CSV İNDİR - TÜM AYLAR VE GRUPLAR
+@st.fragment
+def render_bulk_export(comparison_table):
+    """Toplu CSV hazırlama - sadece bu bölümü yeniden çalıştırır"""
+    st.markdown("---")
+    st.subheader("📊 Toplu Veri İndirme - Tüm Aylar")
+    st.caption("2024, 2025 ve 2026 verilerinin tamamını ay ve ana grup detayında indirin")
+    
+    if st.button("🔄 Toplu CSV Hazırla", type="primary"):
+        with st.spinner("CSV dosyası hazırlanıyor..."):
+            # Tüm aylar için veri hazırla
+            full_comparison = build_bulk_comparison(comparison_table)
+    
+            # CSV'ye çevir - Türkiye formatı
+            csv_data = full_comparison.to_csv(index=False, encoding='utf-8-sig', sep=';', decimal=',')
+    
+            st.download_button(
+                label="📥 Toplu CSV İndir (Tüm Aylar ve Gruplar)",
+                data=csv_data.encode('utf-8-sig'),
+                file_name='butce_2024_2025_2026_tam_veri.csv',
+                mime='text/csv',
+                type='primary'
+            )
+    
+            st.success(f"✅ CSV hazır! Toplam {len(full_comparison)} satır veri")
+            st.info("💡 Excel'de açınca BrutMarj sütunlarına yüzde (%) formatı uygulayın.")
+    
+    # Excel dosyası tıklanınca üretilir (sayı ve yüzde formatları hazır, her görünüm ayrı sayfa)
+    st.download_button(
+        label="📗 Excel İndir (Tüm Aylar, Aylık ve Ana Grup Toplamları)",
+        data=lambda: comparison_xlsx_bytes(comparison_table),
+        file_name='butce_2024_2025_2026_karsilastirma.xlsx',
+        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+# SONUÇ KAYDETME - PARQUET / ARROW
+@st.fragment
+def render_result_export(forecast_result):
+    """Tahmin sonucunu tipli kolonlarla indir - dosya tıklanınca üretilir"""
+    st.markdown("---")
+    st.subheader("💾 Sonucu Kaydet (Parquet / Arrow)")
+    st.caption("BI araçları için tipli kolon formatı. Kaydedilen tahmin verisi soldaki menüden yeniden hesaplamadan yüklenebilir.")
+    
+    result_format = st.radio("Format", list(RESULT_FORMATS), horizontal=True, key='result_export_format')
+    extension = RESULT_FORMATS[result_format]
+    
+    col1, col2 = st.columns(2)
+    col1.download_button(
+        label="📦 Tahmin Verisi (full_data + parametreler)",
+        data=lambda: forecast_result_bytes(result_full_data(forecaster, forecast_result), result_format,
+                                           params=forecast_result['params'], dataset_hash=dataset_hash),
+        file_name=f'butce_tahmin{extension}',
+        mime='application/octet-stream'
+    )
+    col2.download_button(
+        label="📦 Yıllık Özet",
+        data=lambda: forecast_result_bytes(pd.DataFrame.from_dict(forecast_result['summary'], orient='index'),
+                                           result_format),
+        file_name=f'butce_ozet{extension}',
+        mime='application/octet-stream'
+    )
+
+
 with main_tabs[2]:
     if st.session_state.forecast_result is None:
         st.warning("⚠️ Önce tahmini hesaplayın.")
     else:
-        full_data = st.session_state.forecast_result['full_data']
-        
-        st.subheader("Detaylı Veri Tablosu - Yan Yana Karşılaştırma")
-        
-        selected_month = st.selectbox("Ay Seçin", list(range(1, 13)), format_func=lambda x: f"{x}. Ay")
-        
-        data_2024 = full_data[(full_data['Year'] == 2024) & (full_data['Month'] == selected_month)].copy()
-        data_2025 = full_data[(full_data['Year'] == 2025) & (full_data['Month'] == selected_month)].copy()
-        data_2026 = full_data[(full_data['Year'] == 2026) & (full_data['Month'] == selected_month)].copy()
+        comparison_table = result_comparison(forecaster, st.session_state.forecast_result)
         
-        days_in_month = {1: 31, 2: 28, 3: 31, 4: 30, 5: 31, 6: 30,
-                         7: 31, 8: 31, 9: 30, 10: 31, 11: 30, 12: 31}
-        days = days_in_month[selected_month]
-        
-        comparison = data_2024[['MainGroup', 'Quantity', 'UnitPrice', 'Sales', 'GrossMargin%', 'Stock', 'COGS']].rename(
-            columns={
-                'Quantity': 'Adet_2024',
-                'UnitPrice': 'BirimFiyat_2024',
-                'Sales': 'Satış_2024',
-                'GrossMargin%': 'BM%_2024',
-                'Stock': 'Stok_2024',
-                'COGS': 'SMM_2024'
+        render_detail_table(comparison_table)
+        render_bulk_export(comparison_table)
+        render_result_export(st.session_state.forecast_result)
+
+# TANILAMA - SON HESAPLA AŞAMA SÜRELERİ
+def render_trace_panel(trace):
+    """Son Hesapla çalıştırmasının iç içe aşama süreleri ve JSON / Chrome trace indirme"""
+    with st.expander("🩺 Tanılama: Hesapla aşama süreleri"):
+        rows = trace.rows()
+        total_ms = trace.total_ms()
+        st.caption(f"Toplam {total_ms:,.0f} ms".replace(",", ".") + " - iş kuyruğunda süren aşamalar bitince tamamlanır.")
+        
+        table = pd.DataFrame({
+            'Aşama': ["\u00a0\u00a0" * row['depth'] + ("└ " if row['depth'] else "") + row['name']
+                      + (f" #{row['args']['step']}" if 'step' in row['args'] else "") for row in rows],
+            'Süre (ms)': [row['duration_ms'] for row in rows],
+            'Başlangıç (ms)': [row['start_ms'] for row in rows],
+            'Thread': [row['thread'] for row in rows]
+        })
+        table['Pay (%)'] = table['Süre (ms)'] / total_ms * 100 if total_ms > 0 else 0.0
+        st.dataframe(
+            table,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Süre (ms)': st.column_config.NumberColumn(format="%.1f"),
+                'Başlangıç (ms)': st.column_config.NumberColumn(format="%.1f"),
+                'Pay (%)': st.column_config.ProgressColumn(format="%.1f", min_value=0, max_value=100)
             }
         )
-
-        comparison = comparison.merge(
-            data_2025[['MainGroup', 'Quantity', 'UnitPrice', 'Sales', 'GrossMargin%', 'Stock', 'COGS']].rename(
-                columns={
-                    'Quantity': 'Adet_2025',
-                    'UnitPrice': 'BirimFiyat_2025',
-                    'Sales': 'Satış_2025',
-                    'GrossMargin%': 'BM%_2025',
-                    'Stock': 'Stok_2025',
-                    'COGS': 'SMM_2025'
-                }
-            ),
         
-            on='MainGroup',
-            how='outer'
+        col1, col2, col3 = st.columns(3)
+        col1.download_button(
+            label="📥 JSON",
+            data=lambda: json.dumps(trace.to_json(), ensure_ascii=False, indent=2),
+            file_name='hesapla_trace.json',
+            mime='application/json'
         )
-        
-        comparison = comparison.merge(
-            data_2026[['MainGroup', 'Quantity', 'UnitPrice', 'Sales', 'GrossMargin%', 'Stock', 'COGS']].rename(
-                columns={
-                    'Quantity': 'Adet_2026',
-                    'UnitPrice': 'BirimFiyat_2026',
-                    'Sales': 'Satış_2026',
-                    'GrossMargin%': 'BM%_2026',
-                    'Stock': 'Stok_2026',
-                    'COGS': 'SMM_2026'
-                }
-            ),
-            on='MainGroup',
-            how='outer'
+        col2.download_button(
+            label="📥 Chrome Trace (chrome://tracing, Perfetto)",
+            data=lambda: json.dumps(trace.to_chrome_trace()),
+            file_name='hesapla_chrome_trace.json',
+            mime='application/json'
+        )
+        col3.download_button(
+            label="📥 Metrikler (Prometheus)",
+            data=render_prometheus,
+            file_name='budget_metrics.prom',
+            mime='text/plain'
+        )
+
+# TANILAMA - PROFİL
+PROFILE_SORTS = {'Kümülatif süre': 'cumulative', 'Kendi süresi': 'tottime'}
+
+def render_profile_panel(profile):
+    """Son profillenen hesaplamanın en pahalı fonksiyonları ve indirmeler"""
+    with st.expander(f"🔬 Profil: son profillenen hesaplama ({profile.seconds:.2f} sn)"):
+        st.caption("Excel okuma + tahmin + özetler cProfile altında. Ana grup adları anonimleştirilmiş parametrelerle "
+                   "`python forecast_profile.py <json>` aynı boyutta sentetik veriyle tekrar oynatır.")
+        
+        sort_label = st.radio("Sıralama", list(PROFILE_SORTS), horizontal=True, key='profile_sort')
+        table = pd.DataFrame(profile.top(limit=25, sort=PROFILE_SORTS[sort_label]))
+        st.dataframe(
+            table.rename(columns={'function': 'Fonksiyon', 'calls': 'Çağrı', 'primitive_calls': 'İlk Çağrı',
+                                  'tottime': 'Kendi (sn)', 'cumtime': 'Kümülatif (sn)'}),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Kendi (sn)': st.column_config.NumberColumn(format="%.4f"),
+                'Kümülatif (sn)': st.column_config.NumberColumn(format="%.4f")
+            }
         )
         
-        comparison = comparison.fillna(0)
-        
-        comparison['Stok/SMM_Haftalık_2024'] = np.where(
-            comparison['SMM_2024'] > 0,
-            comparison['Stok_2024'] / ((comparison['SMM_2024'] / days) * 7),
-            0
+        col1, col2, col3 = st.columns(3)
+        col1.download_button(
+            label="📥 pstats (.prof)",
+            data=profile.pstats_bytes,
+            file_name='hesapla.prof',
+            mime='application/octet-stream'
         )
-        comparison['Stok/SMM_Haftalık_2025'] = np.where(
-            comparison['SMM_2025'] > 0,
-            comparison['Stok_2025'] / ((comparison['SMM_2025'] / days) * 7),
-            0
+        col2.download_button(
+            label="📥 Flamegraph (katlanmış yığın)",
+            data=profile.collapsed_stacks,
+            file_name='hesapla.folded',
+            mime='text/plain'
         )
-        comparison['Stok/SMM_Haftalık_2026'] = np.where(
-            comparison['SMM_2026'] > 0,
-            comparison['Stok_2026'] / ((comparison['SMM_2026'] / days) * 7),
-            0
+        col3.download_button(
+            label="📥 Anonim parametreler (JSON)",
+            data=lambda: json.dumps(profile.replay_json(), ensure_ascii=False, indent=2),
+            file_name='hesapla_profil_parametreler.json',
+            mime='application/json'
         )
-        
-        display_df = comparison.copy()
-        
-        # Adet formatla (tam sayı)
-        for col in ['Adet_2024', 'Adet_2025', 'Adet_2026']:
-            if col in display_df.columns:
-                display_df[col] = display_df[col].apply(lambda x: format_number(x, 0) if x > 0 else "-")
-        
-        # Birim fiyat formatla (2 ondalık)
-        for col in ['BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026']:
-            if col in display_df.columns:
-                display_df[col] = display_df[col].apply(lambda x: f"₺{format_number(x, 2)}" if x > 0 else "-")
-        
-        # Para formatla
-        for col in ['Satış_2024', 'Stok_2024', 'SMM_2024', 'Satış_2025', 'Stok_2025', 'SMM_2025', 
-                    'Satış_2026', 'Stok_2026', 'SMM_2026']:
-                        
-            if col in display_df.columns:
-                display_df[col] = display_df[col].apply(lambda x: format_currency(x) if x > 0 else "-")
-        
-        for col in ['BM%_2024', 'BM%_2025', 'BM%_2026']:
-            if col in display_df.columns:
-                display_df[col] = display_df[col].apply(lambda x: format_percent(x*100, 1) if x > 0 else "-")
-        
-        for col in ['Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026']:
-            if col in display_df.columns:
-                display_df[col] = display_df[col].apply(lambda x: f"{x:.2f}" if x > 0 else "-")
-        
-        
-        display_df = display_df[[
-            'MainGroup',
-            'Adet_2024', 'Adet_2025', 'Adet_2026',
-            'BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026',
-            'Satış_2024', 'Satış_2025', 'Satış_2026',
-            'BM%_2024', 'BM%_2025', 'BM%_2026',
-            'Stok_2024', 'Stok_2025', 'Stok_2026',
-            'SMM_2024', 'SMM_2025', 'SMM_2026',
-            'Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026'
-        ]]
-        
-        display_df.columns = [
-            'Ana Grup',
-            'Adet 2024', 'Adet 2025', 'Adet 2026',
-            'Birim Fiyat 2024', 'Birim Fiyat 2025', 'Birim Fiyat 2026',
-            'Satış 2024', 'Satış 2025', 'Satış 2026',
-            'BM% 2024', 'BM% 2025', 'BM% 2026',
-            'Stok 2024', 'Stok 2025', 'Stok 2026',
-            'SMM 2024', 'SMM 2025', 'SMM 2026',
-            'Stok/SMM Hft. 2024', 'Stok/SMM Hft. 2025', 'Stok/SMM Hft. 2026'
-        ]
-        
-                
-        st.info(f"📅 {selected_month}. Ay ({days} gün) - Stok/SMM haftalık: (Stok / (SMM/{days})*7)")
-        
+
+if st.session_state.get('forecast_trace') is not None:
+    with trace_panel:
+        render_trace_panel(st.session_state.forecast_trace)
+
+if st.session_state.get('forecast_profile') is not None:
+    with trace_panel:
+        render_profile_panel(st.session_state.forecast_profile)
+
+# TANILAMA - BELLEK
+def render_memory_panel(session_memory, over_limit):
+    """Oturumun nesne boyutları, son tahmin çağrılarının tepe belleği ve (yönetici) tüm oturumlar"""
+    total_mb = sum(session_memory.values()) / MB
+    if over_limit:
+        st.warning(f"⚠️ Bu oturum {total_mb:,.0f} MB bellek tutuyor (eşik {SESSION_MEMORY_WARN_MB:,.0f} MB). "
+                   "Sayfayı yenilemek önbellekteki sonuçları serbest bırakır.")
+    
+    with st.expander(f"🧮 Bellek kullanımı: bu oturum {total_mb:,.1f} MB"):
         st.dataframe(
-            display_df,
+            pd.DataFrame({
+                'Oturum Anahtarı': list(session_memory),
+                'Boyut (MB)': [size / MB for size in session_memory.values()]
+            }).head(15),
             use_container_width=True,
             hide_index=True,
-            height=600
+            column_config={'Boyut (MB)': st.column_config.NumberColumn(format="%.2f")}
         )
         
-        # CSV için formatlı veri hazırla
-        csv_export = comparison.copy()
-        
-        # Adet formatla
-        for col in ['Adet_2024', 'Adet_2025', 'Adet_2026']:
-            if col in csv_export.columns:
-                csv_export[col] = csv_export[col].apply(lambda x: int(x) if x > 0 else 0)
-        
-        # Birim fiyat formatla (2 ondalık)
-        for col in ['BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026']:
-            if col in csv_export.columns:
-                csv_export[col] = csv_export[col].round(2)
-        
-        # Para formatla (tam sayı)
-        for col in ['Satış_2024', 'Stok_2024', 'SMM_2024', 
-                    'Satış_2025', 'Stok_2025', 'SMM_2025', 
-                    'Satış_2026', 'Stok_2026', 'SMM_2026']:
-            if col in csv_export.columns:
-                csv_export[col] = csv_export[col].apply(lambda x: int(x) if x > 0 else 0)
-        
-        # Brüt marj yüzde formatına çevir (Excel için)
-        for col in ['BM%_2024', 'BM%_2025', 'BM%_2026']:
-            if col in csv_export.columns:
-                csv_export[col] = (csv_export[col] * 100).round(1)
-        
-        # Stok/SMM 2 ondalık
-        for col in ['Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026']:
-            if col in csv_export.columns:
-                csv_export[col] = csv_export[col].round(2)
-        
-        st.download_button(
-            label="📥 CSV İndir (Sadece Bu Ay)",
-            data=csv_export.to_csv(index=False, encoding='utf-8-sig', decimal=',', sep=';').encode('utf-8-sig'),
-            file_name=f'budget_comparison_month_{selected_month}.csv',
-            mime='text/csv'
-        )
-        
-        # TOPLU CSV İNDİR - TÜM AYLAR VE GRUPLAR
-        st.markdown("---")
-        st.subheader("📊 Toplu Veri İndirme - Tüm Aylar")
-        st.caption("2024, 2025 ve 2026 verilerinin tamamını ay ve ana grup detayında indirin")
+        st.markdown("**Son tahmin çağrılarının tepe belleği (tracemalloc)**")
+        measurements = recent_measurements()[::-1][:20]
+        if not memory_tracking_enabled():
+            st.caption("Tepe bellek ölçümü kapalı - BUDGET_TRACE_MEMORY=1 ile açılır (hesaplamayı yavaşlatır).")
+        elif not measurements:
+            st.caption("Henüz ölçüm yok - '📊 Hesapla' ile bir tahmin çalıştırın.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    'Fonksiyon': [row['function'] for row in measurements],
+                    'Tepe (MB)': [row['peak_mb'] for row in measurements],
+                    'Süre (sn)': [row['seconds'] for row in measurements],
+                    'Thread': [row['thread'] for row in measurements],
+                    'Zaman': pd.to_datetime([row['time'] for row in measurements], unit='s')
+                }),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'Tepe (MB)': st.column_config.NumberColumn(format="%.1f"),
+                    'Süre (sn)': st.column_config.NumberColumn(format="%.2f")
+                }
+            )
         
-        if st.button("🔄 Toplu CSV Hazırla", type="primary"):
-            with st.spinner("CSV dosyası hazırlanıyor..."):
-                # Tüm aylar için veri hazırla
-                all_data = []
-                
-                for month in range(1, 13):
-                    month_data_2024 = full_data[(full_data['Year'] == 2024) & (full_data['Month'] == month)].copy()
-                    month_data_2025 = full_data[(full_data['Year'] == 2025) & (full_data['Month'] == month)].copy()
-                    month_data_2026 = full_data[(full_data['Year'] == 2026) & (full_data['Month'] == month)].copy()
-                    
-                    # 2024 verisi
-                    month_comparison = month_data_2024[['MainGroup', 'Quantity', 'UnitPrice', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS']].rename(
-                        columns={
-                            'Quantity': 'Adet_2024',
-                            'UnitPrice': 'BirimFiyat_2024',
-                            'Sales': 'Satis_2024',
-                            'GrossProfit': 'BrutKar_2024',
-                            'GrossMargin%': 'BrutMarj_2024',
-                            'Stock': 'Stok_2024',
-                            'COGS': 'SMM_2024'
-                        }
-                    )
-                    
-                    # 2025 verisi
-                    month_comparison = month_comparison.merge(
-                        month_data_2025[['MainGroup', 'Quantity', 'UnitPrice', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS']].rename(
-                            columns={
-                                'Quantity': 'Adet_2025',
-                                'UnitPrice': 'BirimFiyat_2025',
-                                'Sales': 'Satis_2025',
-                                'GrossProfit': 'BrutKar_2025',
-                                'GrossMargin%': 'BrutMarj_2025',
-                                'Stock': 'Stok_2025',
-                                'COGS': 'SMM_2025'
-                            }
-                        ),
-                        on='MainGroup',
-                        how='outer'
-                    )
-                    
-                    # 2026 verisi
-                    month_comparison = month_comparison.merge(
-                        month_data_2026[['MainGroup', 'Quantity', 'UnitPrice', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS']].rename(
-                            columns={
-                                'Quantity': 'Adet_2026',
-                                'UnitPrice': 'BirimFiyat_2026',
-                                'Sales': 'Satis_2026',
-                                'GrossProfit': 'BrutKar_2026',
-                                'GrossMargin%': 'BrutMarj_2026',
-                                'Stock': 'Stok_2026',
-                                'COGS': 'SMM_2026'
-                            }
-                        ),
-                        on='MainGroup',
-                        how='outer'
+        if MEMORY_ADMIN:
+            st.markdown("**Tüm oturumlar (yönetici)**")
+            sessions = get_session_memory_registry().list_sessions()
+            st.dataframe(
+                pd.DataFrame({
+                    'Oturum': [entry['session'] for entry in sessions],
+                    'Dosya': [entry['label'] for entry in sessions],
+                    'Toplam (MB)': [entry['total_bytes'] / MB for entry in sessions],
+                    'En Büyük Anahtar': [next(iter(entry['sizes']), None) for entry in sessions],
+                    'Son Ölçüm': pd.to_datetime([entry['updated'] for entry in sessions], unit='s')
+                }),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'Toplam (MB)': st.column_config.ProgressColumn(
+                        format="%.1f", min_value=0,
+                        max_value=max([SESSION_MEMORY_WARN_MB] + [entry['total_bytes'] / MB for entry in sessions])
                     )
-                    
-                    month_comparison = month_comparison.fillna(0)
-                    month_comparison.insert(0, 'Ay', month)
-                    
-                    all_data.append(month_comparison)
-                
-                # Tüm ayları birleştir
-                full_comparison = pd.concat(all_data, ignore_index=True)
-                
-                # Sütun sırası düzenle
-                column_order = ['Ay', 'MainGroup',
-                               'Adet_2024', 'Adet_2025', 'Adet_2026',
-                               'BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026',
-                               'Satis_2024', 'Satis_2025', 'Satis_2026',
-                               'BrutKar_2024', 'BrutKar_2025', 'BrutKar_2026',
-                               'BrutMarj_2024', 'BrutMarj_2025', 'BrutMarj_2026',
-                               'Stok_2024', 'Stok_2025', 'Stok_2026',
-                               'SMM_2024', 'SMM_2025', 'SMM_2026']
-                
-                full_comparison = full_comparison[column_order]
-                
-                # FORMATLAMA
-                # Adet - tam sayı
-                for col in ['Adet_2024', 'Adet_2025', 'Adet_2026']:
-                    full_comparison[col] = full_comparison[col].apply(lambda x: int(x) if x > 0 else 0)
-                
-                # Birim fiyat - 2 ondalık
-                for col in ['BirimFiyat_2024', 'BirimFiyat_2025', 'BirimFiyat_2026']:
-                    full_comparison[col] = full_comparison[col].round(2)
-                
-                # Para - tam sayı
-                for col in ['Satis_2024', 'Satis_2025', 'Satis_2026',
-                           'BrutKar_2024', 'BrutKar_2025', 'BrutKar_2026',
-                           'Stok_2024', 'Stok_2025', 'Stok_2026',
-                           'SMM_2024', 'SMM_2025', 'SMM_2026']:
-                    full_comparison[col] = full_comparison[col].apply(lambda x: int(x) if x > 0 else 0)
-                
-                # BrutMarj yüzde formatı (Excel için)
-                for col in ['BrutMarj_2024', 'BrutMarj_2025', 'BrutMarj_2026']:
-                    full_comparison[col] = (full_comparison[col] * 100).round(1)
-                
-                # CSV'ye çevir - Türkiye formatı
-                csv_data = full_comparison.to_csv(index=False, encoding='utf-8-sig', sep=';', decimal=',')
-                
-                st.download_button(
-                    label="📥 Toplu CSV İndir (Tüm Aylar ve Gruplar)",
-                    data=csv_data.encode('utf-8-sig'),
-                    file_name='butce_2024_2025_2026_tam_veri.csv',
-                    mime='text/csv',
-                    type='primary'
-                )
-                
-                st.success(f"✅ CSV hazır! Toplam {len(full_comparison)} satır veri")
-                st.info("💡 Excel'de açınca BrutMarj sütunlarına yüzde (%) formatı uygulayın.")
+                }
+            )
+
+# Oturum boyutu her tam çalıştırmanın sonunda ölçülür (sonuçlar ve önbellek bu çalıştırmada güncellenmiş olur)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:8]
+# Kimliği değişmeyen nesneler (sonuç, önbellek) yeniden yürünmez - ölçüm önbelleği oturumda tutulur
+if 'memory_measure_cache' not in st.session_state:
+    st.session_state.memory_measure_cache = {}
+# Güncel sonuç önce ölçülür (önbellekte de duruyorsa boyutu forecast_cache'e değil ona yazılsın)
+state_keys = sorted((key for key in st.session_state.keys() if key != 'memory_measure_cache'),
+                    key=lambda key: key != 'forecast_result')
+session_memory = measure_state({key: st.session_state[key] for key in state_keys},
+                               cache=st.session_state.memory_measure_cache)
+session_over_limit = get_session_memory_registry().update(
+    st.session_state.session_id, session_memory, label=st.session_state.get('last_uploaded_file')
+)
+with trace_panel:
+    render_memory_panel(session_memory, session_over_limit)
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,318 @@
+"""
+Toplu tahmin - Streamlit olmadan bir veya daha fazla Excel ve senaryo dosyası için tahmin üretir
+
+Kullanım:
+    python batch_forecast.py veri.xlsx                                  # varsayılan parametreler
+    python batch_forecast.py a.xlsx b.xlsx --params normal.json iyimser.json --workers 4
+    python batch_forecast.py veri.xlsx --params senaryolar/*.json --output-dir cikti --xlsx
+
+Senaryo dosyası (JSON, uygulamadaki birimlerle; verilmeyen alanlar uygulama varsayılanıdır):
+    {
+        "name": "iyimser",
+        "margin_improvement": 2.0,          # brüt marj iyileşme (puan)
+        "stock_change_pct": 0.0,            # stok değişimi (%)
+        "inflation_past": 35.0,             # 2024→2025 enflasyon (%)
+        "inflation_future": 25.0,           # 2025→2026 enflasyon (%)
+        "organic_multiplier": 1.0,          # 0 = Çekimser, 0.5 = Normal, 1 = İyimser
+        "monthly_targets": "aylik.csv",     # Ay;Hedef (%)   veya {"1": 20, ...}
+        "maingroup_targets": "gruplar.csv", # Ana Grup;Hedef (%)   veya {"Grup A": 25, ...}
+        "lessons_learned": "dersler.csv",   # Ana Grup;1;...;12   veya {"Grup A": {"3": -2}}
+        "price_changes": "fiyat.csv",       # Ana Grup;1;...;12 (%)   veya {"Grup A": [30, 30, ...]}
+        "num_months": 15,                   # tahmin ufku (ay, 1-36)
+        "engine": "vectorized"              # legacy | vectorized | model (grup başına trend + mevsimsellik)
+    }
+CSV yolları senaryo dosyasına göredir; ';' ayraçlı dosyalarda ondalık ',' kabul edilir.
+Tablolarda olmayan ana gruplar/aylar varsayılan değeri alır; Excel'de olmayan bir ana grup verilirse o iş hata verir.
+
+Her (Excel, senaryo) için çıktı: <output-dir>/<excel>/<senaryo>/
+    full_data.parquet (tipli, parametreler metadata'da), summary.csv, comparison.csv [, comparison.xlsx]
+<output-dir>/batch_report.json iş bazında süreleri, <output-dir>/metrics.prom iş sayaçları ve süre
+histogramlarını (Prometheus metin formatı) içerir.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from budget_forecast import FORECAST_ENGINES, BudgetForecaster, build_forecast_params
+from budget_export import build_comparison_table, bulk_comparison_csv, write_comparison_xlsx, write_forecast_result
+from forecast_metrics import configure_logging, counter, histogram, write_prometheus
+
+
+# Uygulamadaki varsayılanlarla aynı
+DEFAULT_SCENARIO = {
+    'name': 'varsayilan',
+    'margin_improvement': 2.0,
+    'stock_change_pct': 0.0,
+    'inflation_past': 35.0,
+    'inflation_future': 25.0,
+    'organic_multiplier': 0.5,
+    'monthly_targets': None,
+    'maingroup_targets': None,
+    'lessons_learned': None,
+    'price_changes': None,
+    'num_months': 15,
+    'engine': 'legacy'
+}
+
+MONTH_COLUMNS = [str(month) for month in range(1, 13)]
+
+# Senaryo başına izin verilen en uzun tahmin ufku (ay) - sınırsız ufuk bir worker'ı süresiz tutar
+MAX_FORECAST_MONTHS = 36
+
+# İş metrikleri ana süreçte iş sonuçlarından işlenir (worker süreçlerindeki sayaçlar ana sürece gelmez)
+BATCH_JOBS = counter('budget_batch_jobs_total', 'Toplu tahmin işleri', ('result',))
+BATCH_ROWS = counter('budget_batch_rows_total', 'Toplu tahminde üretilen full_data satırları')
+BATCH_JOB_SECONDS = histogram('budget_batch_job_seconds', 'Toplu tahmin iş aşaması süresi', ('stage',))
+
+# Worker süreci başına yüklenmiş forecaster'lar - aynı Excel her süreçte bir kez okunur
+_WORKER_FORECASTERS = {}
+
+
+def load_scenario(path):
+    """Senaryo JSON'unu oku, varsayılanlarla tamamla; CSV yollarını dosyaya göre çöz"""
+    with open(path, encoding='utf-8') as f:
+        scenario = json.load(f)
+
+    unknown = set(scenario) - set(DEFAULT_SCENARIO)
+    if unknown:
+        raise ValueError(f"{path}: bilinmeyen alan(lar): {', '.join(sorted(unknown))}")
+
+    scenario = {**DEFAULT_SCENARIO, 'name': os.path.splitext(os.path.basename(path))[0], **scenario}
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for key in ('monthly_targets', 'maingroup_targets', 'lessons_learned', 'price_changes'):
+        if isinstance(scenario[key], str):
+            scenario[key] = os.path.join(base_dir, scenario[key])
+    return scenario
+
+
+def read_table_csv(path):
+    """Parametre CSV'si oku - ';' ayraçlı (Türkçe Excel) dosyalarda ondalık ','"""
+    with open(path, encoding='utf-8-sig') as f:
+        first_line = f.readline()
+    if ';' in first_line:
+        table = pd.read_csv(path, sep=';', decimal=',', encoding='utf-8-sig')
+    else:
+        table = pd.read_csv(path, encoding='utf-8-sig')
+    table.columns = [str(column).strip() for column in table.columns]
+    return table
+
+
+def _value_table(spec, keys, key_column, default):
+    """Ay veya ana grup bazında tek değerli hedef tablosu (Ay/Ana Grup, Hedef (%))"""
+    values = pd.Series(float(default), index=pd.Index(keys, name=key_column))
+
+    if isinstance(spec, str):
+        spec = read_table_csv(spec).set_index(key_column)['Hedef (%)'].to_dict()
+    if spec:
+        cast = int if key_column == 'Ay' else str
+        overrides = {cast(key): float(value) for key, value in spec.items()}
+        unknown = set(overrides) - set(keys)
+        if unknown:
+            raise ValueError(f"Bilinmeyen {key_column}: {', '.join(map(str, sorted(unknown)))}")
+        values.update(pd.Series(overrides))
+
+    return values.rename('Hedef (%)').reset_index()
+
+
+def _group_month_table(spec, main_groups, default):
+    """Ana grup × 12 ay tablosu; verilmeyen hücreler varsayılan değerle"""
+    table = pd.DataFrame(np.full((len(main_groups), 12), float(default)),
+                         index=pd.Index(main_groups, name='Ana Grup'), columns=MONTH_COLUMNS)
+
+    if isinstance(spec, str):
+        overrides = read_table_csv(spec).set_index('Ana Grup')
+        overrides.columns = [str(column) for column in overrides.columns]
+        overrides = overrides[[column for column in MONTH_COLUMNS if column in overrides.columns]]
+    elif spec:
+        overrides = pd.DataFrame({
+            group: dict(zip(MONTH_COLUMNS, row)) if isinstance(row, list) else {str(k): v for k, v in row.items()}
+            for group, row in spec.items()
+        }).T
+    else:
+        overrides = None
+
+    if overrides is not None:
+        unknown = set(overrides.index) - set(main_groups)
+        if unknown:
+            raise ValueError(f"Bilinmeyen ana grup(lar): {', '.join(sorted(map(str, unknown)))}")
+        table.update(overrides.astype(float))
+
+    return table.reset_index()
+
+
+def scenario_params(scenario, main_groups):
+    """Senaryoyu uygulamadaki Hesapla ile aynı forecast_future_months parametrelerine çevir"""
+    num_months = scenario['num_months']
+    if isinstance(num_months, bool) or not isinstance(num_months, (int, np.integer)) \
+            or not 1 <= num_months <= MAX_FORECAST_MONTHS:
+        raise ValueError(f"num_months 1-{MAX_FORECAST_MONTHS} arası bir tam sayı olmalı: {num_months!r}")
+    if scenario['engine'] not in FORECAST_ENGINES:
+        raise ValueError(f"Bilinmeyen tahmin motoru: {scenario['engine']!r} ({' | '.join(FORECAST_ENGINES)})")
+
+    inflation_past = scenario['inflation_past']
+    inflation_future = scenario['inflation_future']
+
+    params = build_forecast_params(
+        _value_table(scenario['monthly_targets'], list(range(1, 13)), 'Ay', 20.0),
+        _value_table(scenario['maingroup_targets'], main_groups, 'Ana Grup', 20.0),
+        _group_month_table(scenario['lessons_learned'], main_groups, 0),
+        _group_month_table(scenario['price_changes'], main_groups, inflation_future),
+        margin_improvement=scenario['margin_improvement'] / 100,
+        stock_change_pct=scenario['stock_change_pct'] / 100,
+        inflation_adjustment=inflation_future / inflation_past if inflation_past > 0 else 1.0,
+        organic_multiplier=scenario['organic_multiplier'],
+        inflation_rate=inflation_future / 100
+    )
+    params['num_months'] = int(num_months)
+    params['engine'] = scenario['engine']
+    return params
+
+
+def _load_forecaster(workbook):
+    """Worker süreci içinde Excel'i bir kez oku; (forecaster, içerik hash'i, okuma süresi)"""
+    if workbook not in _WORKER_FORECASTERS:
+        start = time.perf_counter()
+        with open(workbook, 'rb') as f:
+            content = f.read()
+        forecaster = BudgetForecaster(content)
+        _WORKER_FORECASTERS[workbook] = (forecaster, hashlib.sha256(content).hexdigest(),
+                                         time.perf_counter() - start)
+        return _WORKER_FORECASTERS[workbook]
+
+    forecaster, dataset_hash, _ = _WORKER_FORECASTERS[workbook]
+    return forecaster, dataset_hash, 0.0
+
+
+def run_job(workbook, scenario, output_dir, write_xlsx=False):
+    """Tek (Excel, senaryo) tahmini - process pool worker'ı; çıktıları yazar, ölçümleri döndürür"""
+    job = {
+        'workbook': workbook,
+        'scenario': scenario['name'],
+        'status': 'ok'
+    }
+    start = time.perf_counter()
+
+    try:
+        forecaster, dataset_hash, load_seconds = _load_forecaster(workbook)
+        main_groups = sorted(forecaster.data['MainGroup'].unique().tolist())
+        params = scenario_params(scenario, main_groups)
+
+        forecast_start = time.perf_counter()
+        full_data = forecaster.get_full_data_with_forecast(**params)
+        forecast_seconds = time.perf_counter() - forecast_start
+
+        job_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(workbook))[0], scenario['name'])
+        os.makedirs(job_dir, exist_ok=True)
+
+        write_forecast_result(full_data, os.path.join(job_dir, 'full_data.parquet'),
+                              params=params, dataset_hash=dataset_hash)
+        summary = forecaster.get_summary_stats(full_data, as_frame=True)
+        summary.to_csv(os.path.join(job_dir, 'summary.csv'), sep=';', decimal=',', encoding='utf-8-sig')
+
+        comparison = build_comparison_table(full_data)
+        with open(os.path.join(job_dir, 'comparison.csv'), 'w', encoding='utf-8-sig', newline='') as f:
+            f.write(bulk_comparison_csv(comparison))
+        if write_xlsx:
+            write_comparison_xlsx(comparison, os.path.join(job_dir, 'comparison.xlsx'))
+
+        sales_2026 = summary.loc[2026, 'Total_Sales'] if 2026 in summary.index else 0.0
+        job.update({
+            'series': len(main_groups),
+            'rows': len(full_data),
+            'load_seconds': load_seconds,
+            'forecast_seconds': forecast_seconds,
+            'sales_2026': float(sales_2026),
+            'output_dir': job_dir
+        })
+    except Exception as e:
+        job['status'] = f'hata: {type(e).__name__}: {e}'
+
+    job['seconds'] = time.perf_counter() - start
+    return job
+
+
+def record_job_metrics(job):
+    """Bitmiş işin sonucunu sayaç ve histogramlara işle"""
+    succeeded = job['status'] == 'ok'
+    BATCH_JOBS.inc(result='ok' if succeeded else 'error')
+    BATCH_JOB_SECONDS.observe(job['seconds'], stage='total')
+    if succeeded:
+        BATCH_ROWS.inc(job['rows'])
+        BATCH_JOB_SECONDS.observe(job['load_seconds'], stage='load')
+        BATCH_JOB_SECONDS.observe(job['forecast_seconds'], stage='forecast')
+
+
+def print_throughput(jobs, wall_seconds, workers):
+    """İş bazında sonuçlar ve toplam throughput"""
+    print(f"\n{'Excel':<28}{'Senaryo':<20}{'Seri':>6}{'Satır':>8}{'Süre (ms)':>12}{'2026 Satış':>20}  Durum")
+    for job in jobs:
+        print(f"{os.path.basename(job['workbook'])[:27]:<28}{job['scenario'][:19]:<20}"
+              f"{job.get('series', 0):>6}{job.get('rows', 0):>8}{job['seconds'] * 1000:>12.1f}"
+              f"{job.get('sales_2026', 0):>20,.0f}  {job['status']}")
+
+    succeeded = [job for job in jobs if job['status'] == 'ok']
+    job_seconds = np.array([job['seconds'] for job in succeeded]) if succeeded else np.zeros(1)
+    total_rows = sum(job['rows'] for job in succeeded)
+
+    print(f"\n⏱️ {len(succeeded)}/{len(jobs)} iş, {workers} worker, {wall_seconds:.2f}s duvar saati")
+    print(f"   {len(succeeded) / wall_seconds:.2f} iş/sn, {total_rows / wall_seconds:,.0f} satır/sn")
+    print(f"   İş süresi p50 {np.percentile(job_seconds, 50) * 1000:.0f}ms, "
+          f"p95 {np.percentile(job_seconds, 95) * 1000:.0f}ms, maks {job_seconds.max() * 1000:.0f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Toplu bütçe tahmini (Streamlit olmadan)")
+    parser.add_argument('workbooks', nargs='+', help="Excel dosyaları ('Sayfa1' formatı)")
+    parser.add_argument('--params', nargs='+', default=[], help="Senaryo JSON dosyaları (yoksa varsayılan senaryo)")
+    parser.add_argument('--output-dir', default='batch_output', help="Çıktı klasörü")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Paralel worker süreç sayısı")
+    parser.add_argument('--xlsx', action='store_true', help="comparison.xlsx de yaz")
+    parser.add_argument('--log-level', default=None, help="DEBUG, INFO, WARNING... (varsayılan BUDGET_LOG_LEVEL veya INFO)")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    scenarios = [load_scenario(path) for path in args.params] or [dict(DEFAULT_SCENARIO)]
+    names = [scenario['name'] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        parser.error(f"Senaryo adları benzersiz olmalı: {', '.join(names)}")
+
+    # Aynı Excel'in işleri art arda - her worker aynı dosyayı tekrar okumasın diye
+    tasks = [(workbook, scenario) for workbook in args.workbooks for scenario in scenarios]
+    workers = max(1, min(args.workers, len(tasks)))
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_job, workbook, scenario, args.output_dir, args.xlsx)
+                       for workbook, scenario in tasks]
+            for future in as_completed(futures):
+                job = future.result()
+                print(f"{'✅' if job['status'] == 'ok' else '❌'} {job['workbook']} / {job['scenario']}")
+            jobs = [future.result() for future in futures]
+    else:
+        jobs = [run_job(workbook, scenario, args.output_dir, args.xlsx) for workbook, scenario in tasks]
+    wall_seconds = time.perf_counter() - start
+
+    for job in jobs:
+        record_job_metrics(job)
+    print_throughput(jobs, wall_seconds, workers)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    report_path = os.path.join(args.output_dir, 'batch_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({'workers': workers, 'wall_seconds': wall_seconds, 'jobs': jobs}, f, indent=2, ensure_ascii=False)
+    write_prometheus(os.path.join(args.output_dir, 'metrics.prom'))
+    print(f"\n💾 Rapor: {report_path}")
+
+    return 0 if all(job['status'] == 'ok' for job in jobs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Performans benchmark'ı - sentetik Excel verisiyle forecaster ve app hattını ölçer
+
+Kullanım:
+    python benchmark.py                               # small + medium
+    python benchmark.py --tiers large --repeat 5
+    python benchmark.py --save baseline.json          # referans sonuçları kaydet
+    python benchmark.py --baseline baseline.json      # gerileme varsa exit code 1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from openpyxl import Workbook
+
+from budget_forecast import BudgetForecaster
+from budget_export import build_comparison_table, bulk_comparison_csv, comparison_xlsx_bytes, diff_forecasts
+
+
+# Boyut seviyeleri: grup × mağaza = seri sayısı
+TIERS = {
+    'small': {'groups': 20, 'stores': 1},
+    'medium': {'groups': 100, 'stores': 5},
+    'large': {'groups': 250, 'stores': 20}
+}
+
+# Soğuk import süresi ölçülen modüller (worker başlangıcı ve ilk sayfa açılışı)
+IMPORT_MODULES = ['budget_forecast', 'budget_export']
+
+# Excel'deki yıl blokları (2024 ve 2025 aynı satırda yan yana)
+YEAR_COLUMNS = ['TY Sales Unit', 'TY Sales Value TRY2', 'TY Gross Profit TRY2',
+                'TY Gross Marjin TRY%', 'TY Avg Store Stock Cost TRY2']
+
+
+def make_synthetic_workbook(path, groups=20, stores=1, years=2, last_actual_month=10, seed=42):
+    """
+    Uygulamanın beklediği formatta sentetik Excel üret ('Sayfa1', header 2. satır)
+
+    Parameters:
+    -----------
+    groups: Ana grup sayısı
+    stores: Mağaza sayısı - motor mağaza boyutu taşımadığı için her mağaza × grup ayrı MainGroup olur
+    years: Dolu yıl bloğu sayısı (1 = sadece 2024, 2 = 2024 + 2025)
+    last_actual_month: 2025'te gerçekleşen son ay (years=2 için)
+    """
+    rng = np.random.default_rng(seed)
+
+    group_names = [
+        f'M{store:03d} - Grup {group:04d}' if stores > 1 else f'Grup {group:04d}'
+        for store in range(1, stores + 1)
+        for group in range(1, groups + 1)
+    ]
+    n = len(group_names)
+
+    # Grup bazında seviye, marj ve stok gün sayısı; ay bazında mevsimsellik
+    base_sales = rng.lognormal(mean=13.5, sigma=0.8, size=n)
+    margins = rng.uniform(0.2, 0.5, size=n)
+    stock_ratio = rng.uniform(1.0, 4.0, size=n)
+    prices = rng.uniform(20, 500, size=n)
+    seasonality = 1 + 0.25 * np.sin(np.arange(1, 13) / 12 * 2 * np.pi) + rng.normal(0, 0.05, size=12)
+    growth = rng.normal(0.4, 0.1, size=n)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sayfa1')
+    ws.append(['Satış Raporu'])
+    ws.append(['Month', 'MainGroupDesc'] + YEAR_COLUMNS + YEAR_COLUMNS)
+
+    for month in range(1, 13):
+        noise = rng.normal(1.0, 0.08, size=(2, n))
+        sales_2024 = base_sales * seasonality[month - 1] * noise[0]
+        sales_2025 = sales_2024 * (1 + growth) * noise[1]
+        if years < 2 or month > last_actual_month:
+            sales_2025 = np.zeros(n)
+
+        for i, name in enumerate(group_names):
+            blocks = []
+            for sales in (sales_2024[i], sales_2025[i]):
+                gross_profit = sales * margins[i]
+                blocks += [
+                    round(sales / prices[i]),
+                    round(sales, 2),
+                    round(gross_profit, 2),
+                    round(margins[i], 4) if sales > 0 else 0,
+                    round((sales - gross_profit) * stock_ratio[i], 2)
+                ]
+            ws.append([month, name] + blocks)
+
+        ws.append([f'{month} Toplam', None] + [None] * 10)
+
+    wb.save(path)
+    return group_names
+
+
+def default_forecast_params(main_groups, inflation_past=35.0, inflation_future=25.0):
+    """app.py varsayılan tablolarıyla aynı tahmin parametreleri"""
+    return {
+        'growth_param': 0.2,
+        'margin_improvement': 0.02,
+        'stock_change_pct': 0.0,
+        'monthly_growth_targets': {month: 0.2 for month in range(1, 13)},
+        'maingroup_growth_targets': {group: 0.2 for group in main_groups},
+        'lessons_learned': {(group, month): 0 for group in main_groups for month in range(1, 13)},
+        'inflation_adjustment': inflation_future / inflation_past,
+        'organic_multiplier': 0.5,
+        'price_change_matrix': {(group, month): inflation_future / 100 for group in main_groups for month in range(1, 13)},
+        'inflation_rate': inflation_future / 100
+    }
+
+
+def measure(func, repeat):
+    """En iyi süre (sn) ve tracemalloc tepe belleği (MB) ölç, son sonucu döndür"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        timings.append(time.perf_counter() - start)
+
+    # Bellek ölçümü ayrı koşuda (tracemalloc süreyi yavaşlatır)
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, min(timings), peak / 1024 / 1024
+
+
+def run_tier(name, groups, stores, years=2, last_actual_month=10, repeat=3):
+    """Bir boyut seviyesi için tüm adımları ölç"""
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f'benchmark_{name}.xlsx')
+        make_synthetic_workbook(path, groups=groups, stores=stores, years=years,
+                                last_actual_month=last_actual_month)
+
+        forecaster, seconds, peak_mb = measure(lambda: BudgetForecaster(path), repeat)
+        results['init'] = {'seconds': seconds, 'peak_mb': peak_mb}
+
+    main_groups = sorted(forecaster.data['MainGroup'].unique().tolist())
+    params = default_forecast_params(main_groups)
+
+    steps = [
+        ('forecast_future_months', lambda: forecaster.forecast_future_months(**params)),
+        ('forecast_future_months[vectorized]', lambda: forecaster.forecast_future_months(engine='vectorized', **params)),
+        ('forecast_future_months[model]', lambda: forecaster.forecast_future_months(engine='model', **params)),
+        ('get_full_data_with_forecast', lambda: forecaster.get_full_data_with_forecast(**params))
+    ]
+    for step, func in steps:
+        full_data, seconds, peak_mb = measure(func, repeat)
+        results[step] = {'seconds': seconds, 'peak_mb': peak_mb}
+
+    steps = [
+        ('get_summary_stats', lambda: forecaster.get_summary_stats(full_data)),
+        ('get_forecast_quality_metrics', lambda: forecaster.get_forecast_quality_metrics(full_data)),
+        ('comparison_table', lambda: build_comparison_table(full_data))
+    ]
+    for step, func in steps:
+        result, seconds, peak_mb = measure(func, repeat)
+        results[step] = {'seconds': seconds, 'peak_mb': peak_mb}
+
+    comparison = result
+    _, seconds, peak_mb = measure(lambda: bulk_comparison_csv(comparison), repeat)
+    results['bulk_csv'] = {'seconds': seconds, 'peak_mb': peak_mb}
+
+    _, seconds, peak_mb = measure(lambda: comparison_xlsx_bytes(comparison), repeat)
+    results['bulk_xlsx'] = {'seconds': seconds, 'peak_mb': peak_mb}
+
+    # Senaryo farkı: aynı veri setinde farklı organik çarpanla ikinci sonuç
+    other_data = forecaster.get_full_data_with_forecast(**{**params, 'organic_multiplier': 1.0})
+    _, seconds, peak_mb = measure(lambda: diff_forecasts(full_data, other_data), repeat)
+    results['scenario_diff'] = {'seconds': seconds, 'peak_mb': peak_mb}
+
+    return {
+        'series': len(main_groups),
+        'rows': len(full_data),
+        'steps': results
+    }
+
+
+def profile_imports(modules=IMPORT_MODULES, repeat=3, top=5):
+    """
+    Modüllerin soğuk import süresini ayrı süreçte `python -X importtime` ile ölç
+
+    Her modül için en iyi kümülatif süre ve o modülün altındaki en ağır doğrudan importlar döner.
+    """
+    results = {}
+    heaviest = {}
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    for module in modules:
+        timings = []
+        for _ in range(repeat):
+            completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                       cwd=cwd, capture_output=True, text=True, check=True)
+
+            # Satır formatı: "import time: self [us] | cumulative | imported package" (girinti = derinlik)
+            entries = []
+            for line in completed.stderr.splitlines():
+                if not line.startswith('import time:') or 'cumulative' in line:
+                    continue
+                _, cumulative, name = line[len('import time:'):].split('|')
+                depth = (len(name) - len(name.lstrip())) // 2
+                entries.append((name.strip(), depth, int(cumulative) / 1e6))
+
+            total = next(seconds for name, depth, seconds in entries if name == module and depth == 0)
+            timings.append(total)
+
+        results[f'import {module}'] = {'seconds': min(timings), 'peak_mb': None}
+        children = sorted((entry for entry in entries if entry[1] == 1), key=lambda entry: -entry[2])
+        heaviest[module] = [(name, seconds) for name, _, seconds in children[:top]]
+
+    return {'steps': results, 'heaviest': heaviest}
+
+
+def find_regressions(report, baseline, time_tolerance, memory_tolerance, min_delta_seconds):
+    """Baseline'a göre izin verilen toleransı aşan adımları listele"""
+    regressions = []
+
+    for tier, tier_report in report.items():
+        if tier not in baseline:
+            continue
+
+        for step, current in tier_report['steps'].items():
+            previous = baseline[tier]['steps'].get(step)
+            if previous is None:
+                continue
+
+            # Çok kısa adımlarda ölçüm gürültüsünü gerileme sayma
+            if (current['seconds'] > previous['seconds'] * (1 + time_tolerance) and
+                    current['seconds'] - previous['seconds'] > min_delta_seconds):
+                regressions.append(f"{tier}/{step}: süre {previous['seconds']:.3f}s → {current['seconds']:.3f}s")
+
+            if current['peak_mb'] is not None and previous.get('peak_mb') is not None and \
+                    current['peak_mb'] > previous['peak_mb'] * (1 + memory_tolerance):
+                regressions.append(f"{tier}/{step}: bellek {previous['peak_mb']:.1f}MB → {current['peak_mb']:.1f}MB")
+
+    return regressions
+
+
+def print_report(report, baseline=None):
+    """Sonuçları tablo olarak yazdır"""
+    for tier, tier_report in report.items():
+        if 'series' in tier_report:
+            print(f"\n== {tier}: {tier_report['series']} seri, {tier_report['rows']} satır ==")
+        else:
+            print(f"\n== {tier}: soğuk import (ayrı süreç) ==")
+        print(f"{'Adım':<40}{'Süre (ms)':>12}{'Tepe (MB)':>12}{'Baseline (ms)':>16}")
+
+        for step, current in tier_report['steps'].items():
+            previous = (baseline or {}).get(tier, {}).get('steps', {}).get(step)
+            previous_ms = f"{previous['seconds'] * 1000:.1f}" if previous else '-'
+            peak = f"{current['peak_mb']:.1f}" if current['peak_mb'] is not None else '-'
+            print(f"{step:<40}{current['seconds'] * 1000:>12.1f}{peak:>12}{previous_ms:>16}")
+
+        for module, children in tier_report.get('heaviest', {}).items():
+            listing = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in children)
+            print(f"  {module} en ağır importlar: {listing}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bütçe tahmin performans benchmark'ı")
+    parser.add_argument('--tiers', nargs='+', default=['small', 'medium'], choices=list(TIERS) + ['custom'])
+    parser.add_argument('--groups', type=int, default=50, help="custom seviye için grup sayısı")
+    parser.add_argument('--stores', type=int, default=1, help="custom seviye için mağaza sayısı")
+    parser.add_argument('--years', type=int, default=2, choices=[1, 2], help="Dolu yıl bloğu sayısı")
+    parser.add_argument('--last-actual-month', type=int, default=10, help="2025'te gerçekleşen son ay")
+    parser.add_argument('--repeat', type=int, default=3, help="Her adım için tekrar sayısı (en iyisi alınır)")
+    parser.add_argument('--save', help="Sonuçları JSON olarak kaydet")
+    parser.add_argument('--baseline', help="Karşılaştırılacak JSON sonuç dosyası")
+    parser.add_argument('--time-tolerance', type=float, default=0.25, help="İzin verilen süre artışı (0.25 = %%25)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="İzin verilen bellek artışı")
+    parser.add_argument('--no-imports', action='store_true', help="Soğuk import profilini atla")
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help="Bunun altındaki süre farkları gerileme sayılmaz")
+    args = parser.parse_args(argv)
+
+    report = {}
+    if not args.no_imports:
+        report['imports'] = profile_imports(repeat=args.repeat)
+
+    for tier in args.tiers:
+        size = TIERS.get(tier, {'groups': args.groups, 'stores': args.stores})
+        report[tier] = run_tier(tier, size['groups'], size['stores'], years=args.years,
+                                last_actual_month=args.last_actual_month, repeat=args.repeat)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Sonuçlar kaydedildi: {args.save}")
+
+    if baseline is not None:
+        regressions = find_regressions(report, baseline, args.time_tolerance,
+                                       args.memory_tolerance, args.min_delta_ms / 1000)
+        if regressions:
+            print("\n❌ Performans gerilemesi:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\n✅ Baseline'a göre gerileme yok")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,508 @@
+import io
+import json
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from forecast_trace import traced
+
+
+# Karşılaştırma tablosundaki yıllar
+COMPARISON_YEARS = [2024, 2025, 2026]
+
+DAYS_IN_MONTH = {1: 31, 2: 28, 3: 31, 4: 30, 5: 31, 6: 30,
+                 7: 31, 8: 31, 9: 30, 10: 31, 11: 30, 12: 31}
+
+# Metrik → tek satırda birden fazla kayıt olursa birleştirme şekli
+COMPARISON_METRICS = {
+    'Quantity': 'sum',
+    'UnitPrice': 'mean',
+    'Sales': 'sum',
+    'GrossProfit': 'sum',
+    'GrossMargin%': 'mean',
+    'Stock': 'sum',
+    'COGS': 'sum'
+}
+
+# Detay Veriler ekranındaki kolon adları (yıl bazında sıralı)
+DETAIL_COLUMNS = [('Quantity', 'Adet'), ('UnitPrice', 'BirimFiyat'), ('Sales', 'Satış'),
+                  ('GrossMargin%', 'BM%'), ('Stock', 'Stok'), ('COGS', 'SMM')]
+
+# Toplu CSV kolon adları (metrik bazında sıralı)
+BULK_COLUMNS = [('Quantity', 'Adet'), ('UnitPrice', 'BirimFiyat'), ('Sales', 'Satis'),
+                ('GrossProfit', 'BrutKar'), ('GrossMargin%', 'BrutMarj'), ('Stock', 'Stok'), ('COGS', 'SMM')]
+
+# Excel sayı formatları (ayraçları Excel kullanıcının bölge ayarına göre gösterir)
+XLSX_FORMATS = {
+    'Quantity': '#,##0',
+    'UnitPrice': '#,##0.00',
+    'Sales': '#,##0',
+    'GrossProfit': '#,##0',
+    'GrossMargin%': '0.0%',
+    'Stock': '#,##0',
+    'COGS': '#,##0',
+    'Stock_COGS_Weekly': '0.00'
+}
+
+# Kaydedilen sonuç dosyaları: Parquet veya Arrow IPC (ikisi de tipli, kolon bazlı)
+RESULT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+RESULT_METADATA_KEY = b'budget_forecast'
+RESULT_VERSION = 1
+
+# Excel'e yazarken Python listesine çevrilen satır bloğu (bellek tablo boyutuyla büyümesin)
+XLSX_CHUNK_ROWS = 1000
+
+# Toplam görünümlerinde toplanabilen metrikler (marj ve haftalık oran toplamlardan yeniden hesaplanır)
+SUM_METRICS = ['Quantity', 'Sales', 'GrossProfit', 'COGS']
+
+# Seviye metrikleri: aynı aydaki gruplar toplanır, aylar arasında ortalama alınır (12 ayın stoğu toplanmaz)
+LEVEL_METRICS = ['Stock']
+
+# Senaryo farkı: hizalama anahtarları, metrikler ve her metrik için üretilen kolonlar
+DIFF_KEYS = ['Year', 'Month', 'MainGroup']
+DIFF_METRICS = ['Quantity', 'UnitPrice', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS', 'Stock_COGS_Ratio']
+DIFF_PARTS = ['Base', 'Other', 'Delta', 'DeltaPct']
+
+
+@traced()
+def build_comparison_table(full_data, years=COMPARISON_YEARS):
+    """
+    full_data'yı (Month, MainGroup) × (metrik, yıl) geniş tablosuna çevir
+
+    Tahmin başına bir kez hesaplanır; ay seçimi bu tablodan dilim, toplu export ise doğrudan yazımdır.
+    Haftalık Stok/SMM ('Stock_COGS_Weekly') ayın gün sayısıyla hesaplanır.
+    """
+    data = full_data[full_data['Year'].isin(years)]
+
+    comparison = data.groupby(['Month', 'MainGroup', 'Year']).agg(COMPARISON_METRICS).unstack('Year')
+    comparison = comparison.reindex(columns=pd.MultiIndex.from_product([list(COMPARISON_METRICS), years]))
+    comparison = comparison.fillna(0)
+    comparison.index = comparison.index.set_levels(comparison.index.levels[0].astype(int), level='Month')
+
+    # Stok/SMM haftalık: Stok / ((SMM / gün) * 7)
+    days = comparison.index.get_level_values('Month').map(DAYS_IN_MONTH).to_numpy()
+    for year in years:
+        stock = comparison[('Stock', year)]
+        cogs = comparison[('COGS', year)]
+        comparison[('Stock_COGS_Weekly', year)] = np.where(cogs > 0, stock / ((cogs / days) * 7), 0)
+
+    return comparison
+
+
+def month_comparison(comparison, month, years=COMPARISON_YEARS):
+    """Seçilen ayın yan yana karşılaştırması (Detay Veriler kolon adlarıyla)"""
+    if month in comparison.index.get_level_values('Month'):
+        month_table = comparison.xs(month, level='Month')
+    else:
+        month_table = comparison.iloc[0:0].droplevel('Month')
+
+    columns = {'MainGroup': month_table.index.to_numpy()}
+    for year in years:
+        for metric, name in DETAIL_COLUMNS:
+            columns[f'{name}_{year}'] = month_table[(metric, year)].to_numpy()
+    for year in years:
+        columns[f'Stok/SMM_Haftalık_{year}'] = month_table[('Stock_COGS_Weekly', year)].to_numpy()
+
+    return pd.DataFrame(columns)
+
+
+def build_bulk_comparison(comparison, years=COMPARISON_YEARS):
+    """Tüm aylar ve ana gruplar için 2024/2025/2026 yan yana karşılaştırma tablosu (export formatında)"""
+
+    full_comparison = pd.DataFrame({
+        'Ay': comparison.index.get_level_values('Month'),
+        'MainGroup': comparison.index.get_level_values('MainGroup')
+    })
+
+    for metric, name in BULK_COLUMNS:
+        for year in years:
+            values = comparison[(metric, year)].to_numpy()
+
+            if metric in ('Quantity', 'Sales', 'GrossProfit', 'Stock', 'COGS'):
+                # Adet ve para - tam sayı
+                values = np.where(values > 0, values, 0).astype('int64')
+            elif metric == 'UnitPrice':
+                # Birim fiyat - 2 ondalık
+                values = values.round(2)
+            else:
+                # BrutMarj yüzde formatı (Excel için)
+                values = (values * 100).round(1)
+
+            full_comparison[f'{name}_{year}'] = values
+
+    return full_comparison
+
+
+def bulk_comparison_csv(comparison):
+    """Toplu karşılaştırma tablosunu Türkiye formatında CSV'ye çevir (; ayraç, , ondalık)"""
+    return build_bulk_comparison(comparison).to_csv(index=False, encoding='utf-8-sig', sep=';', decimal=',')
+
+
+
+def _totals_view(comparison, level, years):
+    """
+    Ay veya ana grup bazında toplamlar; marj toplam satış ve brüt kârdan yeniden hesaplanır
+
+    Stok ay bazında grupların toplamı, ana grup bazında aylık stokların ortalamasıdır.
+    """
+    totals = comparison[SUM_METRICS + LEVEL_METRICS].groupby(level=level).sum()
+    if level == 'MainGroup':
+        levels = comparison[LEVEL_METRICS].groupby(level=level).mean()
+        totals[levels.columns] = levels
+
+    for year in years:
+        sales = totals[('Sales', year)].to_numpy()
+        gross_profit = totals[('GrossProfit', year)].to_numpy()
+        totals[('GrossMargin%', year)] = np.divide(gross_profit, sales, out=np.zeros_like(sales), where=sales > 0)
+
+    return totals
+
+
+def _write_xlsx_sheet(wb, title, table, index_columns, metrics, years):
+    """
+    Bir görünümü write-only sayfaya satır satır yaz
+
+    Değerler numpy kolonlarından XLSX_CHUNK_ROWS'luk bloklarla okunur ve geçici dosyaya akıtılır;
+    bellek satır sayısıyla büyümez.
+    index_columns: Tablonun index seviyelerine karşılık gelen başlıklar (Ay, MainGroup gibi)
+    metrics: (metrik, kolon adı) listesi - metrik bazında, her biri tüm yıllar için
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    ws = wb.create_sheet(title)
+    ws.freeze_panes = f"{get_column_letter(len(index_columns) + 1)}2"
+
+    header = list(index_columns)
+    columns = []
+    for metric, name in metrics:
+        for year in years:
+            header.append(f'{name}_{year}')
+            columns.append((table[(metric, year)].to_numpy(dtype=float), XLSX_FORMATS[metric]))
+
+    for position, column in enumerate(header, start=1):
+        ws.column_dimensions[get_column_letter(position)].width = 30 if column == 'MainGroup' else 14
+    ws.append(header)
+
+    index_values = [table.index.get_level_values(level) for level in range(table.index.nlevels)]
+    number_formats = [number_format for _, number_format in columns]
+
+    for start in range(0, len(table), XLSX_CHUNK_ROWS):
+        end = start + XLSX_CHUNK_ROWS
+        index_rows = zip(*(values[start:end].tolist() for values in index_values))
+        value_rows = zip(*(values[start:end].tolist() for values, _ in columns))
+        for index_row, value_row in zip(index_rows, value_rows):
+            row = list(index_row)
+            for value, number_format in zip(value_row, number_formats):
+                cell = WriteOnlyCell(ws, value=value)
+                cell.number_format = number_format
+                row.append(cell)
+            ws.append(row)
+
+
+def write_comparison_xlsx(comparison, target, years=COMPARISON_YEARS):
+    """
+    Karşılaştırma tablosunu sayı formatlı Excel'e yaz (her görünüm ayrı sayfa)
+
+    Sayfalar: Tüm Aylar (ay × ana grup), Aylık Toplam, Ana Grup Toplam.
+    BrutMarj oran olarak yazılır ve Excel'de yüzde formatıyla görünür.
+    target: Dosya yolu veya yazılabilir dosya nesnesi
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+
+    detail_metrics = BULK_COLUMNS + [('Stock_COGS_Weekly', 'StokSMM_Hft')]
+    total_metrics = [(metric, name) for metric, name in BULK_COLUMNS if metric != 'UnitPrice']
+
+    _write_xlsx_sheet(wb, 'Tüm Aylar', comparison, ['Ay', 'MainGroup'], detail_metrics, years)
+    _write_xlsx_sheet(wb, 'Aylık Toplam', _totals_view(comparison, 'Month', years), ['Ay'], total_metrics, years)
+    _write_xlsx_sheet(wb, 'Ana Grup Toplam', _totals_view(comparison, 'MainGroup', years), ['MainGroup'],
+                      total_metrics, years)
+
+    wb.save(target)
+
+
+def comparison_xlsx_bytes(comparison):
+    """
+    Excel dosyasını indirme için bayt olarak üret
+
+    Dosya diskteki geçici dosyada oluşturulur; bellekte sadece bitmiş (sıkıştırılmış) dosya okunur
+    (Streamlit indirmeyi bayt olarak sunar).
+    """
+    with tempfile.TemporaryFile() as f:
+        write_comparison_xlsx(comparison, f)
+        f.seek(0)
+        return f.read()
+
+
+def _encode_params(value):
+    """Tahmin parametrelerini JSON'a çevrilebilir yap (tuple anahtarlı dict'ler çift listesi olur)"""
+    if isinstance(value, dict):
+        return {'__pairs__': [[_encode_params(key), _encode_params(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_encode_params(item) for item in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return value
+
+
+def _decode_params(value, is_key=False):
+    """_encode_params'ın tersi - dict anahtarındaki listeler tuple'a döner"""
+    if isinstance(value, dict) and '__pairs__' in value:
+        return {_decode_params(key, is_key=True): _decode_params(item) for key, item in value['__pairs__']}
+    if isinstance(value, list):
+        items = [_decode_params(item) for item in value]
+        return tuple(items) if is_key else items
+    if isinstance(value, dict):
+        return {key: _decode_params(item) for key, item in value.items()}
+    return value
+
+
+def write_forecast_result(data, target, fmt='parquet', params=None, dataset_hash=None):
+    """
+    Tahmin sonucunu (full_data veya özet tablo) Parquet/Arrow olarak yaz
+
+    Kolon tipleri korunur, ondalık/locale dönüşümü yoktur. Parametreler ve veri seti hash'i
+    şema metadata'sına yazılır; read_forecast_result ile yeniden hesaplamadan geri yüklenir.
+    """
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"Bilinmeyen format: {fmt} (geçerli: {', '.join(RESULT_FORMATS)})")
+
+    metadata = {
+        'version': RESULT_VERSION,
+        'params': _encode_params(params) if params is not None else None,
+        'dataset_hash': dataset_hash
+    }
+
+    preserve_index = not isinstance(data.index, pd.RangeIndex)
+    table = pa.Table.from_pandas(data, preserve_index=preserve_index)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        RESULT_METADATA_KEY: json.dumps(metadata).encode('utf-8')
+    })
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, target, compression='zstd')
+    else:
+        with pa.ipc.new_file(target, table.schema) as writer:
+            writer.write_table(table)
+
+
+def forecast_result_bytes(data, fmt='parquet', params=None, dataset_hash=None):
+    """Sonuç dosyasını indirme için bayt olarak üret"""
+    buffer = io.BytesIO()
+    write_forecast_result(data, buffer, fmt=fmt, params=params, dataset_hash=dataset_hash)
+    return buffer.getvalue()
+
+
+def read_forecast_result(source):
+    """
+    Kaydedilmiş sonucu oku (format dosya başlığından anlaşılır)
+
+    Returns:
+    --------
+    (DataFrame, metadata) - metadata: {'version', 'params', 'dataset_hash'}
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif isinstance(source, str):
+        with open(source, 'rb') as f:
+            source = io.BytesIO(f.read())
+
+    magic = source.read(6)
+    source.seek(0)
+
+    if magic[:4] == b'PAR1':
+        import pyarrow.parquet as pq
+        table = pq.read_table(source)
+    elif magic == b'ARROW1':
+        table = pa.ipc.open_file(source).read_all()
+    else:
+        raise ValueError("Dosya Parquet veya Arrow formatında değil")
+
+    raw_metadata = (table.schema.metadata or {}).get(RESULT_METADATA_KEY)
+    if raw_metadata is None:
+        metadata = {'version': None, 'params': None, 'dataset_hash': None}
+    else:
+        metadata = json.loads(raw_metadata.decode('utf-8'))
+        metadata['params'] = _decode_params(metadata['params'])
+
+    return table.to_pandas(), metadata
+
+
+def _same_keys(base, other):
+    """İki tablo aynı anahtarları aynı sırada mı (aynı veri setinden sonuçlarda tipik durum)"""
+    if len(base) != len(other):
+        return False
+    return all(np.asarray(base[column].array == other[column].array).all() for column in DIFF_KEYS)
+
+
+def _diff_cells(base, other):
+    """
+    İki tablonun satırlarını ortak hücre numarasına eşle (merge yerine tam sayı anahtarlar)
+
+    Anahtar kolonları birlikte factorize edilip tek int64 koda katlanır; aynı anahtar bir tabloda
+    birden fazla satırsa compare_forecasts gibi sırasıyla eşleşir.
+    """
+    n_base = len(base)
+    codes = np.zeros(n_base + len(other), dtype=np.int64)
+    for column in DIFF_KEYS:
+        values = pd.concat([base[column], other[column]], ignore_index=True)
+        column_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        codes = codes * len(uniques) + column_codes
+
+    cell_codes, cells = pd.factorize(codes)
+
+    # Tekrar eden anahtar varsa tekrar sırasını koda ekleyip yeniden numarala
+    base_counts = np.bincount(cell_codes[:n_base], minlength=len(cells))
+    other_counts = np.bincount(cell_codes[n_base:], minlength=len(cells))
+    if len(cells) and max(base_counts.max(), other_counts.max()) > 1:
+        base_occurrence = pd.Series(codes[:n_base]).groupby(codes[:n_base]).cumcount().to_numpy()
+        other_occurrence = pd.Series(codes[n_base:]).groupby(codes[n_base:]).cumcount().to_numpy()
+        max_occurrence = max(base_occurrence.max(initial=0), other_occurrence.max(initial=0))
+        codes = codes * (max_occurrence + 1) + np.concatenate([base_occurrence, other_occurrence])
+        cell_codes, cells = pd.factorize(codes)
+
+    n_cells = len(cells)
+
+    # Her hücrenin ilk geçtiği satır (anahtar değerleri buradan alınır); factorize kodları ilk görülme
+    # sırasında verdiği için unique'in sıralı çıktısı hücre numarasıyla hizalıdır
+    first_row = np.unique(cell_codes, return_index=True)[1]
+
+    return cell_codes[:n_base], cell_codes[n_base:], first_row
+
+
+@traced()
+def diff_forecasts(base, other, metrics=None):
+    """
+    İki tahmin sonucunun (get_full_data_with_forecast çıktısı) farkı - (Year, Month, MainGroup) bazında
+
+    Satırlar hizalı numpy dizileriyle eşlenir: anahtarlar aynı sıradaysa doğrudan, değilse
+    tam sayı kodlarıyla (merge yok). Sıra: base'in satır sırası, ardından sadece other'da olan hücreler.
+
+    Returns:
+    --------
+    DataFrame - indeks (Year, Month, MainGroup), kolonlar (metrik, Base/Other/Delta/DeltaPct) ve
+    ('Status', ''): 'both', 'base_only' veya 'other_only'. DeltaPct = Delta / |Base| (Base 0 ise NaN).
+    """
+    if metrics is None:
+        metrics = [metric for metric in DIFF_METRICS if metric in base.columns and metric in other.columns]
+
+    n_metrics = len(metrics)
+
+    if _same_keys(base, other):
+        keys = base[DIFF_KEYS]
+        n_cells = len(base)
+        base_cells = other_cells = slice(None)
+        status = np.zeros(n_cells, dtype=np.int8)
+    else:
+        base_cells, other_cells, first_row = _diff_cells(base, other)
+        n_cells = len(first_row)
+        keys = pd.concat([base[DIFF_KEYS], other[DIFF_KEYS]], ignore_index=True).take(first_row)
+
+        in_base = np.zeros(n_cells, dtype=bool)
+        in_base[base_cells] = True
+        in_other = np.zeros(n_cells, dtype=bool)
+        in_other[other_cells] = True
+        status = np.where(in_base & in_other, 0, np.where(in_base, 1, 2)).astype(np.int8)
+
+    # Tek float bloğu, kolon sırası (metrik, Base/Other/Delta/DeltaPct) - DataFrame kopyasız kurulur
+    values = np.full((n_metrics, len(DIFF_PARTS), n_cells), np.nan)
+    base_values, other_values, delta, delta_pct = (values[:, part] for part in range(len(DIFF_PARTS)))
+    for position, metric in enumerate(metrics):
+        base_values[position, base_cells] = base[metric].to_numpy(dtype=float)
+        other_values[position, other_cells] = other[metric].to_numpy(dtype=float)
+    np.subtract(other_values, base_values, out=delta)
+    np.divide(delta, np.abs(base_values), out=delta_pct, where=base_values != 0)
+
+    diff = pd.DataFrame(values.reshape(-1, n_cells).T, index=pd.MultiIndex.from_frame(keys),
+                        columns=pd.MultiIndex.from_product([metrics, DIFF_PARTS]), copy=False)
+    diff[('Status', '')] = pd.Categorical.from_codes(status, categories=['both', 'base_only', 'other_only'])
+    return diff
+
+
+def _level_cells(diff, actual_until=None):
+    """
+    Seviye metriklerinin ortalamasına giren hücreler: iki sonuçta da olan ve actual_until (yıl, ay)
+    sonrasındaki (tahmin) aylar. Gerçekleşen aylarda fark her zaman 0'dır, ortalamayı seyreltmesin.
+    """
+    cells = (diff['Status'] == 'both').to_numpy()
+    if actual_until is not None:
+        year, month = actual_until
+        years = diff.index.get_level_values('Year').to_numpy()
+        months = diff.index.get_level_values('Month').to_numpy()
+        cells = cells & ((years > year) | ((years == year) & (months > month)))
+    return cells
+
+
+def total_delta(diff, metric, actual_until=None):
+    """
+    diff_forecasts sonucunda metriğin toplam farkı
+
+    Stok gibi seviyeler toplanmaz: ay bazında gruplar toplanır, aylar arasında ortalanır. Ortalama
+    sadece iki sonuçta da olan hücrelerin actual_until (yıl, ay) sonrasındaki aylarıyla alınır
+    (bkz. biggest_movers).
+    """
+    delta = diff[metric]['Delta']
+    if metric in LEVEL_METRICS:
+        return delta[_level_cells(diff, actual_until)].groupby(level=['Year', 'Month']).sum().mean()
+    return delta.sum()
+
+
+def biggest_movers(diff, metric='Sales', top=20, by=None, relative=False, actual_until=None):
+    """
+    En çok değişen hücreler veya gruplar (|Delta|'ya göre, relative=True ise |DeltaPct|'ye göre)
+
+    by: None (Year, Month, MainGroup hücresi), 'MainGroup', 'Month' veya anahtar listesi.
+    Gruplamada toplanabilen metrikler toplanır, marj toplam satış ve brüt kârdan yeniden hesaplanır,
+    diğerleri ortalanır. Stok ay bazında toplanıp aylar arasında ortalanır; ortalamaya sadece iki
+    sonuçta da olan hücrelerin actual_until (yıl, ay) sonrasındaki ayları girer (total_delta ile aynı).
+    Kayan nokta gürültüsü (np.isclose(Other, Base)) değişim sayılmaz.
+    """
+    parts = diff[metric][['Base', 'Other']]
+
+    if by is not None:
+        if metric in SUM_METRICS:
+            parts = parts.groupby(level=by).sum(min_count=1)
+        elif metric in LEVEL_METRICS:
+            # Seviye: aynı ayın grupları toplanır, aylar arasında ortalanır (bkz. _totals_view)
+            keys = [by] if isinstance(by, str) else list(by)
+            periods = [key for key in ('Year', 'Month') if key not in keys]
+            parts = parts[_level_cells(diff, actual_until)]
+            parts = parts.groupby(level=keys + periods).sum(min_count=1).groupby(level=by).mean()
+        elif metric == 'GrossMargin%' and 'Sales' in diff and 'GrossProfit' in diff:
+            totals = pd.concat({'Sales': diff['Sales'][['Base', 'Other']],
+                                'GrossProfit': diff['GrossProfit'][['Base', 'Other']]}, axis=1)
+            totals = totals.groupby(level=by).sum(min_count=1)
+            parts = totals['GrossProfit'] / totals['Sales'].where(totals['Sales'] > 0)
+        else:
+            parts = parts.groupby(level=by).mean()
+
+    base_values = parts['Base'].to_numpy(dtype=float)
+    other_values = parts['Other'].to_numpy(dtype=float)
+    delta = other_values - base_values
+    delta_pct = np.full(len(delta), np.nan)
+    np.divide(delta, np.abs(base_values), out=delta_pct, where=base_values != 0)
+
+    movers = parts.copy()
+    movers['Delta'] = delta
+    movers['DeltaPct'] = delta_pct
+
+    # Tam sıralama yerine ilk top kadarını seç (değişmeyen, gürültü düzeyindeki ve boş farklar sıralamaya girmez)
+    score = np.abs(delta_pct if relative else delta)
+    candidates = np.flatnonzero(np.isfinite(score) & ~np.isclose(other_values, base_values))
+    if len(candidates) > top:
+        candidates = candidates[np.argpartition(-score[candidates], top - 1)[:top]]
+    order = candidates[np.argsort(-score[candidates], kind='stable')]
+
+    movers = movers.iloc[order].reset_index()
+    movers.index = pd.RangeIndex(1, len(movers) + 1, name='Rank')
+    return movers
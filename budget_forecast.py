@@ -1,19 +1,345 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import warnings
+from forecast_memory import memory_tracked
+from forecast_metrics import counter, get_logger, histogram
+from forecast_trace import span, traced, traced_steps
+
+logger = get_logger('forecast')
+
+ROWS_INGESTED = counter('budget_rows_ingested_total', 'Excel\'den okunan veri satırları')
+MONTHS_GAP_FILLED = counter('budget_months_gap_filled_total', 'Önceki aydan tahminle doldurulan eksik aylar')
+DATASET_LOAD_SECONDS = histogram('budget_dataset_load_seconds', 'Excel okuma + veri temizleme süresi')
+FORECAST_SECONDS = histogram('budget_forecast_seconds', 'forecast_future_months süresi', ('engine',))
 warnings.filterwarnings('ignore')
 
+
+def hash_forecast_params(params):
+    """Tahmin parametreleri için kararlı hash üret (dict sırası ve sayı tipinden bağımsız)"""
+    
+    def normalize(value):
+        if isinstance(value, dict):
+            items = [[normalize(k), normalize(v)] for k, v in value.items()]
+            return sorted(items, key=lambda item: json.dumps(item[0], default=str))
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            # 0 ile 0.0 aynı anahtarı üretsin
+            return float(value)
+        return value
+    
+    payload = json.dumps(normalize(params), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@traced()
+def build_forecast_params(monthly_targets, maingroup_targets, lessons_learned, price_changes,
+                          margin_improvement=0.0, stock_change_pct=0.0, inflation_adjustment=1.0,
+                          organic_multiplier=0.5, inflation_rate=0.25):
+    """
+    Parametre tablolarını (uygulamadaki editör formatı) forecast_future_months parametrelerine çevir
+    
+    monthly_targets: 'Ay', 'Hedef (%)'
+    maingroup_targets: 'Ana Grup', 'Hedef (%)'
+    lessons_learned: 'Ana Grup', '1'..'12' (-10..+10 puan)
+    price_changes: 'Ana Grup', '1'..'12' (%)
+    """
+    months = range(1, 13)
+    month_columns = [str(month) for month in months]
+    
+    monthly_growth_targets = dict(zip(monthly_targets['Ay'].astype(int).tolist(),
+                                      (monthly_targets['Hedef (%)'] / 100).tolist()))
+    maingroup_growth_targets = dict(zip(maingroup_targets['Ana Grup'].tolist(),
+                                        (maingroup_targets['Hedef (%)'] / 100).tolist()))
+    
+    lesson_values = lessons_learned[month_columns].to_numpy().tolist()
+    lessons_learned_dict = {
+        (main_group, month): value
+        for main_group, row in zip(lessons_learned['Ana Grup'].tolist(), lesson_values)
+        for month, value in zip(months, row)
+    }
+    
+    price_values = (price_changes[month_columns] / 100).to_numpy().tolist()
+    price_change_dict = {
+        (main_group, month): value
+        for main_group, row in zip(price_changes['Ana Grup'].tolist(), price_values)
+        for month, value in zip(months, row)
+    }
+    
+    # Genel büyüme parametresi
+    general_growth = (monthly_targets['Hedef (%)'].mean() + maingroup_targets['Hedef (%)'].mean()) / 200
+    
+    return {
+        'growth_param': general_growth,
+        'margin_improvement': margin_improvement,
+        'stock_change_pct': stock_change_pct,
+        'monthly_growth_targets': monthly_growth_targets,
+        'maingroup_growth_targets': maingroup_growth_targets,
+        'lessons_learned': lessons_learned_dict,
+        'inflation_adjustment': inflation_adjustment,
+        'organic_multiplier': organic_multiplier,
+        'price_change_matrix': price_change_dict,
+        'inflation_rate': inflation_rate
+    }
+
+
+
+def _backtest_cutoff(data, cutoff_year, cutoff_month, horizon, forecast_params):
+    """Tek bir kesim noktası için tahmin üret (process pool worker'ı)"""
+    forecaster = BudgetForecaster._from_processed(data, cutoff_year, cutoff_month)
+    forecast = forecaster.forecast_future_months(num_months=horizon, **forecast_params)
+    
+    forecast = forecast[['Year', 'Month', 'MainGroup', 'Sales']].copy()
+    # Kesimden kaç ay sonrası (1 = ertesi ay)
+    forecast['Horizon'] = (forecast['Year'] - cutoff_year) * 12 + (forecast['Month'] - cutoff_month)
+    forecast['CutoffYear'] = cutoff_year
+    forecast['CutoffMonth'] = cutoff_month
+    
+    return forecast
+
+
+def _score_errors(details):
+    """Detaya hata kolonlarını ekle (Error, AbsError, APE)"""
+    error = details['Forecast'] - details['Actual']
+    return details.assign(
+        Error=error,
+        AbsError=error.abs(),
+        APE=(error.abs() / details['Actual']).where(details['Actual'] > 0)
+    )
+
+
+def _scores(totals):
+    """Toplamlardan MAPE / WAPE / Bias (%) - gruplanmış ve genel toplamlar için ortak"""
+    scores = totals.assign(
+        MAPE=totals['MAPE'] * 100,
+        WAPE=(totals['AbsError'] / totals['Actual'] * 100).where(totals['Actual'] > 0),
+        Bias=(totals['Error'] / totals['Actual'] * 100).where(totals['Actual'] > 0)
+    )
+    return scores[['N', 'Actual', 'Forecast', 'MAPE', 'WAPE', 'Bias']]
+
+
+def _score_backtest(details, keys):
+    """keys bazında MAPE / WAPE / Bias (%) hesapla"""
+    totals = _score_errors(details).groupby(keys).agg(
+        N=('Actual', 'size'),
+        Actual=('Actual', 'sum'),
+        Forecast=('Forecast', 'sum'),
+        Error=('Error', 'sum'),
+        AbsError=('AbsError', 'sum'),
+        MAPE=('APE', 'mean')
+    )
+    
+    return _scores(totals).reset_index()
+
+
+def _score_overall(details):
+    """Tüm detay için tek genel skor (dict)"""
+    scored = _score_errors(details)
+    totals = pd.DataFrame([{
+        'N': len(scored),
+        'Actual': scored['Actual'].sum(),
+        'Forecast': scored['Forecast'].sum(),
+        'Error': scored['Error'].sum(),
+        'AbsError': scored['AbsError'].sum(),
+        'MAPE': scored['APE'].mean()
+    }])
+    
+    return _scores(totals).to_dict('records')[0]
+
+
+FORECAST_KEYS = ['Year', 'Month', 'MainGroup']
+FORECAST_VALUE_COLUMNS = ['Quantity', 'UnitPrice', 'Sales', 'GrossProfit', 'GrossMargin%',
+                          'Stock', 'COGS', 'Stock_COGS_Ratio']
+
+
+def compare_forecasts(expected, actual, rtol=1e-9, atol=1e-6):
+    """
+    İki tahmin tablosunu (Year, Month, MainGroup) bazında hücre hücre karşılaştır
+    
+    Returns:
+    --------
+    Dict: missing_rows (sadece expected'da), extra_rows (sadece actual'da),
+          differences (tolerans dışı hücreler), max_abs_diff, passed
+    """
+    
+    def keyed(frame):
+        # Aynı grup bir ayda birden fazla satırsa sırasıyla eşleştir
+        frame = frame[FORECAST_KEYS + FORECAST_VALUE_COLUMNS].copy()
+        frame['_Row'] = frame.groupby(FORECAST_KEYS, dropna=False).cumcount()
+        return frame
+    
+    aligned = keyed(expected).merge(
+        keyed(actual), on=FORECAST_KEYS + ['_Row'], how='outer',
+        suffixes=('_expected', '_actual'), indicator=True
+    )
+    
+    missing_rows = aligned.loc[aligned['_merge'] == 'left_only', FORECAST_KEYS]
+    extra_rows = aligned.loc[aligned['_merge'] == 'right_only', FORECAST_KEYS]
+    both = aligned[aligned['_merge'] == 'both']
+    
+    differences = []
+    max_abs_diff = 0.0
+    for column in FORECAST_VALUE_COLUMNS:
+        expected_values = both[f'{column}_expected'].to_numpy(dtype=float)
+        actual_values = both[f'{column}_actual'].to_numpy(dtype=float)
+        abs_diff = np.abs(expected_values - actual_values)
+        
+        mismatch = ~np.isclose(expected_values, actual_values, rtol=rtol, atol=atol, equal_nan=True)
+        if len(abs_diff) > 0:
+            max_abs_diff = max(max_abs_diff, float(np.nanmax(abs_diff, initial=0.0)))
+        
+        if mismatch.any():
+            cells = both.loc[mismatch, FORECAST_KEYS].copy()
+            cells['Column'] = column
+            cells['Expected'] = expected_values[mismatch]
+            cells['Actual'] = actual_values[mismatch]
+            cells['AbsDiff'] = abs_diff[mismatch]
+            differences.append(cells)
+    
+    differences = (
+        pd.concat(differences, ignore_index=True) if differences
+        else pd.DataFrame(columns=FORECAST_KEYS + ['Column', 'Expected', 'Actual', 'AbsDiff'])
+    )
+    
+    return {
+        'missing_rows': missing_rows.reset_index(drop=True),
+        'extra_rows': extra_rows.reset_index(drop=True),
+        'differences': differences,
+        'max_abs_diff': max_abs_diff,
+        'passed': len(missing_rows) == 0 and len(extra_rows) == 0 and len(differences) == 0
+    }
+
+
+# İstatistiksel model (engine='model') ridge cezaları - gözlem sayısı cinsinden ağırlık
+MODEL_TREND_SHRINKAGE = 2.0      # Grup trendi toplam satış trendine çekilir
+MODEL_SEASONAL_SHRINKAGE = 1.0   # Ay etkileri 0'a çekilir (az gözlemli gruplar)
+MODEL_COEFFICIENTS = 13          # sabit + trend + 11 ay etkisi
+
+
+def trend_seasonality_design(years, months, origin=0.0):
+    """
+    Tasarım matrisi (dönem × 13): sabit, trend (yıl cinsinden, origin'e göre), 11 ay etkisi
+    
+    Ay etkileri toplamı sıfır kodlanır (Aralık = -Ocak..Kasım toplamı), sabit yıllık ortalama seviyedir.
+    """
+    years = np.asarray(years, dtype=float)
+    months = np.asarray(months, dtype=int)
+    
+    design = np.zeros((len(months), MODEL_COEFFICIENTS))
+    design[:, 0] = 1.0
+    design[:, 1] = years + (months - 1) / 12 - origin
+    for month in range(1, 12):
+        design[:, 1 + month] = np.where(months == month, 1.0, np.where(months == 12, -1.0, 0.0))
+    return design
+
+
+def fit_trend_seasonality(sales, design, trend_prior=None, trend_shrinkage=MODEL_TREND_SHRINKAGE,
+                          seasonal_shrinkage=MODEL_SEASONAL_SHRINKAGE):
+    """
+    log(Satış) ~ sabit + trend + ay etkileri - tüm seriler tek seferde (seri başına ridge normal denklemleri)
+    
+    Seri başına döngü yok: normal denklemler gözlem maskesi başına bir kez tersine çevrilir, tüm seriler
+    tek toplu matris çarpımıyla çözülür (maskesi aynı binlerce seri aynı tersi paylaşır).
+    Eksik, sıfır ve negatif satışlar gözlem sayılmaz (seri başına ağırlık maskesi).
+    
+    Parameters:
+    -----------
+    sales: (seri × dönem) satış matrisi
+    design: trend_seasonality_design çıktısı (dönem × 13)
+    trend_prior: Seri başına trendin çekildiği değer (None = 0)
+    
+    Returns:
+    --------
+    (katsayılar (seri × 13), gözlem sayısı (seri)) - hiç gözlemi olmayan serinin katsayıları NaN
+    """
+    sales = np.asarray(sales, dtype=float)
+    observed = np.isfinite(sales) & (sales > 0)
+    weights = observed.astype(float)
+    log_sales = np.log(np.where(observed, sales, 1.0))
+    
+    penalty = np.full(MODEL_COEFFICIENTS, float(seasonal_shrinkage))
+    penalty[0] = 1e-9  # Sabit cezasız (tekil matris olmasın diye çok küçük)
+    penalty[1] = trend_shrinkage
+    
+    # X' W X + Λ sadece gözlem maskesine bağlı - aynı maskeli seriler (çoğunluk) tek matrisi paylaşır
+    packed = np.packbits(observed, axis=1)
+    mask_keys = np.ascontiguousarray(packed).view(f'V{packed.shape[1]}').ravel()
+    _, first_series, pattern_of_series = np.unique(mask_keys, return_index=True, return_inverse=True)
+    outer = (design[:, :, None] * design[:, None, :]).reshape(len(design), -1)
+    normal = (weights[first_series] @ outer).reshape(-1, MODEL_COEFFICIENTS, MODEL_COEFFICIENTS) + np.diag(penalty)
+    
+    # X' W y - tüm seriler için
+    rhs = (weights * log_sales) @ design
+    if trend_prior is not None:
+        rhs[:, 1] += trend_shrinkage * np.asarray(trend_prior, dtype=float)
+    
+    coefficients = np.matmul(np.linalg.inv(normal)[pattern_of_series.ravel()], rhs[:, :, None])[:, :, 0]
+    counts = observed.sum(axis=1)
+    coefficients[counts == 0] = np.nan
+    return coefficients, counts
+
+
+# engine adı → BudgetForecaster metodu
+FORECAST_ENGINES = {
+    'legacy': '_forecast_legacy',
+    'vectorized': '_forecast_vectorized',
+    'model': '_forecast_model'
+}
+
+
 class BudgetForecaster:
+    """
+    Yüklenen veri (self.data) process_data'dan sonra salt okunurdur: tahmin, özet ve backtest
+    metodları kopyalar üzerinde çalışır. Bu yüzden tek örnek thread'ler ve oturumlar arasında paylaşılabilir.
+    """
+    
     def __init__(self, excel_path):
-        """Excel'den veriyi yükle ve temizle"""
-        # Raw olarak oku, header belirtme
-        df_raw = pd.read_excel(excel_path, sheet_name='Sayfa1', header=None)
+        """
+        Excel'den veriyi yükle ve temizle
         
-        # Header 1. satır (index 1)
-        self.df = pd.read_excel(excel_path, sheet_name='Sayfa1', header=1)
+        excel_path: Dosya yolu, bytes/bytearray/memoryview veya okunabilir dosya nesnesi.
+        Bellekteki içerik diske yazılmadan okunur.
+        """
+        if isinstance(excel_path, (bytes, bytearray, memoryview)):
+            excel_path = io.BytesIO(excel_path)
         
-        self.process_data()
+        with DATASET_LOAD_SECONDS.time():
+            # Header 1. satır (index 1)
+            self.df = pd.read_excel(excel_path, sheet_name='Sayfa1', header=1)
+            ROWS_INGESTED.inc(len(self.df))
+            
+            self.process_data()
+        
+        logger.info("Veri yüklendi", extra={'event': 'dataset_loaded', 'rows': len(self.df),
+                                            'clean_rows': len(self.data)})
+    
+    @classmethod
+    def _from_processed(cls, data, last_actual_year, last_actual_month, estimated_periods=()):
+        """İşlenmiş veriden (Excel okumadan) forecaster oluştur"""
+        forecaster = cls.__new__(cls)
+        forecaster.df = None
+        forecaster.data = data
+        forecaster.last_actual_year = last_actual_year
+        forecaster.last_actual_month = last_actual_month
+        forecaster.estimated_periods = set(estimated_periods)
+        return forecaster
+    
+    def as_of(self, year, month):
+        """Veriyi verilen yıl/aya kadar kesip o tarihte çalışıyormuş gibi bir forecaster döndür"""
+        data = self.data[
+            (self.data['Year'] < year) |
+            ((self.data['Year'] == year) & (self.data['Month'] <= month))
+        ].copy()
+        estimated_periods = {period for period in self.estimated_periods if period <= (year, month)}
+        return BudgetForecaster._from_processed(data, year, month, estimated_periods)
         
     def process_data(self):
         """Veriyi yıl bazında ayrıştır ve temizle"""
@@ -75,7 +401,8 @@ class BudgetForecaster:
         
         # *** 2025 Kasım-Aralık için özel tahmin YAPMA ***
         # forecast_future_months bu işi yapacak
-        # Sadece 2024'teki eksik ayları doldur
+        # Sadece 2024'teki eksik ayları doldur (doldurulan aylar estimated_periods'a yazılır)
+        self.estimated_periods = set()
         self._fill_missing_months()
     
     def _find_last_actual_period(self):
@@ -90,12 +417,15 @@ class BudgetForecaster:
             self.last_actual_year = int(last_period['Year'])
             self.last_actual_month = int(last_period['Month'])
             
-            print(f"✅ Son gerçekleşen veri: {self.last_actual_year}/{self.last_actual_month}")
+            logger.info(f"Son gerçekleşen veri: {self.last_actual_year}/{self.last_actual_month}",
+                        extra={'event': 'last_actual_period', 'year': self.last_actual_year,
+                               'month': self.last_actual_month})
         else:
             # Varsayılan
             self.last_actual_year = 2025
             self.last_actual_month = 10
-            print(f"⚠️ Gerçekleşen veri bulunamadı, varsayılan: 2025/10")
+            logger.warning("Gerçekleşen veri bulunamadı, varsayılan: 2025/10",
+                           extra={'event': 'last_actual_period_default', 'year': 2025, 'month': 10})
     
     def _fill_missing_months(self):
         """SADECE 2024'teki eksik ayları tahmin et - 2025 için YAPMA"""
@@ -154,8 +484,11 @@ class BudgetForecaster:
         self.data = self.data[~((self.data['Year'] == year) & (self.data['Month'] == month))]
         self.data = pd.concat([self.data, estimate], ignore_index=True)
         self.data = self.data.sort_values(['Year', 'Month', 'MainGroup']).reset_index(drop=True)
+        self.estimated_periods.add((year, month))
         
-        print(f"📅 {year}/{month} ayı tahmini eklendi (Önceki ay × 0.98)")
+        MONTHS_GAP_FILLED.inc()
+        logger.info(f"{year}/{month} ayı tahmini eklendi (Önceki ay × 0.98)",
+                    extra={'event': 'month_gap_filled', 'year': year, 'month': month, 'rows': len(estimate)})
     
     def calculate_seasonality(self):
         """Her ay için mevsimsellik indeksi hesapla"""
@@ -180,11 +513,13 @@ class BudgetForecaster:
         
         return seasonality[['MainGroup', 'Month', 'SeasonalityIndex']]
     
+    @traced()
+    @memory_tracked()
     def forecast_future_months(self, num_months=15, growth_param=0.1, margin_improvement=0.0, 
                               stock_change_pct=0.0, monthly_growth_targets=None, 
                               maingroup_growth_targets=None, lessons_learned=None,
                               inflation_adjustment=1.0, organic_multiplier=0.5,
-                              price_change_matrix=None, inflation_rate=0.25):
+                              price_change_matrix=None, inflation_rate=0.25, engine='legacy'):
         """
         Son gerçekleşen aydan itibaren belirtilen sayıda ay tahmin et
         
@@ -201,16 +536,62 @@ class BudgetForecaster:
         organic_multiplier: Organik büyüme çarpanı (0.0=Çekimser, 0.5=Normal, 1.0=İyimser)
         price_change_matrix: Dict {(maingroup, month): price_change_pct} - Fiyat değişim matrisi
         inflation_rate: Enflasyon oranı (default fiyat artışı için, örn: 0.25 = %25)
+        engine: 'legacy' (onaylı hesap), 'vectorized' (aynı sonuç, satır döngüsüz) veya
+                'model' (grup başına trend + mevsimsellik modeli, _forecast_model)
+        """
+        
+        if engine not in FORECAST_ENGINES:
+            raise ValueError(f"Bilinmeyen tahmin motoru: {engine}")
+        
+        engine_method = getattr(self, FORECAST_ENGINES[engine])
+        with FORECAST_SECONDS.time(engine=engine):
+            return engine_method(
+                num_months=num_months,
+                growth_param=growth_param,
+                margin_improvement=margin_improvement,
+                stock_change_pct=stock_change_pct,
+                monthly_growth_targets=monthly_growth_targets,
+                maingroup_growth_targets=maingroup_growth_targets,
+                lessons_learned=lessons_learned,
+                inflation_adjustment=inflation_adjustment,
+                organic_multiplier=organic_multiplier,
+                price_change_matrix=price_change_matrix,
+                inflation_rate=inflation_rate
+            )
+    
+    def _forecast_legacy(self, **forecast_params):
+        """Onaylı (legacy) tahmin motoru - grup değerleri satır satır okunur"""
+        return self._forecast_rules(self._lookup_by_row, self._stock_health_factors_by_row, **forecast_params)
+    
+    def _forecast_vectorized(self, **forecast_params):
+        """Legacy motorla aynı kurallar; grup değerleri satır döngüsü olmadan toplu okunur"""
+        return self._forecast_rules(self._lookup_by_group, self._stock_health_factors, **forecast_params)
+    
+    def _forecast_rules(self, lookup, health_factors, num_months=15, growth_param=0.1, margin_improvement=0.0, 
+                        stock_change_pct=0.0, monthly_growth_targets=None, 
+                        maingroup_growth_targets=None, lessons_learned=None,
+                        inflation_adjustment=1.0, organic_multiplier=0.5,
+                        price_change_matrix=None, inflation_rate=0.25):
+        """
+        Kural tabanlı motorların (legacy / vectorized) ortak ay ay tahmin hesabı
+        
+        Motorlar sadece okuma stratejisinde ayrılır:
+        lookup(main_groups, month, {(maingroup, month): değer}, default) grup başına değer dizisi,
+        health_factors(base_data) {maingroup: stok sağlık faktörü} döndürür.
         """
         
-        # Mevsimsellik hesapla
+        # Mevsimsellik hesapla - (MainGroup, Month) → indeks lookup'u
         seasonality = self.calculate_seasonality()
+        seasonality_lookup = dict(zip(
+            zip(seasonality['MainGroup'], seasonality['Month']),
+            seasonality['SeasonalityIndex']
+        ))
         
         # Son gerçekleşen ayın verisini base al
         base_data = self.data[
             (self.data['Year'] == self.last_actual_year) & 
             (self.data['Month'] == self.last_actual_month)
-        ].copy()
+        ]
         
         # Organik trend (2024->2025) - SADECE AYNI AYLARI KARŞILAŞTIR
         # Son gerçekleşen aya kadar olan ayları al
@@ -237,36 +618,7 @@ class BudgetForecaster:
         # *** STOK SAĞLIK FAKTÖRLERİNİ HESAPLA ***
         # ========================================
         
-        # Ortalama Stok/COGS oranı (benchmark)
-        avg_stock_ratio = base_data['Stock_COGS_Ratio'].mean()
-        
-        # Her ana grup için stok sağlık faktörü hesapla
-        stock_health_factors = {}
-        
-        for _, row in base_data.iterrows():
-            main_group = row['MainGroup']
-            group_ratio = row['Stock_COGS_Ratio']
-            
-            # Benchmark'a göre sapma
-            if avg_stock_ratio > 0:
-                ratio_deviation = (group_ratio - avg_stock_ratio) / avg_stock_ratio
-                
-                # ÇOK KONSERVATIF AYARLAMA - Max %2.5
-                if ratio_deviation > 0.5:  # %50'den fazla yüksekse (yavaş hareket)
-                    # Hafif azalt: max %2.5 azalış
-                    adjustment = -0.01 - (min(ratio_deviation - 0.5, 0.5) * 0.03)
-                    adjustment = max(adjustment, -0.025)  # Max -%2.5
-                elif ratio_deviation < -0.3:  # %30'dan fazla düşükse (hızlı hareket)
-                    # Hafif artır: max %2.5 artış
-                    adjustment = 0.01 + (min(abs(ratio_deviation) - 0.3, 0.5) * 0.03)
-                    adjustment = min(adjustment, 0.025)  # Max +%2.5
-                else:
-                    # Normal aralıkta, ayarlama yok
-                    adjustment = 0
-                
-                stock_health_factors[main_group] = 1 + adjustment
-            else:
-                stock_health_factors[main_group] = 1.0
+        stock_health_factors = health_factors(base_data)
         
         # ========================================
         # *** STOK FAKTÖRÜ HESAPLANDI ***
@@ -274,8 +626,9 @@ class BudgetForecaster:
         
         # Tahmin aylarını oluştur
         forecast_data = []
+        forecast_by_period = {}  # (yıl, ay) → ilk tahmin tablosu
         
-        for i in range(1, num_months + 1):
+        for i in traced_steps(range(1, num_months + 1), 'forecast_month'):
             # Hedef yıl-ay hesapla
             target_month = self.last_actual_month + i
             target_year = self.last_actual_year
@@ -290,7 +643,7 @@ class BudgetForecaster:
                 same_month_last_year = self.data[
                     (self.data['Year'] == 2024) & 
                     (self.data['Month'] == target_month)
-                ].copy()
+                ]
                 
                 if len(same_month_last_year) > 0:
                     month_forecast = same_month_last_year.copy()
@@ -298,10 +651,8 @@ class BudgetForecaster:
                     month_forecast['Month'] = target_month
                     
                     # Fiyat artışını hesapla
-                    month_forecast['PriceChange'] = month_forecast.apply(
-                        lambda row: price_change_matrix.get((row['MainGroup'], target_month), inflation_rate) 
-                        if price_change_matrix else inflation_rate,
-                        axis=1
+                    month_forecast['PriceChange'] = lookup(
+                        month_forecast['MainGroup'], target_month, price_change_matrix, inflation_rate
                     )
                     
                     # Fiyat artış çarpanı (örn: %25 artış = 1.25)
@@ -342,6 +693,7 @@ class BudgetForecaster:
                     )
                     
                     forecast_data.append(month_forecast)
+                    forecast_by_period.setdefault((2025, target_month), month_forecast)
                     
                     continue
             
@@ -356,12 +708,9 @@ class BudgetForecaster:
                 
                 # Gerçek veri yoksa, önceki tahminlerden bak
                 if len(same_month_prev_year) == 0 or same_month_prev_year['Sales'].sum() < 100000:
-                    # forecast_data içinde ara (örn: 2025/11-12 tahmini)
-                    for prev_forecast in forecast_data:
-                        if len(prev_forecast) > 0:
-                            if prev_forecast.iloc[0]['Year'] == target_year - 1 and prev_forecast.iloc[0]['Month'] == target_month:
-                                same_month_prev_year = prev_forecast.copy()
-                                break
+                    # Önceki tahminlerde ara (örn: 2025/11-12 tahmini)
+                    if (target_year - 1, target_month) in forecast_by_period:
+                        same_month_prev_year = forecast_by_period[(target_year - 1, target_month)]
                 
                 if len(same_month_prev_year) > 0 and same_month_prev_year['Sales'].sum() > 100000:
                     # Geçen yılın aynı ayını kullan - direkt, trend ekleme!
@@ -380,10 +729,9 @@ class BudgetForecaster:
                 month_forecast['Month'] = target_month
             
             # Mevsimselliği ekle
-            month_forecast = month_forecast.merge(
-                seasonality[seasonality['Month'] == target_month],
-                on=['MainGroup', 'Month'],
-                how='left'
+            month_forecast = month_forecast.reset_index(drop=True)
+            month_forecast['SeasonalityIndex'] = lookup(
+                month_forecast['MainGroup'], target_month, seasonality_lookup, np.nan
             )
             month_forecast['SeasonalityIndex'] = month_forecast['SeasonalityIndex'].fillna(1.0)
             
@@ -401,9 +749,8 @@ class BudgetForecaster:
             
             # Alınan dersler
             if lessons_learned is not None:
-                month_forecast['LessonsScore'] = month_forecast.apply(
-                    lambda row: lessons_learned.get((row['MainGroup'], target_month), 0),
-                    axis=1
+                month_forecast['LessonsScore'] = lookup(
+                    month_forecast['MainGroup'], target_month, lessons_learned, 0
                 )
                 month_forecast['LessonsAdjustment'] = month_forecast['LessonsScore'] * 0.005
             else:
@@ -420,19 +767,13 @@ class BudgetForecaster:
             )
             
             # Fiyat değişimini hesapla
-            month_forecast['PriceChange'] = month_forecast.apply(
-                lambda row: price_change_matrix.get((row['MainGroup'], target_month), inflation_rate) 
-                if price_change_matrix else inflation_rate,
-                axis=1
+            month_forecast['PriceChange'] = lookup(
+                month_forecast['MainGroup'], target_month, price_change_matrix, inflation_rate
             )
             
             # 2026 Birim Fiyat = 2025 Fiyat × (1 + Fiyat Değişimi)
             month_forecast['UnitPrice'] = month_forecast['UnitPrice'] * (1 + month_forecast['PriceChange'])
             
-            # Zaman faktörü (uzak gelecek daha konservatif)
-            time_discount = 1.0 - (i * 0.01)
-            time_discount = max(time_discount, 0.85)
-            
             # SATIŞ TAHMİNİ (CİRO) - STOK SAĞLIK FAKTÖRÜ VE MEVSİMSELLİK İLE
             month_forecast['Sales'] = (
                 month_forecast['Sales'] *
@@ -468,17 +809,256 @@ class BudgetForecaster:
                                             'Stock_COGS_Ratio']]
             
             forecast_data.append(month_forecast)
+            if len(month_forecast) > 0:
+                forecast_by_period.setdefault((target_year, target_month), month_forecast)
         
         # Tüm tahminleri birleştir
         all_forecasts = pd.concat(forecast_data, ignore_index=True)
         
         return all_forecasts
     
+    def _forecast_model(self, num_months=15, growth_param=0.1, margin_improvement=0.0,
+                        stock_change_pct=0.0, monthly_growth_targets=None,
+                        maingroup_growth_targets=None, lessons_learned=None,
+                        inflation_adjustment=1.0, organic_multiplier=0.5,
+                        price_change_matrix=None, inflation_rate=0.25):
+        """
+        İstatistiksel model motoru - sabit katsayılar yerine grup başına tahmin edilen trend ve mevsimsellik
+        
+        Her ana grup için log(Satış) ~ sabit + trend + ay etkileri modeli tüm gruplar için tek seferde
+        kurulur (fit_trend_seasonality). Grup trendi toplam satış trendine, ay etkileri 0'a çekilir;
+        tek yıllık veride trend ayrıştırılamadığı için 0 kabul edilir.
+        
+        Tahmin = geçen yılın aynı ayı × (1 + grup trendi × enflasyon düzeltmesi × bütçe versiyonu çarpanı).
+        Geçen yılın aynı ayı yoksa (veya satış 0 ise) modelin o ay için uydurduğu değer kullanılır.
+        Kural tabanlı motorlardaki organik büyüme × 0.3 ve 0.8 + mevsimsellik × 0.2 katsayıları yoktur.
+        
+        Bütçe kaldıraçları (aylık/ana grup hedefleri, alınan dersler, stok sağlık faktörü, marj iyileştirme,
+        stok değişimi) son gerçekleşen yıldan sonraki aylara uygulanır; yıl sonuna kadarki aylar modelin
+        öngörüsüdür. Fiyat değişimi (Adet = Ciro / Birim Fiyat) tüm aylara uygulanır.
+        """
+        
+        history = self.data[
+            (self.data['Year'] < self.last_actual_year) |
+            ((self.data['Year'] == self.last_actual_year) & (self.data['Month'] <= self.last_actual_month))
+        ]
+        
+        # Son gerçekleşen ayın verisini base al - tahmin edilen gruplar ve eksik referansların yedeği
+        base_data = self.data[
+            (self.data['Year'] == self.last_actual_year) &
+            (self.data['Month'] == self.last_actual_month)
+        ].drop_duplicates('MainGroup').reset_index(drop=True)
+        main_groups = base_data['MainGroup']
+        
+        # Gerçekleşen dönemler (ilk aydan son gerçekleşen aya kadar, boşluksuz)
+        first_year = int(history['Year'].min())
+        first_month = int(history.loc[history['Year'] == first_year, 'Month'].min())
+        period_count = (self.last_actual_year - first_year) * 12 + self.last_actual_month - first_month + 1
+        period_index = np.arange(period_count) + (first_month - 1)
+        period_years = first_year + period_index // 12
+        period_months = period_index % 12 + 1
+        periods = pd.MultiIndex.from_arrays([period_years, period_months], names=['Year', 'Month'])
+        
+        with span('model_fit', groups=len(main_groups), periods=period_count):
+            # (grup × dönem) matrisleri - model girdisi ve geçen yılın aynı ayı referansı
+            panel = (
+                history.drop_duplicates(['Year', 'Month', 'MainGroup'], keep='last')
+                .set_index(['MainGroup', 'Year', 'Month'])[['Sales', 'UnitPrice', 'GrossMargin%', 'Stock']]
+                .unstack(['Year', 'Month'])
+            )
+            actuals = {column: panel[column].reindex(index=main_groups, columns=periods).to_numpy(dtype=float)
+                       for column in ['Sales', 'UnitPrice', 'GrossMargin%', 'Stock']}
+            sales = actuals['Sales']
+            
+            origin = period_years.mean() + (period_months.mean() - 1) / 12
+            design = trend_seasonality_design(period_years, period_months, origin)
+            
+            # Trend ancak 12 aydan uzun geçmişte ay etkilerinden ayrışır
+            trend_shrinkage = MODEL_TREND_SHRINKAGE if period_count > 12 else 1e9
+            
+            # Toplam satış trendi - grup trendlerinin çekildiği değer
+            pooled, _ = fit_trend_seasonality(
+                np.where(sales > 0, sales, 0).sum(axis=0)[None, :], design, trend_shrinkage=trend_shrinkage
+            )
+            coefficients, observations = fit_trend_seasonality(
+                sales, design, trend_prior=pooled[0, 1], trend_shrinkage=trend_shrinkage
+            )
+        
+        logger.debug("Trend + mevsimsellik modeli kuruldu",
+                     extra={'event': 'model_fit', 'groups': len(main_groups), 'periods': period_count,
+                            'unfitted_groups': int((observations == 0).sum()),
+                            'pooled_trend': round(float(np.exp(pooled[0, 1]) - 1), 4)})
+        
+        # Yıllık organik büyüme (grup başına) - enflasyon düzeltmesi ve bütçe versiyonu çarpanıyla
+        organic_growth = np.nan_to_num(np.exp(coefficients[:, 1]) - 1) * inflation_adjustment * organic_multiplier
+        stock_health = main_groups.map(self._stock_health_factors(base_data)).fillna(1.0).to_numpy()
+        
+        base_values = {column: base_data[column].to_numpy(dtype=float)
+                       for column in ['UnitPrice', 'GrossMargin%', 'Stock']}
+        
+        forecast_data = []
+        forecast_by_period = {}  # (yıl, ay) → tahmin değerleri (referans zinciri için)
+        
+        for i in traced_steps(range(1, num_months + 1), 'forecast_month'):
+            # Hedef yıl-ay hesapla
+            target_index = self.last_actual_month - 1 + i
+            target_year = self.last_actual_year + target_index // 12
+            target_month = target_index % 12 + 1
+            reference = (target_year - 1, target_month)
+            
+            # Referans: geçen yılın aynı ayı (gerçekleşen veya önceki tahmin)
+            reference_position = (reference[0] - first_year) * 12 + reference[1] - first_month
+            if reference in forecast_by_period:
+                reference_values = forecast_by_period[reference]
+            elif 0 <= reference_position < period_count:
+                reference_values = {column: values[:, reference_position] for column, values in actuals.items()}
+            else:
+                reference_values = dict.fromkeys(actuals, np.full(len(main_groups), np.nan))
+            
+            reference_sales = reference_values['Sales']
+            has_reference = np.isfinite(reference_sales) & (reference_sales > 0)
+            
+            # Referansı olmayan gruplar: modelin referans ay için uydurduğu satış + son gerçekleşen ayın oranları
+            fitted_sales = np.exp(coefficients @ trend_seasonality_design([reference[0]], [reference[1]], origin)[0])
+            sales = np.where(has_reference, reference_sales, np.nan_to_num(fitted_sales))
+            unit_price, gross_margin, stock = (
+                np.where(has_reference & np.isfinite(reference_values[column]), reference_values[column],
+                         base_values[column])
+                for column in ['UnitPrice', 'GrossMargin%', 'Stock']
+            )
+            
+            sales = sales * (1 + organic_growth)
+            
+            # Bütçe yılı: hedefler ve kaldıraçlar
+            if target_year > self.last_actual_year:
+                if monthly_growth_targets is not None:
+                    monthly_target = monthly_growth_targets.get(target_month, growth_param)
+                else:
+                    monthly_target = growth_param
+                
+                if maingroup_growth_targets is not None:
+                    maingroup_target = main_groups.map(maingroup_growth_targets).fillna(growth_param).to_numpy(dtype=float)
+                else:
+                    maingroup_target = growth_param
+                
+                if lessons_learned is not None:
+                    lessons_adjustment = self._lookup_by_group(main_groups, target_month, lessons_learned, 0) * 0.005
+                else:
+                    lessons_adjustment = 0
+                
+                combined_target = (monthly_target + maingroup_target) / 2 + lessons_adjustment
+                sales = sales * (1 + combined_target) * stock_health
+                gross_margin = np.clip(gross_margin + margin_improvement, 0, 1)
+                stock = stock * (1 + stock_change_pct)
+            
+            # Birim Fiyat = Geçen yıl Fiyat × (1 + Fiyat Değişimi)
+            price_change = self._lookup_by_group(main_groups, target_month, price_change_matrix, inflation_rate)
+            unit_price = unit_price * (1 + price_change)
+            
+            gross_profit = sales * gross_margin
+            cogs = sales - gross_profit
+            
+            month_forecast = pd.DataFrame({
+                'Year': target_year,
+                'Month': target_month,
+                'MainGroup': main_groups,
+                'Quantity': np.divide(sales, unit_price, out=np.zeros_like(sales), where=unit_price > 0),
+                'UnitPrice': unit_price,
+                'Sales': sales,
+                'GrossProfit': gross_profit,
+                'GrossMargin%': gross_margin,
+                'Stock': stock,
+                'COGS': cogs,
+                'Stock_COGS_Ratio': np.divide(stock, cogs, out=np.zeros_like(stock), where=cogs > 0)
+            })
+            
+            forecast_data.append(month_forecast)
+            forecast_by_period[(target_year, target_month)] = {
+                'Sales': sales, 'UnitPrice': unit_price, 'GrossMargin%': gross_margin, 'Stock': stock
+            }
+        
+        # Tüm tahminleri birleştir
+        return pd.concat(forecast_data, ignore_index=True)
+    
+    @staticmethod
+    def _lookup_by_row(main_groups, month, matrix, default):
+        """Legacy okuma: {(maingroup, month): değer} sözlüğü her satır için ayrı okunur"""
+        if not matrix:
+            return np.full(len(main_groups), default, dtype=float)
+        return main_groups.apply(lambda group: matrix.get((group, month), default)).to_numpy(dtype=float)
+    
+    @staticmethod
+    def _stock_health_factors_by_row(base_data):
+        """Legacy stok sağlık faktörleri - satır döngüsüyle (bkz. _stock_health_factors)"""
+        
+        # Ortalama Stok/COGS oranı (benchmark)
+        avg_stock_ratio = base_data['Stock_COGS_Ratio'].mean()
+        
+        # Her ana grup için stok sağlık faktörü hesapla
+        stock_health_factors = {}
+        
+        for _, row in base_data.iterrows():
+            main_group = row['MainGroup']
+            group_ratio = row['Stock_COGS_Ratio']
+            
+            # Benchmark'a göre sapma
+            if avg_stock_ratio > 0:
+                ratio_deviation = (group_ratio - avg_stock_ratio) / avg_stock_ratio
+                
+                # ÇOK KONSERVATIF AYARLAMA - Max %2.5
+                if ratio_deviation > 0.5:  # %50'den fazla yüksekse (yavaş hareket)
+                    # Hafif azalt: max %2.5 azalış
+                    adjustment = -0.01 - (min(ratio_deviation - 0.5, 0.5) * 0.03)
+                    adjustment = max(adjustment, -0.025)  # Max -%2.5
+                elif ratio_deviation < -0.3:  # %30'dan fazla düşükse (hızlı hareket)
+                    # Hafif artır: max %2.5 artış
+                    adjustment = 0.01 + (min(abs(ratio_deviation) - 0.3, 0.5) * 0.03)
+                    adjustment = min(adjustment, 0.025)  # Max +%2.5
+                else:
+                    # Normal aralıkta, ayarlama yok
+                    adjustment = 0
+                
+                stock_health_factors[main_group] = 1 + adjustment
+            else:
+                stock_health_factors[main_group] = 1.0
+        
+        return stock_health_factors
+    
+    @staticmethod
+    def _lookup_by_group(main_groups, month, matrix, default):
+        """{(maingroup, month): değer} sözlüğünden grup listesi için değerleri toplu oku"""
+        if not matrix:
+            return np.full(len(main_groups), default, dtype=float)
+        return np.array([matrix.get((group, month), default) for group in main_groups.tolist()], dtype=float)
+    
+    @staticmethod
+    def _stock_health_factors(base_data):
+        """{maingroup: stok sağlık faktörü} - Stok/COGS oranı ortalamadan sapmaya göre en fazla ±%2.5"""
+        
+        # Ortalama Stok/COGS oranı (benchmark)
+        avg_stock_ratio = base_data['Stock_COGS_Ratio'].mean()
+        
+        # Her ana grup için stok sağlık faktörü hesapla (legacy döngüsüyle aynı kurallar)
+        if avg_stock_ratio > 0:
+            ratio_deviation = (base_data['Stock_COGS_Ratio'].to_numpy() - avg_stock_ratio) / avg_stock_ratio
+            
+            # ÇOK KONSERVATIF AYARLAMA - Max %2.5
+            slow_adjustment = np.maximum(-0.01 - (np.minimum(ratio_deviation - 0.5, 0.5) * 0.03), -0.025)
+            fast_adjustment = np.minimum(0.01 + (np.minimum(np.abs(ratio_deviation) - 0.3, 0.5) * 0.03), 0.025)
+            adjustment = np.where(
+                ratio_deviation > 0.5, slow_adjustment,
+                np.where(ratio_deviation < -0.3, fast_adjustment, 0)
+            )
+            return dict(zip(base_data['MainGroup'], 1 + adjustment))
+        return dict.fromkeys(base_data['MainGroup'], 1.0)
+    
+    @traced()
+    @memory_tracked()
     def get_full_data_with_forecast(self, num_months=15, growth_param=0.1, margin_improvement=0.0, 
                                     stock_change_pct=0.0, monthly_growth_targets=None, 
                                     maingroup_growth_targets=None, lessons_learned=None,
                                     inflation_adjustment=1.0, organic_multiplier=0.5,
-                                    price_change_matrix=None, inflation_rate=0.25):
+                                    price_change_matrix=None, inflation_rate=0.25, engine='legacy'):
         """Gerçekleşen veri + gelecek tahminlerini birleştir"""
         
         # Gelecek tahminini yap
@@ -493,9 +1073,17 @@ class BudgetForecaster:
             inflation_adjustment=inflation_adjustment,
             organic_multiplier=organic_multiplier,
             price_change_matrix=price_change_matrix,
-            inflation_rate=inflation_rate
+            inflation_rate=inflation_rate,
+            engine=engine
         )
         
+        return self.merge_with_history(forecast)
+    
+    @traced()
+    @memory_tracked()
+    def merge_with_history(self, forecast):
+        """Gerçekleşen veriyi (son gerçekleşen aya kadar) tahmin tablosuyla birleştir"""
+        
         # Gerçekleşen veriyi düzenle - TAHMİN EDİLEN AYLARI ÇIKAR
         historical = self.data[['Year', 'Month', 'MainGroup', 'Quantity', 'UnitPrice',
                                'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS', 
@@ -512,42 +1100,194 @@ class BudgetForecaster:
         
         return full_data
     
-    def get_summary_stats(self, data):
-        """Özet istatistikler - Haftalık normalize edilmiş stok/SMM oranı dahil"""
+    def forecast_part(self, full_data):
+        """merge_with_history'nin tersi: gerçekleşen ayları çıkarıp sadece tahmin satırlarını döndür"""
+        is_actual = (
+            (full_data['Year'] < self.last_actual_year) |
+            ((full_data['Year'] == self.last_actual_year) & (full_data['Month'] <= self.last_actual_month))
+        )
+        return full_data[~is_actual].reset_index(drop=True)
+    
+    def shadow_forecast(self, candidate_engine='vectorized', rtol=1e-9, atol=1e-6, **forecast_params):
+        """
+        Shadow mod: legacy motor ve aday motoru aynı girdilerle çalıştırıp karşılaştır
         
-        summary = {}
+        Kullanıcıya her zaman legacy sonucu döner; aday motor sadece ölçülür.
         
-        # Tüm yılları al
-        years = sorted(data['Year'].unique())
+        Returns:
+        --------
+        (legacy_forecast, report) - report: engine süreleri, tolerans dışı hücreler, passed
+        """
         
-        for year in years:
-            year_data = data[data['Year'] == year].copy()
-            
-            # Yıllık Stok/SMM hesapla
-            # Önce her ay için toplam stok ve SMM hesapla
-            monthly_totals = year_data.groupby('Month').agg({
-                'Stock': 'sum',
-                'COGS': 'sum'
-            }).reset_index()
-            
-            # Ortalama aylık stok ve toplam yıllık SMM
-            avg_monthly_stock = monthly_totals['Stock'].mean()
-            total_yearly_cogs = monthly_totals['COGS'].sum()
-            
+        start = time.perf_counter()
+        legacy_forecast = self.forecast_future_months(engine='legacy', **forecast_params)
+        legacy_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        candidate_forecast = self.forecast_future_months(engine=candidate_engine, **forecast_params)
+        candidate_seconds = time.perf_counter() - start
+        
+        report = compare_forecasts(legacy_forecast, candidate_forecast, rtol=rtol, atol=atol)
+        report.update({
+            'candidate_engine': candidate_engine,
+            'legacy_seconds': legacy_seconds,
+            'candidate_seconds': candidate_seconds,
+            'speedup': legacy_seconds / candidate_seconds if candidate_seconds > 0 else None
+        })
+        
+        return legacy_forecast, report
+    
+    @traced()
+    @memory_tracked()
+    def get_summary_stats(self, data, as_frame=False):
+        """Özet istatistikler - Haftalık normalize edilmiş stok/SMM oranı dahil
+        
+        Tek bir (Year, Month) gruplamasıyla tüm yıllık metrikleri hesaplar.
+        as_frame=True ise yıl indeksli DataFrame, değilse {yıl: {metrik: değer}} döner.
+        """
+        
+        # Yıl-ay bazında tüm toplamlar tek geçişte
+        monthly_totals = data.groupby(['Year', 'Month'], dropna=False).agg(
+            Sales=('Sales', 'sum'),
+            GrossProfit=('GrossProfit', 'sum'),
+            Stock=('Stock', 'sum'),
+            Stock_Count=('Stock', 'count'),
+            COGS=('COGS', 'sum'),
+            Ratio=('Stock_COGS_Ratio', 'sum'),
+            Ratio_Count=('Stock_COGS_Ratio', 'count')
+        )
+        yearly_totals = monthly_totals.groupby(level='Year').sum()
+        
+        # Yıllık Stok/SMM: ortalama aylık stok ve toplam yıllık SMM (ayı belli satırlar)
+        valid_months = monthly_totals[monthly_totals.index.get_level_values('Month').notna()]
+        avg_monthly_stock = valid_months['Stock'].groupby(level='Year').mean().reindex(yearly_totals.index)
+        total_yearly_cogs = valid_months['COGS'].groupby(level='Year').sum().reindex(yearly_totals.index, fill_value=0)
+        
+        sales = yearly_totals['Sales']
+        
+        summary = pd.DataFrame({
+            'Total_Sales': sales,
+            'Total_GrossProfit': yearly_totals['GrossProfit'],
+            'Avg_GrossMargin%': (yearly_totals['GrossProfit'] / sales * 100).where(sales > 0, 0),
+            'Avg_Stock': yearly_totals['Stock'] / yearly_totals['Stock_Count'],
+            'Avg_Stock_COGS_Ratio': yearly_totals['Ratio'] / yearly_totals['Ratio_Count'],
             # Haftalık oran: Ort. Aylık Stok / (Toplam Yıllık SMM / 52)
-            stock_cogs_weekly = (avg_monthly_stock / (total_yearly_cogs / 52)) if total_yearly_cogs > 0 else 0
-            
-            summary[year] = {
-                'Total_Sales': year_data['Sales'].sum(),
-                'Total_GrossProfit': year_data['GrossProfit'].sum(),
-                'Avg_GrossMargin%': (year_data['GrossProfit'].sum() / year_data['Sales'].sum() * 100) if year_data['Sales'].sum() > 0 else 0,
-                'Avg_Stock': year_data['Stock'].mean(),
-                'Avg_Stock_COGS_Ratio': year_data['Stock_COGS_Ratio'].mean(),
-                'Avg_Stock_COGS_Weekly': stock_cogs_weekly
-            }
+            'Avg_Stock_COGS_Weekly': (avg_monthly_stock / (total_yearly_cogs / 52)).where(total_yearly_cogs > 0, 0)
+        })
+        
+        if as_frame:
+            return summary
+        
+        return {int(year): metrics for year, metrics in summary.to_dict(orient='index').items()}
+    
+    def backtest(self, cutoffs=None, horizon=3, min_history=3, n_jobs=1, **forecast_params):
+        """
+        Walk-forward backtest: her kesim ayında tahmini yeniden çalıştır ve gerçekleşenle karşılaştır
+        
+        Parameters:
+        -----------
+        cutoffs: [(yıl, ay), ...] kesim noktaları (None = gerçekleşen tüm aylar)
+        horizon: Her kesimden kaç ay ileri tahmin yapılacak
+        min_history: İlk kesimden önce gereken minimum ay sayısı
+        n_jobs: Paralel process sayısı (varsayılan 1 = seri, None = CPU sayısı)
+        forecast_params: forecast_future_months parametreleri (growth_param, lessons_learned, ...)
+        
+        Returns:
+        --------
+        Dict: details (kesim × hedef ay × grup), by_group_horizon, by_horizon, overall
+        """
+        
+        # Gerçekleşen dönemler (son gerçekleşen aya kadar). _fill_missing_months'ın önceki aydan
+        # türettiği aylar gerçekleşen değildir: kesim ve hedef ay olarak kullanılmaz
+        period_sales = self.data.groupby(['Year', 'Month'])['Sales'].sum()
+        periods = [
+            (int(year), int(month)) for (year, month), sales in period_sales.items()
+            if sales > 100000 and (year, month) <= (self.last_actual_year, self.last_actual_month)
+            and (int(year), int(month)) not in self.estimated_periods
+        ]
+        
+        if cutoffs is None:
+            # Son ayın ertesi gerçekleşmediği için kesim olamaz
+            cutoffs = periods[max(min_history - 1, 0):-1]
+        cutoffs = [(int(year), int(month)) for year, month in cutoffs]
+        
+        if len(cutoffs) == 0:
+            raise ValueError("Backtest için yeterli geçmiş veri yok")
+        
+        tasks = [
+            (self.as_of(year, month).data, year, month, horizon, forecast_params)
+            for year, month in cutoffs
+        ]
+        
+        if n_jobs is None:
+            n_jobs = os.cpu_count() or 1
+        n_jobs = min(n_jobs, len(tasks))
+        
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                forecasts = list(executor.map(_backtest_cutoff, *zip(*tasks)))
+        else:
+            forecasts = [_backtest_cutoff(*task) for task in tasks]
+        
+        forecasts = pd.concat(forecasts, ignore_index=True).rename(columns={'Sales': 'Forecast'})
         
-        return summary
+        # Her kesim için ufuk içindeki gerçekleşmiş hedef aylar
+        period_index = {year * 12 + month for year, month in periods}
+        targets = pd.DataFrame(
+            [(year, month, h) for year, month in cutoffs for h in range(1, horizon + 1)],
+            columns=['CutoffYear', 'CutoffMonth', 'Horizon']
+        )
+        target_index = targets['CutoffYear'] * 12 + targets['CutoffMonth'] - 1 + targets['Horizon']
+        targets['Year'] = target_index // 12
+        targets['Month'] = target_index % 12 + 1
+        targets = targets[(targets['Year'] * 12 + targets['Month']).isin(period_index)]
+        
+        actuals = self.data.groupby(['Year', 'Month', 'MainGroup'], as_index=False)['Sales'].sum()
+        actuals = targets.merge(actuals.rename(columns={'Sales': 'Actual'}), on=['Year', 'Month'])
+        
+        # Tahmin edilmemiş grup = 0 tahmin, gerçekleşmemiş grup = 0 gerçekleşen
+        keys = ['CutoffYear', 'CutoffMonth', 'Horizon', 'Year', 'Month', 'MainGroup']
+        forecasts = forecasts.merge(targets, on=keys[:5])
+        details = forecasts[keys + ['Forecast']].merge(actuals, on=keys, how='outer')
+        details[['Forecast', 'Actual']] = details[['Forecast', 'Actual']].fillna(0)
+        details[['Horizon', 'CutoffYear', 'CutoffMonth']] = details[['Horizon', 'CutoffYear', 'CutoffMonth']].astype(int)
+        details = details.sort_values(['CutoffYear', 'CutoffMonth', 'Horizon', 'MainGroup']).reset_index(drop=True)
+        
+        return {
+            'details': details,
+            'by_group_horizon': _score_backtest(details, ['MainGroup', 'Horizon']),
+            'by_horizon': _score_backtest(details, ['Horizon']),
+            'overall': _score_overall(details)
+        }
+    
+    @traced()
+    @memory_tracked()
+    def get_aggregate_cube(self, data):
+        """
+        Year × Month × MainGroup toplam küpü ve grafiklerin kullandığı roll-up'lar
+        
+        Tahmin üretildiğinde bir kez hesaplanır; sonuç ekranındaki tüm grafikler buradan dilimler.
+        
+        Returns:
+        --------
+        Dict: cube (Year, Month, MainGroup), monthly (Year, Month - Margin% dahil), yearly_group (Year, MainGroup)
+        """
+        
+        value_columns = ['Quantity', 'Sales', 'GrossProfit', 'Stock', 'COGS']
+        cube = data.groupby(['Year', 'Month', 'MainGroup'])[value_columns].sum()
+        
+        monthly = cube.groupby(level=['Year', 'Month']).sum()
+        monthly['Margin%'] = (monthly['GrossProfit'] / monthly['Sales'] * 100).where(monthly['Sales'] > 0, 0)
+        
+        yearly_group = cube.groupby(level=['Year', 'MainGroup']).sum()
+        
+        return {
+            'cube': cube,
+            'monthly': monthly,
+            'yearly_group': yearly_group
+        }
     
+    @traced()
     def get_forecast_quality_metrics(self, data):
         """Forecast kalite metriklerini hesapla"""
         
@@ -0,0 +1,183 @@
+"""
+Süreç içi iş kuyruğu - uzun tahmin çalıştırmaları arka planda, ilerleme ve ara sonuçlarla
+
+Bir iş, sırayla çalışan (etiket, fonksiyon) adımlarından oluşur (örn. senaryo başına bir tahmin).
+İşler sabit boyutlu thread havuzunda yürür; her adım bitince ilerleme ve ara sonuç güncellenir,
+iptal isteği adımlar arasında kontrol edilir. Arayüz durumu snapshot() ile yoklar, beklemez.
+
+Kuyruk süreç genelindedir ve oturum bellek ölçümüne girmez: adım fonksiyonları (ve yakaladıkları
+veriler) iş bitince bırakılır, sonuçlar sahibi collect() ile alınca kuyruktan çıkar. Alınmayan
+bitmiş işler FINISHED_JOB_TTL saniye sonra (veya max_finished sayısı aşılınca) atılır.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+FINISHED_STATUSES = (DONE, CANCELLED, FAILED)
+
+# Sahibi tarafından alınmayan bitmiş işlerin kuyrukta kalma süresi (saniye)
+FINISHED_JOB_TTL = 600
+
+STATUS_LABELS = {
+    QUEUED: '⏳ Sırada',
+    RUNNING: '⚙️ Çalışıyor',
+    DONE: '✅ Tamamlandı',
+    CANCELLED: '🛑 İptal edildi',
+    FAILED: '❌ Hata'
+}
+
+
+class Job:
+    """Tek bir arka plan işi - alanlar JobQueue kilidi altında güncellenir"""
+
+    def __init__(self, name, steps):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.steps = steps
+        self.total = len(steps)
+        self.completed = 0
+        self.current = None
+        self.status = QUEUED
+        self.results = []
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+
+class JobQueue:
+    """Thread havuzu üzerinde çalışan iş kuyruğu (oturumlar arasında paylaşılabilir, thread-safe)"""
+
+    def __init__(self, workers=2, max_finished=50, finished_ttl=FINISHED_JOB_TTL):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='forecast-job')
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+
+    def submit(self, name, steps):
+        """
+        İşi kuyruğa ekle ve id'sini döndür
+
+        steps: (etiket, fonksiyon) listesi - fonksiyon argümansız çağrılır, dönüşü ara sonuç olur
+        """
+        job = Job(name, list(steps))
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job)
+        return job.id
+
+    def _prune(self):
+        """Süresi dolan ve sayı sınırını aşan en eski bitmiş işleri at (kilit altında çağrılır)"""
+        expired = time.time() - self.finished_ttl
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATUSES]
+        overflow = len(finished) - self.max_finished
+        for index, job_id in enumerate(finished):
+            if index < overflow or self.jobs[job_id].finished < expired:
+                del self.jobs[job_id]
+
+    @staticmethod
+    def _finish(job, status, error=None):
+        """İşi bitmiş olarak işaretle ve adımları bırak (kilit altında çağrılır)"""
+        job.status = status
+        job.error = error
+        job.current = None
+        job.finished = time.time()
+        # Adım closure'ları büyük girdileri (forecaster, yüklenen dosya) tutabilir
+        job.steps = None
+
+    def _run(self, job):
+        with self.lock:
+            if job.cancel_event.is_set():
+                self._finish(job, CANCELLED)
+                return
+            job.status = RUNNING
+            job.started = time.time()
+            steps = job.steps
+
+        for label, func in steps:
+            if job.cancel_event.is_set():
+                with self.lock:
+                    self._finish(job, CANCELLED)
+                return
+
+            with self.lock:
+                job.current = label
+            try:
+                result = func()
+            except Exception as e:
+                with self.lock:
+                    self._finish(job, FAILED, f"{label}: {type(e).__name__}: {e}")
+                return
+
+            with self.lock:
+                job.results.append((label, result))
+                job.completed += 1
+
+        with self.lock:
+            self._finish(job, DONE)
+
+    def wait(self, job_id, timeout=None):
+        """İş bitene kadar en fazla timeout saniye bekle; bittiyse True"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return True
+        wait([job.future], timeout=timeout)
+        with self.lock:
+            return job.status in FINISHED_STATUSES
+
+    def cancel(self, job_id):
+        """İptal iste - sıradaki iş hiç başlamaz, çalışan iş mevcut adım bitince durur"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return False
+            job.cancel_event.set()
+            if job.status == QUEUED and job.future is not None and job.future.cancel():
+                self._finish(job, CANCELLED)
+        return True
+
+    def snapshot(self, job_id):
+        """İşin anlık durumu (kopya) - iş bulunamazsa None"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            end = job.finished or time.time()
+            return {
+                'id': job.id,
+                'name': job.name,
+                'status': job.status,
+                'completed': job.completed,
+                'total': job.total,
+                'progress': job.completed / job.total if job.total else 1.0,
+                'current': job.current,
+                'results': list(job.results),
+                'error': job.error,
+                'elapsed': end - (job.started or end)
+            }
+
+    def collect(self, job_id):
+        """
+        snapshot() gibi; iş bitmişse kuyruktan da çıkarır (sonuçlar sadece alan oturumda kalır)
+
+        Bitmemiş iş kuyrukta kalır; iş bulunamazsa None.
+        """
+        job = self.snapshot(job_id)
+        if job is not None and job['status'] in FINISHED_STATUSES:
+            with self.lock:
+                self.jobs.pop(job_id, None)
+        return job
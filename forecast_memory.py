@@ -0,0 +1,291 @@
+"""
+Bellek muhasebesi - tahmin çağrısı başına tepe bellek (tracemalloc) ve oturum başına tutulan nesne boyutu
+
+Tepe bellek ölçümü varsayılan olarak kapalıdır (tracemalloc her bellek ayırmayı izler ve işi
+yavaşlatır): BUDGET_TRACE_MEMORY=1 ile açılır. Ölçüm süreç geneli olduğu için aynı anda çalışan
+başka thread'lerin ayırmaları da o çağrının tepesine dahil olur (yaklaşık değer).
+
+Oturum boyutu st.session_state'teki nesnelerin derin boyutudur (DataFrame'ler memory_usage(deep=True)
+ile); aynı nesne bir oturumda bir kez sayılır, oturumlar arası paylaşılan nesneler her oturumda sayılır.
+Her çalıştırmada ölçülür ama kimliği değişmeyen nesneler (sonuç, önbellek) önceki ölçümden okunur.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from forecast_metrics import gauge, get_logger, histogram
+
+
+MEMORY_TRACKING = os.environ.get('BUDGET_TRACE_MEMORY', '0') == '1'
+
+# Uyarı eşikleri (MB)
+FORECAST_MEMORY_WARN_MB = float(os.environ.get('BUDGET_FORECAST_MEMORY_WARN_MB', '500'))
+SESSION_MEMORY_WARN_MB = float(os.environ.get('BUDGET_SESSION_MEMORY_WARN_MB', '200'))
+
+# Bu süre güncellenmeyen oturumlar listeden düşer (saniye)
+SESSION_TTL_SECONDS = 3600
+
+# Son ölçümlerden saklanan adet
+RECENT_LIMIT = 100
+
+MB = 1024 * 1024
+BYTE_BUCKETS = tuple(size * MB for size in (1, 4, 16, 64, 256, 1024, 4096))
+
+logger = get_logger('memory')
+
+PEAK_BYTES = histogram('budget_forecast_peak_bytes', 'Tahmin çağrısı başına tracemalloc tepe belleği',
+                       ('function',), buckets=BYTE_BUCKETS)
+SESSION_BYTES = gauge('budget_session_memory_bytes', 'Oturumun st.session_state nesne boyutu', ('session',))
+
+_lock = threading.Lock()
+_active = []
+_enabled = False
+_recent = deque(maxlen=RECENT_LIMIT)
+
+
+class _Measurement:
+    """Açık bir ölçüm - başlangıçtaki ve o ana kadar görülen en yüksek izlenen bellek"""
+
+    __slots__ = ('start', 'peak')
+
+    def __init__(self, current):
+        self.start = current
+        self.peak = current
+
+
+def start_memory_tracking(frames=1):
+    """tracemalloc'u başlat ve @memory_tracked ölçümlerini aç (tekrar çağrılabilir)"""
+    global _enabled
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _enabled = True
+
+
+def stop_memory_tracking():
+    global _enabled
+    with _lock:
+        _enabled = False
+        _active.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def memory_tracking_enabled():
+    return _enabled
+
+
+def _flush():
+    """Tepe değeri açık ölçümlere işle ve sıfırla (iç içe ölçümler birbirinin tepesini silmesin)"""
+    current, peak = tracemalloc.get_traced_memory()
+    for measurement in _active:
+        measurement.peak = max(measurement.peak, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+def memory_tracked(name=None):
+    """
+    Fonksiyonun tepe bellek kullanımını ölç (başlangıca göre ek bellek, bayt)
+
+    Sadece start_memory_tracking() ile açıldığında ölçer; başka kodun başlattığı tracemalloc
+    (örn. benchmark.measure) sıfırlanmaz.
+    """
+    def decorator(func):
+        measurement_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            with _lock:
+                measurement = _Measurement(_flush())
+                _active.append(measurement)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                with _lock:
+                    if measurement in _active:
+                        _flush()
+                        _active.remove(measurement)
+                record_peak(measurement_name, measurement.peak - measurement.start, seconds)
+        return wrapper
+    return decorator
+
+
+def record_peak(name, peak_bytes, seconds):
+    """Ölçümü histograma ve son ölçümlere ekle, eşik aşıldıysa uyar"""
+    PEAK_BYTES.observe(peak_bytes, function=name)
+    _recent.append({
+        'function': name,
+        'peak_mb': peak_bytes / MB,
+        'seconds': seconds,
+        'thread': threading.current_thread().name,
+        'time': time.time()
+    })
+    if peak_bytes > FORECAST_MEMORY_WARN_MB * MB:
+        logger.warning(f"{name} tepe belleği {peak_bytes / MB:,.0f} MB (eşik {FORECAST_MEMORY_WARN_MB:,.0f} MB)",
+                       extra={'event': 'forecast_memory_warning', 'function': name, 'peak_bytes': peak_bytes})
+
+
+def recent_measurements():
+    """Son ölçümler (eskiden yeniye)"""
+    return list(_recent)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Nesnenin kapsadığı toplam bellek (bayt, yaklaşık)
+
+    DataFrame/Series/Index memory_usage(deep=True), ndarray nbytes; kapsayıcılar ve __dict__'li
+    nesneler içerikleriyle birlikte sayılır. seen'deki nesneler (id) tekrar sayılmaz.
+    """
+    seen = set() if seen is None else seen
+    return _walk_sizeof(obj, seen, set(), set())
+
+
+def _walk_sizeof(obj, seen, counted, skipped):
+    """deep_sizeof gövdesi; sayılan nesnelerin id'leri counted'a, seen'de olduğu için atlananlar skipped'a yazılır"""
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            skipped.add(id(item))
+            continue
+        seen.add(id(item))
+        counted.add(id(item))
+
+        if isinstance(item, pd.DataFrame):
+            total += int(item.memory_usage(index=True, deep=True).sum())
+        elif isinstance(item, (pd.Series, pd.Index)):
+            total += int(item.memory_usage(deep=True))
+        elif isinstance(item, np.ndarray):
+            total += item.nbytes
+            if item.dtype == object:
+                stack.extend(item.ravel().tolist())
+        elif isinstance(item, dict):
+            total += sys.getsizeof(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            total += sys.getsizeof(item)
+            stack.extend(item)
+        elif isinstance(item, (str, bytes, bytearray, int, float, bool, type(None))):
+            total += sys.getsizeof(item)
+        else:
+            total += sys.getsizeof(item)
+            # Sınıf, modül ve fonksiyonlar oturuma ait değil - içlerine inilmez
+            if hasattr(item, '__dict__') and not isinstance(item, (type, types.ModuleType, types.FunctionType,
+                                                                 types.MethodType)):
+                stack.append(vars(item))
+    return total
+
+
+def _identity(obj, depth=2):
+    """Nesnenin kimliği; kapsayıcılarda iki seviyeye kadar elemanların kimliğiyle (yerinde ekleme/çıkarma fark edilsin)"""
+    if depth and isinstance(obj, dict):
+        return id(obj), tuple((id(key), _identity(value, depth - 1)) for key, value in obj.items())
+    if depth and isinstance(obj, (list, tuple, deque)):
+        return id(obj), tuple(_identity(item, depth - 1) for item in obj)
+    return id(obj)
+
+
+def measure_state(state, cache=None):
+    """
+    Oturum durumundaki her anahtarın boyutu (büyükten küçüğe)
+
+    Anahtarlar sırayla ölçülür; önceki anahtarda sayılan ortak nesne sonrakinde tekrar sayılmaz.
+    cache (oturumda tutulan boş bir dict) verilirse nesne kimliği değişmeyen anahtar yeniden
+    yürünmez, önceki ölçümü kullanılır. Önceki ölçümde sayılan nesnelerden biri bu kez daha önceki
+    bir anahtarda sayıldıysa ya da başka anahtara bırakılan ortak nesne artık sayılmadıysa anahtar
+    yeniden ölçülür - böylece sonuç önbelleksiz ölçümle aynı kalır.
+    """
+    seen = set()
+    sizes = {}
+    for key, value in state.items():
+        identity = _identity(value)
+        entry = cache.get(key) if cache is not None else None
+        if (entry is not None and entry['value'] is value and entry['identity'] == identity
+                and entry['counted'].isdisjoint(seen) and entry['skipped'] <= seen):
+            seen |= entry['counted']
+            sizes[key] = entry['size']
+            continue
+
+        counted, skipped = set(), set()
+        sizes[key] = _walk_sizeof(value, seen, counted, skipped)
+        if cache is not None:
+            cache[key] = {'value': value, 'identity': identity, 'size': sizes[key],
+                          'counted': counted, 'skipped': skipped - counted}
+
+    if cache is not None:
+        for key in set(cache) - set(state):
+            del cache[key]
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+
+class SessionMemoryRegistry:
+    """Oturumların son ölçülen bellek kullanımı (tüm oturumlar paylaşır, thread-safe)"""
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, warn_mb=SESSION_MEMORY_WARN_MB):
+        self.ttl_seconds = ttl_seconds
+        self.warn_mb = warn_mb
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def update(self, session_id, sizes, label=None):
+        """
+        Oturumun ölçümünü kaydet; eşik ilk kez aşıldığında uyarı logu yazar
+
+        Returns:
+        --------
+        bool: toplam eşiği aşıyor mu
+        """
+        total = sum(sizes.values())
+        over = total > self.warn_mb * MB
+        with self.lock:
+            previous = self.sessions.get(session_id)
+            self.sessions[session_id] = {
+                'session': session_id,
+                'label': label,
+                'total_bytes': total,
+                'sizes': sizes,
+                'updated': time.time()
+            }
+            was_over = previous is not None and previous['total_bytes'] > self.warn_mb * MB
+        SESSION_BYTES.set(total, session=session_id)
+
+        if over and not was_over:
+            largest = next(iter(sizes), None)
+            logger.warning(f"Oturum {session_id} belleği {total / MB:,.0f} MB (eşik {self.warn_mb:,.0f} MB)",
+                           extra={'event': 'session_memory_warning', 'session': session_id,
+                                  'total_bytes': total, 'largest_key': largest})
+        self.prune()
+        return over
+
+    def prune(self):
+        """TTL'i geçen oturumları çıkar"""
+        cutoff = time.time() - self.ttl_seconds
+        with self.lock:
+            stale = [session_id for session_id, entry in self.sessions.items() if entry['updated'] < cutoff]
+            for session_id in stale:
+                del self.sessions[session_id]
+        for session_id in stale:
+            SESSION_BYTES.remove(session=session_id)
+
+    def list_sessions(self):
+        """Oturumlar, en çok bellek kullanandan başlayarak"""
+        with self.lock:
+            entries = [dict(entry) for entry in self.sessions.values()]
+        return sorted(entries, key=lambda entry: entry['total_bytes'], reverse=True)
@@ -0,0 +1,289 @@
+"""
+Yapılandırılmış log ve metrikler - print yerine seviye kontrollü log, sayaç ve süre histogramları
+
+Log: Modüller get_logger() ile 'budget' hiyerarşisine yazar, olay alanları extra={...} ile verilir.
+Kütüphane handler kurmaz; giriş noktaları (app, servis, batch) configure_logging() çağırır.
+    BUDGET_LOG_LEVEL=DEBUG|INFO|WARNING|...   (varsayılan INFO)
+    BUDGET_LOG_FORMAT=text|json               (json: satır başına bir JSON nesnesi)
+
+Metrikler süreç içidir (ProcessPoolExecutor worker'larındaki sayımlar ana sürece gelmez).
+render_prometheus() Prometheus metin formatı üretir; write_prometheus() dosyaya atomik yazar
+(node_exporter textfile collector ile toplanabilir).
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+LOG_LEVEL = os.environ.get('BUDGET_LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('BUDGET_LOG_FORMAT', 'text')
+
+# Süre histogramı sınırları (saniye)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# LogRecord'un kendi alanları - geri kalanlar extra ile verilen olay alanlarıdır
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'taskName'}
+
+
+def get_logger(name):
+    """'budget' hiyerarşisinde logger (configure_logging hepsini birlikte ayarlar)"""
+    return logging.getLogger(f'budget.{name}')
+
+
+class StructuredFormatter(logging.Formatter):
+    """Mesaj + extra alanları: text'te 'anahtar=değer', json'da tek satır nesne"""
+
+    def __init__(self, json_format=False):
+        super().__init__()
+        self.json_format = json_format
+
+    def format(self, record):
+        fields = {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES}
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}'
+
+        if self.json_format:
+            payload = {
+                'ts': timestamp,
+                'level': record.levelname,
+                'logger': record.name,
+                'msg': record.getMessage(),
+                **fields
+            }
+            if record.exc_info:
+                payload['exc'] = self.formatException(record.exc_info)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        line = f"{timestamp} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line += ' | ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level=None, json_format=None):
+    """'budget' logger'larını stderr'e yönlendir (tekrar çağrılırsa sadece seviye/biçim güncellenir)"""
+    level = (level or LOG_LEVEL).upper()
+    json_format = LOG_FORMAT == 'json' if json_format is None else json_format
+
+    logger = logging.getLogger('budget')
+    logger.setLevel(level)
+    logger.propagate = False
+
+    handler = next((handler for handler in logger.handlers if getattr(handler, '_budget_handler', False)), None)
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler._budget_handler = True
+        logger.addHandler(handler)
+    handler.setFormatter(StructuredFormatter(json_format=json_format))
+    return logger
+
+
+def _label_key(label_names, labels):
+    if set(labels) != set(label_names):
+        raise ValueError(f"Etiketler {sorted(label_names)} olmalı, verilen: {sorted(labels)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+
+def _format_labels(label_names, key, extra=()):
+    pairs = list(zip(label_names, key)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Artan sayaç (etiket kombinasyonu başına)"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(_label_key(self.label_names, labels), 0.0)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, self.label_names, key, (), value) for key, value in sorted(self.values.items())]
+
+
+class Gauge:
+    """Anlık değer (etiket kombinasyonu başına) - örn. oturum belleği"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def set(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self.lock:
+            self.values[key] = float(value)
+
+    def remove(self, **labels):
+        key = _label_key(self.label_names, labels)
+        with self.lock:
+            self.values.pop(key, None)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, self.label_names, key, (), value) for key, value in sorted(self.values.items())]
+
+
+class Histogram:
+    """Süre/boyut dağılımı - kümülatif kovalar, toplam ve adet"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self.lock:
+            state = self.values.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][position] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Blok süresini gözlemle"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self.lock:
+            states = sorted((key, dict(state, counts=list(state['counts']))) for key, state in self.values.items())
+
+        samples = []
+        for key, state in states:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', self.label_names, key, (('le', repr(float(bound))),), cumulative))
+            samples.append((f'{self.name}_bucket', self.label_names, key, (('le', '+Inf'),), state['count']))
+            samples.append((f'{self.name}_sum', self.label_names, key, (), state['sum']))
+            samples.append((f'{self.name}_count', self.label_names, key, (), state['count']))
+        return samples
+
+
+class MetricsRegistry:
+    """Metrik kayıt defteri - aynı adla tekrar istenen metrik aynı nesnedir"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get_or_create(self, cls, name, help_text, label_names, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, label_names, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metrik '{name}' farklı tip veya etiketlerle zaten tanımlı")
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._get_or_create(Gauge, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def render_prometheus(self):
+        """Prometheus metin formatı (0.0.4)"""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue  # Bu süreçte hiç işlenmemiş metrik (örn. servisin import ettiği batch metrikleri)
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, label_names, key, extra, value in samples:
+                lines.append(f'{name}{_format_labels(label_names, key, extra)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+REGISTRY = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def counter(name, help_text, label_names=()):
+    """Varsayılan kayıt defterinde sayaç"""
+    return REGISTRY.counter(name, help_text, label_names)
+
+
+def gauge(name, help_text, label_names=()):
+    """Varsayılan kayıt defterinde anlık değer"""
+    return REGISTRY.gauge(name, help_text, label_names)
+
+
+def histogram(name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+    """Varsayılan kayıt defterinde histogram"""
+    return REGISTRY.histogram(name, help_text, label_names, buckets=buckets)
+
+
+def render_prometheus(registry=REGISTRY):
+    return registry.render_prometheus()
+
+
+def write_prometheus(path, registry=REGISTRY):
+    """Metrikleri dosyaya yaz (geçici dosya + rename, okuyucu yarım dosya görmez)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(registry.render_prometheus())
+    os.replace(tmp_path, path)
+
+
+# Ortak metrikler (birden fazla modül aynı adla kaydeder)
+FORECAST_CACHE_REQUESTS = counter(
+    'budget_forecast_cache_requests_total', 'Tahmin sonucu önbellek sorguları', ('cache', 'result')
+)
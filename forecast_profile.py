@@ -0,0 +1,284 @@
+"""
+İsteğe bağlı cProfile yakalama - yavaş bir Hesapla çalıştırmasını yerelde tekrar üretmek için
+
+Arayüzde profil açıkken sonraki hesaplama (Excel okuma + tahmin + özetler) cProfile altında çalışır;
+sonuç .prof (pstats / snakeviz), katlanmış yığın (flamegraph.pl, speedscope - aynı anda alınan yığın
+örneklerinden) ve anonim parametre seti olarak indirilir. Ana grup adları 'Grup 0001' biçimine çevrilir, veri setinden sadece boyutlar
+saklanır.
+
+Tekrar oynatma (aynı boyutta sentetik veriyle, benchmark.make_synthetic_workbook):
+    python forecast_profile.py profil_parametreler.json
+    python forecast_profile.py profil_parametreler.json --output replay --sort tottime --top 40
+"""
+import argparse
+import cProfile
+import io
+import json
+import marshal
+import os
+import platform
+import pstats
+import sys
+import tempfile
+import threading
+import time
+
+from budget_export import _decode_params, _encode_params
+
+
+# Katlanmış yığın için örnekleme aralığı (saniye)
+SAMPLE_INTERVAL = 0.005
+
+
+def anonymize_params(params, main_groups):
+    """
+    Ana grup adlarını sıra numarasıyla değiştir (sıralı ada göre 'Grup 0001', 'Grup 0002', ...)
+
+    benchmark.make_synthetic_workbook aynı adları ürettiği için parametreler sentetik veriye doğrudan uyar.
+    """
+    aliases = {group: f'Grup {index:04d}' for index, group in enumerate(sorted(main_groups), start=1)}
+
+    def rename(key):
+        if isinstance(key, tuple):
+            return tuple(rename(part) for part in key)
+        return aliases.get(key, key)
+
+    def walk(value):
+        if isinstance(value, dict):
+            return {rename(key): walk(item) for key, item in value.items()}
+        return value
+
+    return {name: walk(value) for name, value in params.items()}
+
+
+def describe_dataset(forecaster):
+    """Veri setinin sadece boyutları (ad ve tutar içermez)"""
+    data = forecaster.data
+    return {
+        'groups': int(data['MainGroup'].nunique()),
+        'rows': len(data),
+        'years': sorted(int(year) for year in data['Year'].unique()),
+        'last_actual': [forecaster.last_actual_year, forecaster.last_actual_month]
+    }
+
+
+def _label(func):
+    """pstats fonksiyon anahtarı → 'ad (dosya:satır)' (katlanmış formatta ';' ayraç olduğu için temizlenir)"""
+    filename, line, name = func
+    if filename == '~':
+        label = name
+    else:
+        label = f'{name} ({os.path.basename(filename)}:{line})'
+    return label.replace(';', ',')
+
+
+class _StackSampler(threading.Thread):
+    """
+    Hedef thread'in çağrı yığınını aralıklarla örnekler
+
+    cProfile sadece çağıran → çağrılan kenarlarını tutar (tam yığın yok, ortak @traced sarmalayıcısı
+    kenarları birleştirir); katlanmış yığın bu yüzden profille aynı anda alınan örneklerden üretilir.
+    """
+
+    def __init__(self, thread_id, skip_frames, interval=SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.skip_frames = skip_frames
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.stacks = {}
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            # Profili başlatan çağrıya kadarki çerçeveler (iş kuyruğu, Streamlit) atlanır
+            stack = tuple(reversed(stack))[self.skip_frames:]
+            if stack:
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class ForecastProfile:
+    """Tek bir çalıştırmanın cProfile kaydı ve tekrar oynatma bilgisi"""
+
+    def __init__(self, name, replay=None):
+        self.name = name
+        self.replay = replay or {}
+        self.created = time.time()
+        self.seconds = None
+        self.stats = None
+        self.stacks = {}
+        self.sample_interval = SAMPLE_INTERVAL
+
+    def run(self, func, *args, **kwargs):
+        """
+        func'ı bu thread'de profilleyerek çağır (cProfile sadece çağıran thread'i ölçer)
+
+        Aynı kayıtla tekrar çağrılırsa (örn. iş kuyruğu adımları) süre, istatistik ve yığınlar birleşir.
+        """
+        depth = 0
+        frame = sys._getframe()
+        while frame is not None:
+            depth += 1
+            frame = frame.f_back
+
+        # +1: cProfile.Profile.runcall çerçevesi
+        sampler = _StackSampler(threading.get_ident(), skip_frames=depth + 1, interval=self.sample_interval)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            sampler.stop()
+            if self.stats is None:
+                self.seconds = seconds
+                self.stats = pstats.Stats(profiler)
+                self.stacks = sampler.stacks
+            else:
+                self.seconds += seconds
+                self.stats.add(pstats.Stats(profiler))
+                for stack, count in sampler.stacks.items():
+                    self.stacks[stack] = self.stacks.get(stack, 0) + count
+
+    @property
+    def ready(self):
+        return self.stats is not None
+
+    def top(self, limit=25, sort='cumulative'):
+        """
+        En pahalı fonksiyonlar
+
+        Returns:
+        --------
+        List[Dict]: function, calls, tottime, cumtime (saniye)
+        """
+        rows = [
+            {'function': _label(func), 'calls': nc, 'primitive_calls': cc, 'tottime': tt, 'cumtime': ct}
+            for func, (cc, nc, tt, ct, _) in self.stats.stats.items()
+        ]
+        key = 'tottime' if sort == 'tottime' else 'cumtime'
+        return sorted(rows, key=lambda row: row[key], reverse=True)[:limit]
+
+    def report(self, limit=40, sort='cumulative'):
+        """pstats metin raporu"""
+        output = io.StringIO()
+        # Kopya üzerinde sıralanır (kaydın kendisi değişmesin)
+        stats = pstats.Stats(stream=output)
+        stats.add(self.stats)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def pstats_bytes(self):
+        """.prof dosya içeriği (pstats.Stats(path), snakeviz, gprof2dot ile açılır)"""
+        return marshal.dumps(self.stats.stats)
+
+    def collapsed_stacks(self):
+        """
+        Katlanmış yığın metni ('a;b;c mikrosaniye' satırları) - flamegraph.pl / speedscope
+
+        Örnek sayıları ölçülen toplam süreye ölçeklenir (GIL yüzünden örnekler tam aralıkla alınamaz).
+        """
+        total_samples = sum(self.stacks.values())
+        if not total_samples:
+            return ''
+        sample_us = self.seconds * 1e6 / total_samples
+        lines = sorted(f"{';'.join(map(_label, stack))} {round(count * sample_us)}" for stack, count in self.stacks.items())
+        return '\n'.join(lines) + '\n'
+
+    def replay_json(self):
+        """Anonim parametre seti + veri seti boyutları (tekrar oynatma girdisi)"""
+        return {
+            'name': self.name,
+            'created': self.created,
+            'seconds': self.seconds,
+            'python': platform.python_version(),
+            **self.replay
+        }
+
+
+def build_replay(forecaster, params, engine='legacy'):
+    """Profil kaydına eklenecek tekrar oynatma bilgisi (params'taki 'engine' ayrı alana taşınır)"""
+    params = dict(params)
+    engine = params.pop('engine', engine)
+    main_groups = forecaster.data['MainGroup'].unique().tolist()
+    return {
+        'dataset': describe_dataset(forecaster),
+        'engine': engine,
+        'params': _encode_params(anonymize_params(params, main_groups))
+    }
+
+
+def replay(bundle):
+    """
+    Kayıttaki boyutlarla sentetik Excel üret ve Excel okuma + tahmin + özetleri profille
+
+    Returns:
+    --------
+    ForecastProfile
+    """
+    from benchmark import make_synthetic_workbook
+    from budget_forecast import BudgetForecaster
+
+    dataset = bundle['dataset']
+    params = _decode_params(bundle['params'])
+    years = 2 if 2025 in dataset['years'] else 1
+    last_actual_year, last_actual_month = dataset['last_actual']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'replay.xlsx')
+        make_synthetic_workbook(path, groups=dataset['groups'], years=years,
+                                last_actual_month=last_actual_month if last_actual_year == 2025 else 12)
+        with open(path, 'rb') as f:
+            content = f.read()
+
+    def run():
+        forecaster = BudgetForecaster(content)
+        full_data = forecaster.get_full_data_with_forecast(engine=bundle.get('engine', 'legacy'), **params)
+        forecaster.get_summary_stats(full_data)
+        forecaster.get_aggregate_cube(full_data)
+        return full_data
+
+    profile = ForecastProfile(f"replay: {bundle.get('name', '')}", replay=bundle)
+    profile.run(run)
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profil kaydını sentetik veriyle tekrar oynat")
+    parser.add_argument('bundle', help="Arayüzden indirilen anonim parametre JSON'u")
+    parser.add_argument('--output', default='replay', help="Çıktı dosya öneki (.prof ve .folded yazılır)")
+    parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime'])
+    parser.add_argument('--top', type=int, default=30, help="Raporda gösterilen fonksiyon sayısı")
+    args = parser.parse_args(argv)
+
+    with open(args.bundle, encoding='utf-8') as f:
+        bundle = json.load(f)
+
+    dataset = bundle['dataset']
+    print(f"🔁 {dataset['groups']} ana grup, {dataset['rows']} satır, son gerçekleşen "
+          f"{dataset['last_actual'][0]}/{dataset['last_actual'][1]} (kayıtta {bundle.get('seconds') or 0:.2f}s)")
+
+    profile = replay(bundle)
+    print(f"⏱️ Tekrar oynatma: {profile.seconds:.2f}s\n")
+    print(profile.report(limit=args.top, sort=args.sort))
+
+    with open(f'{args.output}.prof', 'wb') as f:
+        f.write(profile.pstats_bytes())
+    with open(f'{args.output}.folded', 'w', encoding='utf-8') as f:
+        f.write(profile.collapsed_stacks())
+    print(f"💾 {args.output}.prof, {args.output}.folded")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,419 @@
+"""
+Yerel HTTP tahmin servisi - diğer araçlar bütçe rakamlarını Streamlit olmadan alabilsin
+
+Kullanım:
+    python forecast_service.py --port 8765 --workers 8
+
+Uç noktalar (JSON):
+    POST /datasets                        Excel içeriği (gövde = .xlsx baytları) → dataset_hash
+    GET  /datasets                        Bellekte tutulan veri setleri
+    POST /datasets/<hash>/forecast        Senaryo → full_data (?format=parquet ile Parquet)
+    POST /datasets/<hash>/summary         Senaryo → yıllık özet (get_summary_stats)
+    POST /datasets/<hash>/scenarios       {"scenarios": [...]} → senaryo başına özet
+    GET  /metrics                         Uç nokta bazında istek sayısı ve gecikme yüzdelikleri
+                                          (?format=prometheus ile Prometheus metin formatı)
+    GET  /health
+
+Senaryo gövdesi batch_forecast.py senaryo formatıdır; tablolar sadece JSON içinde verilebilir
+(sunucudaki dosya yolları kabul edilmez).
+
+Veri setleri içerik hash'iyle bellekte sıcak tutulur; aynı (veri seti, parametre) sonucu tekrar hesaplanmaz.
+İstekler sabit boyutlu thread havuzunda işlenir (forecaster salt okunur olduğu için paylaşılır); boşta
+bekleyen keep-alive bağlantıları KEEPALIVE_TIMEOUT saniye sonra kapatılır.
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from budget_forecast import BudgetForecaster, hash_forecast_params
+from budget_export import forecast_result_bytes
+from batch_forecast import DEFAULT_SCENARIO, scenario_params
+from forecast_memory import MEMORY_TRACKING, start_memory_tracking
+from forecast_metrics import (FORECAST_CACHE_REQUESTS, PROMETHEUS_CONTENT_TYPE, configure_logging, counter,
+                              get_logger, histogram, render_prometheus)
+
+
+# Bellekte tutulan veri seti ve tahmin sonucu sayıları (en eski kullanılan çıkarılır)
+MAX_DATASETS = 4
+MAX_RESULTS = 32
+
+# Boşta bekleyen (keep-alive) bağlantının worker'ı tutabileceği süre (saniye) - aşılırsa bağlantı kapanır
+KEEPALIVE_TIMEOUT = 15
+
+# Gecikme yüzdelikleri için uç nokta başına saklanan son ölçüm sayısı
+LATENCY_WINDOW = 1000
+
+TABLE_KEYS = ('monthly_targets', 'maingroup_targets', 'lessons_learned', 'price_changes')
+
+logger = get_logger('service')
+
+HTTP_REQUESTS = counter('budget_http_requests_total', 'Tahmin servisi istekleri', ('route', 'result'))
+HTTP_REQUEST_SECONDS = histogram('budget_http_request_seconds', 'Tahmin servisi istek süresi', ('route',))
+
+
+class ServiceError(Exception):
+    """İstemciye HTTP durum koduyla dönecek hata"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ForecastService:
+    """Sıcak veri setleri, sonuç önbelleği ve gecikme metrikleri (thread-safe)"""
+
+    def __init__(self, max_datasets=MAX_DATASETS, max_results=MAX_RESULTS):
+        self.max_datasets = max_datasets
+        self.max_results = max_results
+        self.lock = threading.Lock()
+        self.datasets = OrderedDict()
+        self.results = OrderedDict()
+        self.inflight = {}  # (veri seti, parametre hash'i) → hesaplanmakta olan sonucun Future'ı
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.counters = defaultdict(lambda: {'requests': 0, 'errors': 0})
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.started = time.time()
+
+    def _put(self, store, key, value, max_size):
+        with self.lock:
+            store[key] = value
+            store.move_to_end(key)
+            while len(store) > max_size:
+                store.popitem(last=False)
+
+    def _get(self, store, key):
+        with self.lock:
+            if key not in store:
+                return None
+            store.move_to_end(key)
+            return store[key]
+
+    def add_dataset(self, content):
+        """Excel içeriğini yükle (aynı içerik zaten sıcaksa tekrar okunmaz)"""
+        dataset_hash = hashlib.sha256(content).hexdigest()
+        forecaster = self._get(self.datasets, dataset_hash)
+        if forecaster is None:
+            try:
+                forecaster = BudgetForecaster(content)
+            except Exception as e:
+                raise ServiceError(400, f"Excel okunamadı: {e}")
+            self._put(self.datasets, dataset_hash, forecaster, self.max_datasets)
+        return dataset_hash, forecaster
+
+    def dataset(self, dataset_hash):
+        forecaster = self._get(self.datasets, dataset_hash)
+        if forecaster is None:
+            raise ServiceError(404, f"Veri seti bellekte yok: {dataset_hash} (önce POST /datasets)")
+        return forecaster
+
+    def describe(self, dataset_hash, forecaster):
+        return {
+            'dataset_hash': dataset_hash,
+            'main_groups': sorted(forecaster.data['MainGroup'].unique().tolist()),
+            'last_actual': [forecaster.last_actual_year, forecaster.last_actual_month],
+            'rows': len(forecaster.data)
+        }
+
+    def forecast(self, dataset_hash, scenario):
+        """
+        Senaryonun full_data'sı - (veri seti, parametre hash'i) başına bir kez hesaplanır
+
+        Aynı anahtar için eşzamanlı istekler hesabı tekrarlamaz: ilk istek hesaplar, diğerleri onun
+        sonucunu (veya hatasını) bekler.
+        """
+        forecaster = self.dataset(dataset_hash)
+        main_groups = sorted(forecaster.data['MainGroup'].unique().tolist())
+        try:
+            params = scenario_params(scenario, main_groups)
+        except (ValueError, KeyError, TypeError) as e:
+            raise ServiceError(400, f"Geçersiz senaryo: {e}")
+
+        key = (dataset_hash, hash_forecast_params(params))
+        with self.lock:
+            full_data = self.results.get(key)
+            pending = None
+            computing = False
+            if full_data is not None:
+                self.results.move_to_end(key)
+            elif key in self.inflight:
+                pending = self.inflight[key]
+            else:
+                pending = self.inflight[key] = Future()
+                computing = True
+            if computing:
+                self.cache_misses += 1
+            else:
+                self.cache_hits += 1
+        FORECAST_CACHE_REQUESTS.inc(cache='service', result='miss' if computing else 'hit')
+
+        if computing:
+            try:
+                full_data = forecaster.get_full_data_with_forecast(**params)
+            except Exception as e:
+                with self.lock:
+                    del self.inflight[key]
+                pending.set_exception(e)
+                raise
+            # Önce sonuç önbelleğe girer, sonra bekleme kaydı silinir (arada gelen istek yeniden hesaplamasın)
+            self._put(self.results, key, full_data, self.max_results)
+            with self.lock:
+                del self.inflight[key]
+            pending.set_result(full_data)
+        elif pending is not None:
+            full_data = pending.result()
+        return forecaster, params, full_data
+
+    def record(self, route, seconds, failed):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            self.counters[route]['requests'] += 1
+            if failed:
+                self.counters[route]['errors'] += 1
+        HTTP_REQUESTS.inc(route=route, result='error' if failed else 'ok')
+        HTTP_REQUEST_SECONDS.observe(seconds, route=route)
+
+    def metrics(self):
+        with self.lock:
+            routes = {}
+            for route, counter in self.counters.items():
+                samples = np.array(self.latencies[route]) * 1000
+                routes[route] = {
+                    **counter,
+                    'p50_ms': float(np.percentile(samples, 50)),
+                    'p90_ms': float(np.percentile(samples, 90)),
+                    'p99_ms': float(np.percentile(samples, 99)),
+                    'max_ms': float(samples.max())
+                }
+            return {
+                'uptime_seconds': time.time() - self.started,
+                'datasets': len(self.datasets),
+                'cached_results': len(self.results),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'routes': routes
+            }
+
+
+def parse_scenario(body):
+    """İstek gövdesinden senaryo - batch_forecast formatı, tablolar sadece JSON olarak"""
+    if not isinstance(body, dict):
+        raise ServiceError(400, "Senaryo bir JSON nesnesi olmalı")
+
+    unknown = set(body) - set(DEFAULT_SCENARIO)
+    if unknown:
+        raise ServiceError(400, f"Bilinmeyen alan(lar): {', '.join(sorted(unknown))}")
+    for key in TABLE_KEYS:
+        if isinstance(body.get(key), str):
+            raise ServiceError(400, f"{key}: dosya yolu kabul edilmez, tabloyu JSON olarak gönderin")
+
+    return {**DEFAULT_SCENARIO, **body}
+
+
+class ForecastRequestHandler(BaseHTTPRequestHandler):
+    """Uç noktaları ForecastService'e yönlendirir; her istek metriklere işlenir"""
+
+    # Uç nokta adı, metot, yol deseni, işleyici metodu
+    ROUTES = [
+        ('health', 'GET', re.compile(r'^/health$'), 'handle_health'),
+        ('metrics', 'GET', re.compile(r'^/metrics$'), 'handle_metrics'),
+        ('datasets', 'GET', re.compile(r'^/datasets$'), 'handle_list_datasets'),
+        ('upload', 'POST', re.compile(r'^/datasets$'), 'handle_upload'),
+        ('forecast', 'POST', re.compile(r'^/datasets/(?P<dataset_hash>[0-9a-f]{64})/forecast$'), 'handle_forecast'),
+        ('summary', 'POST', re.compile(r'^/datasets/(?P<dataset_hash>[0-9a-f]{64})/summary$'), 'handle_summary'),
+        ('scenarios', 'POST', re.compile(r'^/datasets/(?P<dataset_hash>[0-9a-f]{64})/scenarios$'), 'handle_scenarios')
+    ]
+
+    protocol_version = 'HTTP/1.1'
+
+    # Soket zaman aşımı: boşta bekleyen keep-alive istemcisi havuzdaki worker'ı süresiz tutmasın
+    timeout = KEEPALIVE_TIMEOUT
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def dispatch(self, method):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        route = 'not_found'
+        failed = True
+
+        try:
+            for name, route_method, pattern, handler in self.ROUTES:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    route = name
+                    getattr(self, handler)(query=parse_qs(url.query), **match.groupdict())
+                    failed = False
+                    break
+            else:
+                raise ServiceError(404, f"Bilinmeyen uç nokta: {method} {url.path}")
+        except ServiceError as e:
+            # Gövde okunmamış olabilir - bağlantıyı yeniden kullanma
+            self.close_connection = True
+            self.send_json({'error': str(e)}, status=e.status)
+        except Exception as e:
+            self.close_connection = True
+            self.send_json({'error': f"{type(e).__name__}: {e}"}, status=500)
+        finally:
+            self.service.record(route, time.perf_counter() - start, failed)
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise ServiceError(400, "Geçersiz Content-Length")
+        if length < 0:
+            # rfile.read(-1) istemci bağlantıyı kapatana kadar bekler
+            raise ServiceError(400, f"Geçersiz Content-Length ({length})")
+        if length > self.server.max_upload_bytes:
+            raise ServiceError(413, f"Gövde çok büyük ({length} bayt)")
+        return self.rfile.read(length)
+
+    def read_json(self):
+        body = self.read_body()
+        try:
+            return json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            raise ServiceError(400, f"Geçersiz JSON: {e}")
+
+    def send_bytes(self, payload, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json(self, data, status=200):
+        self.send_bytes(json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8', status)
+
+    def send_frame(self, frame, status=200):
+        """DataFrame'i kayıt listesi olarak gönder (to_json NaN'ı null yapar)"""
+        self.send_bytes(frame.to_json(orient='records').encode('utf-8'), 'application/json; charset=utf-8', status)
+
+    def handle_health(self, query):
+        self.send_json({'status': 'ok'})
+
+    def log_message(self, format, *args):
+        """Erişim logu stderr yerine 'budget.service' logger'ına"""
+        logger.info(format % args, extra={'event': 'http_access', 'client': self.address_string()})
+
+    def handle_metrics(self, query):
+        if query.get('format', ['json'])[0] == 'prometheus':
+            self.send_bytes(render_prometheus().encode('utf-8'), PROMETHEUS_CONTENT_TYPE)
+        else:
+            self.send_json(self.service.metrics())
+
+    def handle_list_datasets(self, query):
+        with self.service.lock:
+            datasets = list(self.service.datasets.items())
+        self.send_json([self.service.describe(dataset_hash, forecaster) for dataset_hash, forecaster in datasets])
+
+    def handle_upload(self, query):
+        content = self.read_body()
+        if not content:
+            raise ServiceError(400, "Gövde boş - Excel içeriğini gönderin")
+        dataset_hash, forecaster = self.service.add_dataset(content)
+        self.send_json(self.service.describe(dataset_hash, forecaster), status=201)
+
+    def handle_forecast(self, query, dataset_hash):
+        scenario = parse_scenario(self.read_json())
+        _, params, full_data = self.service.forecast(dataset_hash, scenario)
+
+        if query.get('format', ['json'])[0] == 'parquet':
+            payload = forecast_result_bytes(full_data, 'parquet', params=params, dataset_hash=dataset_hash)
+            self.send_bytes(payload, 'application/vnd.apache.parquet')
+        else:
+            self.send_frame(full_data)
+
+    def handle_summary(self, query, dataset_hash):
+        scenario = parse_scenario(self.read_json())
+        forecaster, _, full_data = self.service.forecast(dataset_hash, scenario)
+        self.send_frame(forecaster.get_summary_stats(full_data, as_frame=True).reset_index())
+
+    def handle_scenarios(self, query, dataset_hash):
+        body = self.read_json()
+        scenarios = body.get('scenarios') if isinstance(body, dict) else None
+        if not isinstance(scenarios, list) or not scenarios:
+            raise ServiceError(400, '"scenarios" boş olmayan bir liste olmalı')
+
+        results = []
+        for index, raw in enumerate(scenarios):
+            scenario = parse_scenario(raw)
+            forecaster, params, full_data = self.service.forecast(dataset_hash, scenario)
+            summary = forecaster.get_summary_stats(full_data, as_frame=True)
+            results.append({
+                'name': raw.get('name', f'senaryo_{index + 1}'),
+                'params_hash': hash_forecast_params(params),
+                'summary': json.loads(summary.reset_index().to_json(orient='records'))
+            })
+        self.send_json(results)
+
+
+class ForecastHTTPServer(ThreadingHTTPServer):
+    """İstekleri sınırsız thread yerine sabit boyutlu havuzda işleyen HTTP sunucusu"""
+
+    def __init__(self, address, service, workers=8, max_upload_mb=50):
+        super().__init__(address, ForecastRequestHandler)
+        self.service = service
+        self.max_upload_bytes = int(max_upload_mb * 1024 * 1024)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='forecast')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Yerel bütçe tahmin HTTP servisi")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=8, help="Eşzamanlı istek işleyen thread sayısı")
+    parser.add_argument('--max-datasets', type=int, default=MAX_DATASETS, help="Bellekte tutulan veri seti sayısı")
+    parser.add_argument('--max-results', type=int, default=MAX_RESULTS, help="Önbellekteki tahmin sonucu sayısı")
+    parser.add_argument('--max-upload-mb', type=float, default=50, help="İzin verilen en büyük istek gövdesi")
+    parser.add_argument('--trace-memory', action='store_true', default=MEMORY_TRACKING,
+                        help="Tahmin çağrısı başına tepe belleği ölç (tracemalloc, /metrics'te budget_forecast_peak_bytes)")
+    parser.add_argument('--log-level', default=None, help="DEBUG, INFO, WARNING... (varsayılan BUDGET_LOG_LEVEL veya INFO)")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+    if args.trace_memory:
+        start_memory_tracking()
+
+    service = ForecastService(max_datasets=args.max_datasets, max_results=args.max_results)
+    server = ForecastHTTPServer((args.host, args.port), service, workers=args.workers,
+                                max_upload_mb=args.max_upload_mb)
+
+    logger.info(f"Tahmin servisi: http://{args.host}:{args.port} ({args.workers} worker)",
+                extra={'event': 'service_started', 'host': args.host, 'port': args.port, 'workers': args.workers})
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Hesapla süre izleme - iç içe span'lerle aşama bazında süreler
+
+Bir Trace aktifken (trace.activate()) span(), @traced ve traced_steps() çağrıları kayıt açar;
+aktif trace yoksa hiçbir şey kaydetmez (kütüphane kodu her zaman işaretli kalabilir).
+Aynı trace farklı thread'lerde ayrı ayrı aktive edilebilir (örn. arayüz + iş kuyruğu thread'i).
+
+Dışa aktarma: to_json() ve Chrome trace formatı (chrome://tracing veya ui.perfetto.dev ile açılır).
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# (trace, üst span id) - thread/bağlam başına
+_current = ContextVar('forecast_trace_current', default=None)
+
+
+class Trace:
+    """Tek bir çalıştırmanın span kayıtları (thread-safe)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.created = time.time()
+        self.lock = threading.Lock()
+        self.spans = []
+
+    @contextmanager
+    def activate(self, parent=None):
+        """Bu bağlamda (thread) açılan span'ler bu trace'e yazılsın"""
+        token = _current.set((self, parent))
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def run(self, func, *args, **kwargs):
+        """func'ı bu trace aktifken çağır (iş kuyruğu / thread havuzu adımları için)"""
+        with self.activate():
+            return func(*args, **kwargs)
+
+    def _open(self, name, parent, args):
+        with self.lock:
+            span_id = len(self.spans)
+            self.spans.append({
+                'id': span_id,
+                'parent': parent,
+                'name': name,
+                'start': time.perf_counter() - self.origin,
+                'end': None,
+                'thread': threading.current_thread().name,
+                'args': dict(args)
+            })
+        return span_id
+
+    def _close(self, span_id):
+        with self.lock:
+            self.spans[span_id]['end'] = time.perf_counter() - self.origin
+
+    def has(self, name):
+        """Bu adda span kaydedildi mi"""
+        with self.lock:
+            return any(span['name'] == name for span in self.spans)
+
+    def rows(self):
+        """
+        Span'ler ağaç sırasıyla (üst span'den hemen sonra alt span'ler)
+
+        Returns:
+        --------
+        List[Dict]: name, depth, start_ms, duration_ms, thread, args (açık kalan span'in süresi None)
+        """
+        with self.lock:
+            spans = [dict(span) for span in self.spans]
+
+        children = {}
+        for span in spans:
+            children.setdefault(span['parent'], []).append(span)
+
+        rows = []
+        stack = [(span, 0) for span in reversed(children.get(None, []))]
+        while stack:
+            span, depth = stack.pop()
+            duration = None if span['end'] is None else (span['end'] - span['start']) * 1000
+            rows.append({
+                'name': span['name'],
+                'depth': depth,
+                'start_ms': span['start'] * 1000,
+                'duration_ms': duration,
+                'thread': span['thread'],
+                'args': span['args']
+            })
+            stack.extend((child, depth + 1) for child in reversed(children.get(span['id'], [])))
+        return rows
+
+    def total_ms(self):
+        """İlk span başından son span sonuna kadar geçen süre"""
+        with self.lock:
+            finished = [span for span in self.spans if span['end'] is not None]
+            if not finished:
+                return 0.0
+            return (max(span['end'] for span in finished) - min(span['start'] for span in finished)) * 1000
+
+    def to_json(self):
+        """JSON'a çevrilebilir özet (span'ler ağaç sırasıyla)"""
+        return {
+            'name': self.name,
+            'created': self.created,
+            'total_ms': self.total_ms(),
+            'spans': self.rows()
+        }
+
+    def to_chrome_trace(self):
+        """Chrome trace event formatı ('X' tamamlanmış olaylar, mikro saniye)"""
+        with self.lock:
+            spans = [dict(span) for span in self.spans]
+
+        thread_ids = {}
+        events = []
+        for span in spans:
+            if span['end'] is None:
+                continue
+            tid = thread_ids.setdefault(span['thread'], len(thread_ids) + 1)
+            events.append({
+                'name': span['name'],
+                'cat': 'forecast',
+                'ph': 'X',
+                'ts': span['start'] * 1e6,
+                'dur': (span['end'] - span['start']) * 1e6,
+                'pid': os.getpid(),
+                'tid': tid,
+                'args': span['args']
+            })
+        for thread, tid in thread_ids.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                           'args': {'name': thread}})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'name': self.name}}
+
+
+def current_trace():
+    """Bu bağlamda aktif trace (yoksa None)"""
+    current = _current.get()
+    return current[0] if current is not None else None
+
+
+@contextmanager
+def span(name, **args):
+    """Aktif trace varsa adlandırılmış, iç içe geçebilen bir süre kaydı aç"""
+    current = _current.get()
+    if current is None:
+        yield
+        return
+
+    trace, parent = current
+    span_id = trace._open(name, parent, args)
+    token = _current.set((trace, span_id))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        trace._close(span_id)
+
+
+def traced(name=None):
+    """Fonksiyonu span ile sar (aktif trace yoksa doğrudan çağrılır)"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_steps(items, name):
+    """
+    Döngünün her adımını ayrı span olarak kaydet (döngü gövdesini girintilemeden)
+
+    Adımın span'i eleman verilince açılır, bir sonraki eleman istenince kapanır. Adım span'leri
+    bağlamı değiştirmez (döngü yarıda kalırsa sonraki span'ler yanlış üst span'e bağlanmasın).
+    """
+    current = _current.get()
+    if current is None:
+        yield from items
+        return
+
+    trace, parent = current
+    for step, item in enumerate(items, start=1):
+        span_id = trace._open(name, parent, {'step': step})
+        try:
+            yield item
+        finally:
+            trace._close(span_id)
@@ -0,0 +1,260 @@
+"""
+Kalıcı senaryo deposu (sqlite3) - kaydedilen bütçeler yeniden hesaplamadan yüklenir ve karşılaştırılır
+
+Her senaryo (dataset_hash, params_hash) ile tekildir; parametre seti JSON olarak, full_data
+satırları ayrı tabloda (scenario_id, Year, Month, MainGroup) birincil anahtarıyla tutulur.
+Her işlem kendi bağlantısını açar; depo thread'ler ve oturumlar arasında paylaşılabilir.
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from budget_export import LEVEL_METRICS, SUM_METRICS, _decode_params, _encode_params, diff_forecasts
+from budget_forecast import hash_forecast_params
+
+
+DEFAULT_DB_PATH = os.environ.get('BUDGET_SCENARIO_DB', 'scenarios.db')
+
+KEY_COLUMNS = ['Year', 'Month', 'MainGroup']
+VALUE_COLUMNS = ['Quantity', 'UnitPrice', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS',
+                 'Stock_COGS_Ratio', 'PriceChange', 'PriceMultiplier', 'SalesMultiplier']
+ROW_COLUMNS = KEY_COLUMNS + VALUE_COLUMNS
+
+# Aynı (Year, Month, MainGroup) birden fazla satırsa: tutarlar toplanır, oranlar toplamlardan yeniden hesaplanır
+DUPLICATE_SUM_COLUMNS = ['Quantity', 'Sales', 'GrossProfit', 'Stock', 'COGS']
+DUPLICATE_MEAN_COLUMNS = ['PriceChange', 'PriceMultiplier', 'SalesMultiplier']
+
+
+def _quote(column):
+    """Kolon adını SQL tanımlayıcısı olarak tırnakla ('GrossMargin%' gibi adlar için)"""
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _merge_duplicate_keys(rows):
+    """
+    Aynı anahtarlı satırları birleştir (birincil anahtar satır başına tek kayıt ister)
+
+    Veri ve legacy motor tekrar eden satırları ayıklamaz; build_comparison_table gibi tutarlar toplanır.
+    Birim fiyat, marj ve stok oranı toplanan tutarlardan yeniden hesaplanır.
+    """
+    if not rows.duplicated(KEY_COLUMNS).any():
+        return rows
+
+    aggregations = {column: 'sum' for column in DUPLICATE_SUM_COLUMNS}
+    aggregations.update({column: 'mean' for column in DUPLICATE_MEAN_COLUMNS})
+    merged = rows.groupby(KEY_COLUMNS, sort=False).agg(aggregations).reset_index()
+
+    merged['UnitPrice'] = (merged['Sales'] / merged['Quantity']).where(merged['Quantity'] > 0, 0.0)
+    merged['GrossMargin%'] = (merged['GrossProfit'] / merged['Sales']).where(merged['Sales'] > 0, 0.0)
+    merged['Stock_COGS_Ratio'] = (merged['Stock'] / merged['COGS']).where(merged['COGS'] > 0, 0.0)
+    return merged[ROW_COLUMNS]
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    dataset_hash TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    row_count INTEGER NOT NULL,
+    UNIQUE (dataset_hash, params_hash)
+);
+CREATE TABLE IF NOT EXISTS scenario_rows (
+    scenario_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+    Year INTEGER NOT NULL,
+    Month INTEGER NOT NULL,
+    MainGroup TEXT NOT NULL,
+    {', '.join(f'{_quote(column)} REAL' for column in VALUE_COLUMNS)},
+    PRIMARY KEY (scenario_id, Year, Month, MainGroup)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scenarios_dataset ON scenarios (dataset_hash, created_at);
+"""
+
+
+def _aggregate_metric(rows, metric, by):
+    """Senaryo (ve by) başına metrik özeti - compare kuralları, by=None ise senaryo başına tek değer"""
+    keys = ['Scenario'] + ([by] if by else [])
+    if metric == 'GrossMargin%':
+        sums = rows.groupby(keys, sort=False)[['GrossProfit', 'Sales']].sum()
+        return (sums['GrossProfit'] / sums['Sales']).where(sums['Sales'] > 0)
+    if metric in LEVEL_METRICS:
+        # Önce aynı aydaki gruplar toplanır, sonra aylar arasında ortalama alınır
+        period_keys = [key for key in ['Year', 'Month'] if key not in keys]
+        monthly = rows.groupby(keys + period_keys, sort=False)[metric].sum()
+        return monthly.groupby(level=keys, sort=False).mean()
+    aggfunc = 'sum' if metric in SUM_METRICS else 'mean'
+    return rows.groupby(keys, sort=False)[metric].agg(aggfunc)
+
+
+class ScenarioStore:
+    """sqlite3 üzerinde senaryo kaydetme, listeleme, yükleme ve sorgulama"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def save(self, name, dataset_hash, params, full_data):
+        """
+        Senaryoyu kaydet ve id'sini döndür
+
+        Aynı veri seti + parametre seti zaten kayıtlıysa adı ve satırları güncellenir (id korunur).
+        """
+        params_hash = hash_forecast_params(params)
+        rows = full_data.reindex(columns=ROW_COLUMNS)
+        rows = rows.astype({column: float for column in VALUE_COLUMNS})
+        rows = rows.astype({'Year': int, 'Month': int, 'MainGroup': str})
+        rows = _merge_duplicate_keys(rows)
+        records = rows.itertuples(index=False, name=None)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """INSERT INTO scenarios (name, dataset_hash, params_hash, params, created_at, row_count)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (dataset_hash, params_hash) DO UPDATE SET
+                       name = excluded.name, created_at = excluded.created_at, row_count = excluded.row_count""",
+                (name, dataset_hash, params_hash, json.dumps(_encode_params(params)), time.time(), len(rows))
+            )
+            scenario_id = conn.execute(
+                'SELECT id FROM scenarios WHERE dataset_hash = ? AND params_hash = ?',
+                (dataset_hash, params_hash)
+            ).fetchone()[0]
+
+            conn.execute('DELETE FROM scenario_rows WHERE scenario_id = ?', (scenario_id,))
+            conn.executemany(
+                f"INSERT INTO scenario_rows (scenario_id, {', '.join(map(_quote, ROW_COLUMNS))}) "
+                f"VALUES ({', '.join(['?'] * (len(ROW_COLUMNS) + 1))})",
+                ((scenario_id, *[None if pd.isna(value) else value for value in record]) for record in records)
+            )
+        return scenario_id
+
+    def find(self, dataset_hash, params_hash):
+        """Veri seti + parametre hash'iyle kayıtlı senaryonun id'si (yoksa None)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT id FROM scenarios WHERE dataset_hash = ? AND params_hash = ?',
+                (dataset_hash, params_hash)
+            ).fetchone()
+        return row[0] if row else None
+
+    def list_scenarios(self, dataset_hash=None):
+        """Kayıtlı senaryolar (yeniden eskiye) - dataset_hash verilirse sadece o veri setininkiler"""
+        query = 'SELECT id, name, dataset_hash, params_hash, created_at, row_count FROM scenarios'
+        args = ()
+        if dataset_hash is not None:
+            query += ' WHERE dataset_hash = ?'
+            args = (dataset_hash,)
+        query += ' ORDER BY created_at DESC'
+
+        with closing(self._connect()) as conn:
+            scenarios = pd.read_sql_query(query, conn, params=args)
+        scenarios['created_at'] = pd.to_datetime(scenarios['created_at'], unit='s')
+        return scenarios
+
+    def load(self, scenario_id):
+        """
+        Senaryonun full_data'sını ve kaydını yükle
+
+        Returns:
+        --------
+        (DataFrame, metadata) - metadata: {'id', 'name', 'dataset_hash', 'params_hash', 'params'}
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT id, name, dataset_hash, params_hash, params FROM scenarios WHERE id = ?',
+                (scenario_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Senaryo bulunamadı: {scenario_id}")
+            data = pd.read_sql_query(
+                f"SELECT {', '.join(map(_quote, ROW_COLUMNS))} FROM scenario_rows "
+                f"WHERE scenario_id = ? ORDER BY Year, Month, MainGroup",
+                conn, params=(scenario_id,)
+            )
+
+        metadata = {
+            'id': row[0],
+            'name': row[1],
+            'dataset_hash': row[2],
+            'params_hash': row[3],
+            'params': _decode_params(json.loads(row[4]))
+        }
+        return data, metadata
+
+    def query(self, scenario_ids, year=None, month=None, main_group=None, columns=None):
+        """
+        Birden fazla senaryonun satırlarını filtreyle oku (indeks üzerinden, tahmin çalıştırmadan)
+
+        Dönen tabloda 'Scenario' kolonu senaryo adıdır (aynı adlı senaryolara '#id' eklenir).
+        """
+        scenario_ids = [int(scenario_id) for scenario_id in scenario_ids]
+        if not scenario_ids:
+            return pd.DataFrame(columns=['Scenario'] + KEY_COLUMNS + (columns or VALUE_COLUMNS))
+
+        conditions = [f"r.scenario_id IN ({', '.join(['?'] * len(scenario_ids))})"]
+        args = list(scenario_ids)
+        for column, value in (('Year', year), ('Month', month), ('MainGroup', main_group)):
+            if value is not None:
+                conditions.append(f'r.{column} = ?')
+                args.append(value)
+
+        selected = ', '.join(f'r.{_quote(column)}' for column in KEY_COLUMNS + (columns or VALUE_COLUMNS))
+        with closing(self._connect()) as conn:
+            rows = pd.read_sql_query(
+                f"SELECT s.id AS ScenarioId, s.name AS Scenario, {selected} FROM scenario_rows r "
+                f"JOIN scenarios s ON s.id = r.scenario_id WHERE {' AND '.join(conditions)} "
+                f"ORDER BY r.scenario_id, r.Year, r.Month, r.MainGroup",
+                conn, params=args
+            )
+
+        # Aynı adlı senaryolar karışmasın
+        names = rows.drop_duplicates('ScenarioId').set_index('ScenarioId')['Scenario']
+        duplicated = names[names.duplicated(keep=False)]
+        for scenario_id, name in duplicated.items():
+            rows.loc[rows['ScenarioId'] == scenario_id, 'Scenario'] = f"{name} #{scenario_id}"
+        return rows.drop(columns='ScenarioId')
+
+    def compare(self, scenario_ids, metric='Sales', year=2026, by='Month', with_total=False):
+        """
+        Seçilen senaryoların bir metriğini yan yana getir (satır: by, kolon: senaryo adı)
+
+        Tutarlar toplanır; stok (seviye) her ayın grup toplamının aylar arası ortalaması, marj toplam
+        brüt kâr / toplam satıştır. with_total=True ise sona tüm satırların aynı kuralla özeti eklenir
+        ('Toplam', stokta 'Ortalama').
+        """
+        columns = ['GrossProfit', 'Sales'] if metric == 'GrossMargin%' else [metric]
+        rows = self.query(scenario_ids, year=year, columns=columns)
+        if rows.empty:
+            return pd.DataFrame()
+
+        scenarios = rows['Scenario'].unique()
+        comparison = _aggregate_metric(rows, metric, by).unstack('Scenario')
+        comparison = comparison.reindex(index=rows[by].unique(), columns=scenarios)
+        if with_total:
+            label = 'Ortalama' if metric in LEVEL_METRICS else 'Toplam'
+            total = _aggregate_metric(rows, metric, None).reindex(scenarios)
+            comparison = pd.concat([comparison, total.to_frame(label).T])
+        return comparison
+
+    def diff(self, base_id, other_id, year=None):
+        """İki kayıtlı senaryonun hücre bazında farkı (budget_export.diff_forecasts biçiminde)"""
+        base = self.query([base_id], year=year).drop(columns='Scenario')
+        other = self.query([other_id], year=year).drop(columns='Scenario')
+        return diff_forecasts(base, other)
+
+    def delete(self, scenario_id):
+        """Senaryoyu ve satırlarını sil"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM scenarios WHERE id = ?', (scenario_id,))
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import make_synthetic_workbook
+from budget_forecast import BudgetForecaster
+
+
+@pytest.fixture(scope='session')
+def forecaster(tmp_path_factory):
+    """Sentetik çalışma kitabından yüklenmiş forecaster (testler arasında salt okunur)"""
+    path = tmp_path_factory.mktemp('data') / 'synthetic.xlsx'
+    make_synthetic_workbook(str(path), groups=8)
+    return BudgetForecaster(str(path))
@@ -0,0 +1,41 @@
+import pytest
+
+from budget_forecast import compare_forecasts
+
+
+def _scenario_params(forecaster):
+    groups = sorted(forecaster.data['MainGroup'].unique())
+    return {
+        'growth_param': 0.15,
+        'margin_improvement': 0.02,
+        'stock_change_pct': -0.1,
+        'monthly_growth_targets': {3: 0.3, 7: -0.05},
+        'maingroup_growth_targets': {groups[0]: 0.4},
+        'lessons_learned': {(groups[1], 5): 6, (groups[2], 11): -4},
+        'price_change_matrix': {(groups[0], 2): 0.1, (groups[3], 9): 0.2}
+    }
+
+
+@pytest.mark.parametrize('scenario', ['default', 'targets'])
+def test_vectorized_matches_legacy(forecaster, scenario):
+    params = _scenario_params(forecaster) if scenario == 'targets' else {}
+    legacy = forecaster.forecast_future_months(engine='legacy', **params)
+    vectorized = forecaster.forecast_future_months(engine='vectorized', **params)
+
+    report = compare_forecasts(legacy, vectorized)
+
+    assert report['passed'], report['differences'].head()
+    assert report['missing_rows'].empty and report['extra_rows'].empty
+    assert len(legacy) > 0
+
+
+def test_compare_forecasts_reports_changed_cell(forecaster):
+    legacy = forecaster.forecast_future_months(engine='legacy')
+    changed = legacy.copy()
+    changed.loc[changed.index[0], 'Sales'] += 1000
+
+    report = compare_forecasts(legacy, changed)
+
+    assert not report['passed']
+    assert report['differences']['Column'].tolist() == ['Sales']
+    assert report['max_abs_diff'] == pytest.approx(1000)
@@ -0,0 +1,53 @@
+import hashlib
+import io
+
+import pandas as pd
+import pytest
+
+from budget_export import forecast_result_bytes, read_forecast_result, write_forecast_result
+from budget_forecast import hash_forecast_params
+
+
+PARAMS = {
+    'num_months': 15,
+    'growth_param': 0.1,
+    'monthly_growth_targets': {1: 0.2, 12: -0.05},
+    'lessons_learned': {('Grup 0001', 3): 5},
+    'price_change_matrix': {('Grup 0002', 7): 0.15},
+    'engine': 'vectorized'
+}
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_round_trip_keeps_data_params_and_hash(forecaster, fmt):
+    data = forecaster.forecast_future_months(**{key: value for key, value in PARAMS.items()
+                                                if key != 'engine'})
+    dataset_hash = hashlib.sha256(b'synthetic').hexdigest()
+
+    content = forecast_result_bytes(data, fmt=fmt, params=PARAMS, dataset_hash=dataset_hash)
+    loaded, metadata = read_forecast_result(content)
+
+    pd.testing.assert_frame_equal(loaded, data.reset_index(drop=True))
+    assert metadata['dataset_hash'] == dataset_hash
+    # Tuple anahtarlı dict'ler geri döner, parametre hash'i (önbellek anahtarı) değişmez
+    assert metadata['params'] == PARAMS
+    assert hash_forecast_params(metadata['params']) == hash_forecast_params(PARAMS)
+
+
+def test_file_path_and_missing_metadata(tmp_path):
+    data = pd.DataFrame({'Year': [2026], 'Month': [1], 'MainGroup': ['A'], 'Sales': [1.5]})
+    path = tmp_path / 'result.parquet'
+    write_forecast_result(data, str(path))
+
+    loaded, metadata = read_forecast_result(str(path))
+
+    pd.testing.assert_frame_equal(loaded, data)
+    assert metadata['params'] is None and metadata['dataset_hash'] is None
+
+
+def test_rejects_unknown_format_and_foreign_bytes():
+    data = pd.DataFrame({'Sales': [1.0]})
+    with pytest.raises(ValueError):
+        write_forecast_result(data, io.BytesIO(), fmt='csv')
+    with pytest.raises(ValueError):
+        read_forecast_result(b'Year,Month\n2026,1\n')
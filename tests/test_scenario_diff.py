@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from budget_export import biggest_movers, diff_forecasts, total_delta
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=['Year', 'Month', 'MainGroup', 'Sales', 'Stock'])
+
+
+def test_same_keys_aligns_rows_directly():
+    base = _frame([(2026, 1, 'A', 100.0, 50.0), (2026, 1, 'B', 200.0, 80.0)])
+    other = base.assign(Sales=[110.0, 200.0])
+
+    diff = diff_forecasts(base, other)
+
+    assert diff['Status'].tolist() == ['both', 'both']
+    assert diff['Sales']['Delta'].tolist() == [10.0, 0.0]
+    assert diff['Sales']['DeltaPct'].tolist() == pytest.approx([0.1, 0.0])
+
+
+def test_missing_keys_get_status_and_nan():
+    base = _frame([(2026, 1, 'A', 100.0, 50.0), (2026, 2, 'A', 120.0, 60.0)])
+    other = _frame([(2026, 2, 'A', 150.0, 60.0), (2026, 3, 'A', 90.0, 40.0)])
+
+    diff = diff_forecasts(base, other)
+
+    # Sıra: base'in satırları, ardından sadece other'da olanlar
+    assert diff.index.tolist() == [(2026, 1, 'A'), (2026, 2, 'A'), (2026, 3, 'A')]
+    assert diff['Status'].tolist() == ['base_only', 'both', 'other_only']
+    assert np.isnan(diff['Sales']['Other'].iloc[0]) and np.isnan(diff['Sales']['Base'].iloc[2])
+    assert diff['Sales']['Delta'].iloc[1] == 30.0
+    assert total_delta(diff, 'Sales') == 30.0
+
+
+def test_duplicate_keys_match_in_order():
+    base = _frame([(2026, 1, 'A', 100.0, 50.0), (2026, 1, 'B', 10.0, 5.0), (2026, 1, 'A', 40.0, 20.0)])
+    other = _frame([(2026, 1, 'B', 12.0, 5.0), (2026, 1, 'A', 110.0, 50.0)])
+
+    diff = diff_forecasts(base, other)
+
+    # İkinci A satırının other'da eşi yok; anahtar değerleri ilk geçtiği satırdan alınır
+    assert diff.index.tolist() == [(2026, 1, 'A'), (2026, 1, 'B'), (2026, 1, 'A')]
+    assert diff['Status'].tolist() == ['both', 'both', 'base_only']
+    assert diff['Sales']['Delta'].iloc[:2].tolist() == [10.0, 2.0]
+    assert diff['Sales']['Base'].iloc[2] == 40.0
+
+
+def test_movers_skip_float_noise_and_average_stock_over_forecast_months():
+    base = _frame([
+        (2025, 12, 'A', 100.0, 50.0),
+        (2026, 1, 'A', 100.0, 50.0),
+        (2026, 2, 'A', 100.0, 50.0),
+        (2026, 1, 'B', 0.1 + 0.2, 30.0)
+    ])
+    other = base.assign(Sales=[100.0, 130.0, 100.0, 0.3], Stock=[50.0, 70.0, 50.0, 30.0])
+
+    diff = diff_forecasts(base, other)
+
+    movers = biggest_movers(diff, 'Sales')
+    assert movers['MainGroup'].tolist() == ['A']
+    assert movers['Delta'].tolist() == [30.0]
+
+    # 2025-12 gerçekleşen ay: stok ortalamasına sadece 2026'nın iki ayı girer
+    stock = biggest_movers(diff, 'Stock', by='MainGroup', actual_until=(2025, 12))
+    assert stock['Delta'].tolist() == [10.0]
+    assert total_delta(diff, 'Stock', actual_until=(2025, 12)) == 10.0
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from budget_forecast import hash_forecast_params
+from scenario_store import ScenarioStore
+
+
+def _full_data(sales, stock=(50.0, 70.0)):
+    return pd.DataFrame({
+        'Year': [2026, 2026],
+        'Month': [1, 2],
+        'MainGroup': ['A', 'A'],
+        'Quantity': [10.0, 12.0],
+        'Sales': list(sales),
+        'GrossProfit': [30.0, 40.0],
+        'Stock': list(stock),
+        'COGS': [70.0, 80.0]
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ScenarioStore(str(tmp_path / 'scenarios.db'))
+
+
+def test_same_params_update_in_place(store):
+    params = {'growth_param': 0.1, 'lessons_learned': {('A', 1): 3}}
+    first = store.save('İlk', 'hash', params, _full_data([100.0, 120.0]))
+    second = store.save('Güncel', 'hash', dict(reversed(list(params.items()))), _full_data([110.0, 130.0]))
+
+    assert second == first
+    assert store.list_scenarios('hash')['name'].tolist() == ['Güncel']
+
+    data, metadata = store.load(first)
+    assert data['Sales'].tolist() == [110.0, 130.0]
+    assert metadata['params'] == params
+    assert metadata['params_hash'] == hash_forecast_params(params)
+
+
+def test_duplicate_keys_are_merged(store):
+    full_data = pd.concat([_full_data([100.0, 120.0]), _full_data([50.0, 60.0])], ignore_index=True)
+
+    scenario_id = store.save('Tekrar', 'hash', {}, full_data)
+    data, _ = store.load(scenario_id)
+
+    assert len(data) == 2
+    assert data['Sales'].tolist() == [150.0, 180.0]
+    assert data['GrossMargin%'].tolist() == pytest.approx([60.0 / 150.0, 80.0 / 180.0])
+    assert data['UnitPrice'].tolist() == pytest.approx([150.0 / 20.0, 180.0 / 24.0])
+
+
+def test_compare_and_diff(store):
+    base = store.save('Baz', 'hash', {'growth_param': 0.1}, _full_data([100.0, 120.0]))
+    other = store.save('Yüksek', 'hash', {'growth_param': 0.2}, _full_data([110.0, 150.0], stock=(60.0, 80.0)))
+
+    sales = store.compare([base, other], metric='Sales', with_total=True)
+    assert sales.loc['Toplam'].tolist() == [220.0, 260.0]
+
+    stock = store.compare([base, other], metric='Stock', with_total=True)
+    assert stock.loc['Ortalama'].tolist() == [60.0, 70.0]
+
+    diff = store.diff(base, other)
+    assert diff['Sales']['Delta'].tolist() == [10.0, 30.0]